@@ -0,0 +1,121 @@
+"""Benchmark formatting spectral lines for display.
+
+Compares the column-wise formatting of table rows and plot colors with the
+row-by-row implementations they replaced, on a synthetic frame.
+
+Usage: python benchmarks/bench_format_rows.py [NUM_ROWS]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+from rich.text import Text
+
+from spectral_line_finder import data
+
+DISPLAY_COLUMNS = [
+    "element",
+    "sp_num",
+    "obs_wl(nm)",
+    "ritz_wl_vac(nm)",
+    "intens",
+    "Ei(eV)",
+    "Ek(eV)",
+    "conf_i",
+    "conf_k",
+]
+
+
+def make_lines(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Creates a synthetic frame resembling processed NIST line data."""
+    rng = np.random.default_rng(seed)
+
+    def with_nan(values: np.ndarray, fraction: float) -> np.ndarray:
+        values = values.astype(float)
+        values[rng.random(num_rows) < fraction] = np.nan
+        return values
+
+    wavelength = np.sort(rng.uniform(50.0, 2000.0, num_rows)).round(5)
+    configs = np.array(["1s", "2p", "3d", "3p6.4s", "3d7.4s", "4s2"], dtype=object)
+    df = pd.DataFrame(
+        {
+            "element": rng.choice(["Fe", "Na", "Ca", "H"], num_rows).astype(object),
+            "sp_num": rng.integers(1, 5, num_rows),
+            "obs_wl(nm)": with_nan(wavelength.round(3), 0.3),
+            "ritz_wl_vac(nm)": with_nan(wavelength, 0.1),
+            "intens": with_nan(rng.integers(1, 1000, num_rows), 0.4),
+            "Ei(eV)": with_nan(rng.uniform(0, 20, num_rows).round(6), 0.05),
+            "Ek(eV)": with_nan(rng.uniform(0, 20, num_rows).round(6), 0.05),
+            "conf_i": rng.choice(configs, num_rows),
+            "conf_k": rng.choice(configs, num_rows),
+            "wavelength": wavelength,
+        }
+    )
+    df[["r", "g", "b"]] = data.wavelengths_to_rgb(wavelength)
+    return df
+
+
+def format_display_rows_iterrows(df, display_columns):
+    for _, row in df.iterrows():
+        r, g, b = row["r"], row["g"], row["b"]
+        color_swatch = Text("█████", style=f"rgb({r},{g},{b})")
+        display_values = tuple(
+            "" if pd.isna(row[c]) else str(row[c]) for c in display_columns
+        )
+        yield (color_swatch,) + display_values
+
+
+def format_spectral_lines_iterrows(df):
+    return [
+        (
+            row["wavelength"],
+            f"#{int(row['r']):02x}{int(row['g']):02x}{int(row['b']):02x}",
+        )
+        for _, row in df.iterrows()
+    ]
+
+
+def format_spectral_lines_vectorized(df):
+    return list(
+        zip(
+            df["wavelength"].tolist(),
+            data.format_hex_colors(df["r"], df["g"], df["b"]).tolist(),
+        )
+    )
+
+
+def best_of(func, repeat: int = 3) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main(num_rows: int = 100_000) -> None:
+    df = make_lines(num_rows)
+    rows_df = df[DISPLAY_COLUMNS + ["r", "g", "b"]]
+    colors_df = df[["wavelength", "r", "g", "b"]]
+
+    benchmarks = {
+        "display rows": (
+            lambda: list(format_display_rows_iterrows(rows_df, DISPLAY_COLUMNS)),
+            lambda: list(data.format_display_rows(rows_df, DISPLAY_COLUMNS)),
+        ),
+        "spectral lines": (
+            lambda: format_spectral_lines_iterrows(colors_df),
+            lambda: format_spectral_lines_vectorized(colors_df),
+        ),
+    }
+
+    print(f"{num_rows} rows")
+    for name, (baseline, vectorized) in benchmarks.items():
+        baseline_time = best_of(baseline)
+        vectorized_time = best_of(vectorized)
+        print(
+            f"{name:16} iterrows {baseline_time:8.3f} s   "
+            f"column-wise {vectorized_time:8.3f} s   "
+            f"speedup {baseline_time / vectorized_time:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
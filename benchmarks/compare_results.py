@@ -0,0 +1,71 @@
+"""Compare two benchmark results saved by run_benchmarks.py.
+
+Prints the ratio of the minimum time and the peak memory usage of each stage,
+marking stages which became slower or used more memory than the threshold.
+
+Usage: python benchmarks/compare_results.py BASELINE.json NEW.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+def ratio(new: float | None, old: float | None) -> float | None:
+    if new is None or not old:
+        return None
+    return new / old
+
+
+def format_ratio(value: float | None, threshold: float) -> str:
+    if value is None:
+        return f"{'-':>8}  "
+    marker = "!" if value > threshold else " "
+    return f"{value:8.2f}x{marker}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="ratio above which a stage counts as a regression",
+    )
+    args = parser.parse_args()
+
+    baseline, new = load(args.baseline), load(args.new)
+    if baseline["parameters"] != new["parameters"]:
+        print("Warning: the benchmarks were run with different parameters.")
+
+    regressions = []
+    print(f"{'stage':26} {'time':>10} {'memory':>10}")
+    for name, result in new["stages"].items():
+        if (old := baseline["stages"].get(name)) is None:
+            print(f"{name:26} {'new':>10}")
+            continue
+        time_ratio = ratio(result["min_seconds"], old["min_seconds"])
+        memory_ratio = ratio(result["peak_memory_bytes"], old["peak_memory_bytes"])
+        print(
+            f"{name:26} {format_ratio(time_ratio, args.threshold)}"
+            f"{format_ratio(memory_ratio, args.threshold)}"
+        )
+        if any(
+            r is not None and r > args.threshold for r in (time_ratio, memory_ratio)
+        ):
+            regressions.append(name)
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Synthetic line lists in the tab-separated format of the NIST database.
+
+The payloads mimic the quirks of the real data: the header row is repeated
+throughout the data, hydrogen lacks the element and ionization stage columns,
+and numeric fields like the intensity and energy levels are annotated with
+extra characters, like "123bl" or "[4.5]".
+"""
+
+import numpy as np
+import pandas as pd
+
+GENERIC_HEADER = [
+    "element",
+    "sp_num",
+    "obs_wl_vac(nm)",
+    "unc_obs_wl",
+    "ritz_wl_vac(nm)",
+    "unc_ritz_wl",
+    "intens",
+    "Aki(s^-1)",
+    "Acc",
+    "Ei(eV)",
+    "Ek(eV)",
+    "conf_i",
+    "term_i",
+    "J_i",
+    "conf_k",
+    "term_k",
+    "J_k",
+    "Type",
+    "tp_ref",
+    "line_ref",
+]
+# Hydrogen has a single ionization stage, so the data lacks these columns
+HYDROGEN_HEADER = GENERIC_HEADER[2:]
+
+# NIST repeats the header row every so many rows
+HEADER_INTERVAL = 500
+
+CONFIGURATIONS = ["1s", "2p", "3s", "3p", "3d", "4s", "3p6.4s", "3d7.4s", "4s2"]
+TERMS = ["2S", "2P*", "2D", "3F", "4F*", "5D", "*"]
+J_VALUES = ["1/2", "3/2", "5/2", "0", "1", "2", "3"]
+ACCURACIES = ["AAA", "A", "B+", "B", "C", "D", "E", ""]
+
+
+def make_payload(
+    element: str,
+    num_lines: int,
+    seed: int = 0,
+    header_interval: int = HEADER_INTERVAL,
+) -> str:
+    """Creates a synthetic NIST line list for an element.
+
+    Args:
+        element: The symbol of the element. Hydrogen ("H") uses the hydrogen
+            format, without the element and sp_num columns.
+        num_lines: The number of spectral lines.
+        seed: The seed of the random number generator.
+        header_interval: The number of data rows between repeated headers.
+
+    Returns:
+        The tab-separated line list, like the NIST server returns it.
+    """
+    rng = np.random.default_rng(seed)
+    is_hydrogen = element == "H"
+
+    def choose(options: list[str]) -> np.ndarray:
+        return rng.choice(np.array(options, dtype=object), num_lines)
+
+    def where(condition: np.ndarray, values: np.ndarray, other) -> np.ndarray:
+        return np.where(condition, values, other).astype(object)
+
+    def formatted(fmt: str, values: np.ndarray) -> np.ndarray:
+        return np.array([fmt % value for value in values], dtype=object)
+
+    wavelengths = rng.uniform(50.0, 2000.0, num_lines)
+    has_obs = rng.random(num_lines) < 0.8
+    # Every line has at least one of the observed and Ritz wavelengths
+    has_ritz = ~has_obs | (rng.random(num_lines) < 0.7)
+    obs_wl = where(has_obs, formatted("%.4f", wavelengths), "")
+    ritz_wl = formatted("%.5f", wavelengths + rng.normal(0, 1e-4, num_lines))
+    ritz_wl = where(rng.random(num_lines) < 0.1, ritz_wl + "+", ritz_wl)
+    ritz_wl = where(has_ritz, ritz_wl, "")
+
+    intensities = formatted("%d", rng.lognormal(4.0, 1.5, num_lines).astype(int) + 1)
+    intensity_kind = rng.random(num_lines)
+    intens = where(intensity_kind < 0.3, "", intensities)
+    intens = where(
+        (intensity_kind >= 0.3) & (intensity_kind < 0.45), intensities + "bl", intens
+    )
+    intens = where(
+        (intensity_kind >= 0.45) & (intensity_kind < 0.55),
+        "(" + intensities + ")",
+        intens,
+    )
+    intens = where(
+        (intensity_kind >= 0.55) & (intensity_kind < 0.6), intensities + "*", intens
+    )
+
+    lower_energies = rng.uniform(0.0, 15.0, num_lines)
+    upper_energies = lower_energies + 1239.84 / wavelengths
+    ei = formatted("%.6f", lower_energies)
+    ei = where(rng.random(num_lines) < 0.1, "[" + ei + "]", ei)
+    ek = formatted("%.6f", upper_energies)
+    ek = where(rng.random(num_lines) < 0.05, ek + "?", ek)
+
+    columns = {
+        "obs_wl_vac(nm)": obs_wl,
+        "unc_obs_wl": where(has_obs, "0.0002", ""),
+        "ritz_wl_vac(nm)": ritz_wl,
+        "unc_ritz_wl": where(has_ritz, "0.0001", ""),
+        "intens": intens,
+        "Aki(s^-1)": formatted("%.3e", rng.lognormal(16.0, 2.0, num_lines)),
+        "Acc": choose(ACCURACIES),
+        "Ei(eV)": ei,
+        "Ek(eV)": ek,
+        "conf_i": choose(CONFIGURATIONS),
+        "term_i": choose(TERMS),
+        "J_i": choose(J_VALUES),
+        "conf_k": choose(CONFIGURATIONS),
+        "term_k": choose(TERMS),
+        "J_k": choose(J_VALUES),
+        "Type": choose(["", "", "", "M1", "E2"]),
+        "tp_ref": choose(["T7771", "T8637", "T5493", ""]),
+        "line_ref": choose(["L7288", "L11229", "L2649", ""]),
+    }
+    if is_hydrogen:
+        header = HYDROGEN_HEADER
+    else:
+        header = GENERIC_HEADER
+        columns = {
+            "element": np.full(num_lines, element, dtype=object),
+            "sp_num": formatted("%d", rng.integers(1, 6, num_lines)),
+            **columns,
+        }
+
+    # Rows end with a trailing tab, like the rows of the real data
+    rows = pd.DataFrame(columns)[header].to_csv(
+        sep="\t", header=False, index=False, lineterminator="\t\n"
+    )
+    rows = rows.splitlines(keepends=True)
+    header_row = "\t".join(header) + "\t\n"
+    chunks = []
+    for start in range(0, max(len(rows), 1), header_interval):
+        chunks.append(header_row)
+        chunks.extend(rows[start : start + header_interval])
+    return "".join(chunks)
+
+
+def make_payloads(elements: list[str], num_lines: int, seed: int = 0) -> dict[str, str]:
+    """Creates synthetic NIST line lists for several elements.
+
+    Args:
+        elements: The symbols of the elements.
+        num_lines: The number of spectral lines per element.
+        seed: The seed of the random number generator.
+
+    Returns:
+        The line lists, by element.
+    """
+    return {
+        element: make_payload(element, num_lines, seed=seed + idx)
+        for idx, element in enumerate(elements)
+    }
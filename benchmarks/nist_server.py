@@ -0,0 +1,154 @@
+"""A local stand-in for the line list service of physics.nist.gov.
+
+The server answers requests for the line list of an element with a prepared
+payload, and with an HTML error page for unknown elements, like the NIST
+server does. Requests for a wavelength range are answered with the lines of
+the payload within that range.
+"""
+
+import contextlib
+import functools
+import re
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+LINES_PATH = "/cgi-bin/ASD/lines1.pl"
+
+ERROR_PAGE = """<html><head><title>NIST ASD Output: Lines</title></head>
+<body><p>Unrecognized token.</p><p>{element}</p></body></html>
+"""
+
+NO_LINES_PAGE = """<html><head><title>NIST ASD Output: Lines</title></head>
+<body><p>No lines are available in ASD with the parameters selected</p></body></html>
+"""
+
+
+class NistRequestHandler(BaseHTTPRequestHandler):
+    server: "NistStandInServer"
+    # Keep connections open between requests, like the NIST server
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        element = query.get("spectra", [""])[0]
+        low_w, upp_w = query.get("low_w", [""])[0], query.get("upp_w", [""])[0]
+        if url.path != LINES_PATH:
+            self.send_error(404)
+            return
+
+        time.sleep(self.server.latency)
+        self.server.num_requests += 1
+        payload = self.server.payloads.get(element)
+        error_page = ERROR_PAGE.format(element=element)
+        if payload is not None and low_w and upp_w:
+            payload = restrict_payload(payload, float(low_w), float(upp_w))
+            error_page = NO_LINES_PAGE
+        if payload is not None:
+            body = payload.encode()
+            content_type = "text/plain; charset=utf-8"
+        else:
+            body = error_page.encode()
+            content_type = "text/html; charset=utf-8"
+        self.server.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class NistStandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, payloads: dict[str, str], latency: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), NistRequestHandler)
+        self.payloads = payloads
+        self.latency = latency
+        # Totals over all requests, to compare the transfer of queries
+        self.num_requests = 0
+        self.bytes_sent = 0
+
+    @property
+    def lines_url(self) -> str:
+        """The URL of the line list service."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{LINES_PATH}"
+
+
+def restrict_payload(payload: str, low_w: float, upp_w: float) -> str | None:
+    """Keeps the lines of a payload within a wavelength range.
+
+    Like on the NIST server, a line is selected by its observed wavelength, or
+    by its Ritz wavelength if it wasn't observed.
+
+    Args:
+        payload: The tab-separated line list.
+        low_w: The lower bound of the range, in nm.
+        upp_w: The upper bound of the range, in nm.
+
+    Returns:
+        The line list of the lines within the range, starting with a header
+        row, or None if there are no such lines.
+    """
+    header, rows, wavelengths = _index_payload(payload)
+    start = np.searchsorted(wavelengths, low_w, side="left")
+    stop = np.searchsorted(wavelengths, upp_w, side="right")
+    if start == stop:
+        return None
+    return header + "".join(rows[start:stop])
+
+
+@functools.cache
+def _index_payload(payload: str) -> tuple[str, list[str], np.ndarray]:
+    """Splits a payload into its header and its rows, sorted by wavelength."""
+    rows = payload.splitlines(keepends=True)
+    header = rows[0]
+    names = header.split("\t")
+    obs_index = next(i for i, name in enumerate(names) if name.startswith("obs_wl"))
+    ritz_index = names.index("ritz_wl_vac(nm)")
+
+    data_rows = []
+    wavelengths = []
+    for row in rows:
+        if row == header:
+            continue
+        values = row.split("\t")
+        # Ritz wavelengths may be annotated, like "123.45678+"
+        value = values[obs_index] or values[ritz_index]
+        data_rows.append(row)
+        wavelengths.append(float(re.match(r"[\d.]+", value).group()))
+    order = np.argsort(wavelengths, kind="stable")
+    return header, [data_rows[i] for i in order], np.array(wavelengths)[order]
+
+
+@contextlib.contextmanager
+def serve_nist_payloads(
+    payloads: dict[str, str], latency: float = 0.0
+) -> Iterator[NistStandInServer]:
+    """Serves line lists from a local server in a background thread.
+
+    Args:
+        payloads: The line lists, by element.
+        latency: The delay before answering each request, in seconds.
+
+    Yields:
+        The running server.
+    """
+    server = NistStandInServer(payloads, latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,375 @@
+"""Benchmark the stages of loading, filtering and showing spectral lines.
+
+Synthetic NIST line lists are served by a local stand-in for the NIST server
+and processed by each stage in turn, from fetching the data to mounting the
+spectrum plot. Each stage is timed a number of times, and its peak memory
+usage is measured in a separate run using tracemalloc. The results are saved
+as JSON, so they can be compared across versions using compare_results.py.
+
+Usage: python benchmarks/run_benchmarks.py [--lines N] [--elements H,Na,Fe]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import importlib.metadata
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import httpx
+import numpy as np
+from nist_fixtures import make_payloads
+from nist_server import serve_nist_payloads
+from textual.app import App
+
+from spectral_line_finder import data, export, fetch, nist_parser
+from spectral_line_finder.line_store import LineStore
+from spectral_line_finder.spectrum_plot import SpectrumPlot
+
+DISPLAY_COLUMNS = [
+    "element",
+    "sp_num",
+    "obs_wl(nm)",
+    "ritz_wl_vac(nm)",
+    "intens",
+    "Ei(eV)",
+    "Ek(eV)",
+    "conf_i",
+    "conf_k",
+]
+
+
+class Measurement:
+    """Measures the time and peak memory usage of a region of code."""
+
+    def __init__(self, trace_memory: bool) -> None:
+        self.trace_memory = trace_memory
+        self.seconds: float | None = None
+        self.peak_bytes: int | None = None
+
+    @contextlib.contextmanager
+    def __call__(self) -> Iterator[None]:
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        self.seconds = time.perf_counter() - start
+        if self.trace_memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+
+
+Stage = Callable[[Measurement], None]
+
+
+class BenchmarkSuite:
+    """The stages of the benchmark and the state they share.
+
+    Every stage prepares its input outside of the measured region, so the
+    stages can be run in any order and any number of times.
+    """
+
+    def __init__(self, payloads: dict[str, str], lines_url: str, store_dir: Path):
+        self.payloads = payloads
+        self.lines_url = lines_url
+        self.elements = list(payloads)
+        self.filters = data.DataFilters()
+        self.filters.elements.elements = self.elements
+        data.line_store = LineStore(store_dir)
+
+        # Intermediate results, used as inputs of later stages
+        self.parsed = {
+            element: nist_parser.parse_nist_lines(io.StringIO(payload))
+            for element, payload in payloads.items()
+        }
+        self.processed = {
+            element: data.NistSpectralLines()._process_nist_data(io.StringIO(payload))
+            for element, payload in payloads.items()
+        }
+        for element, df in self.processed.items():
+            data.line_store.save(element, df)
+
+    @property
+    def stages(self) -> dict[str, Stage]:
+        return {
+            "fetch": self.fetch,
+            "fetch_concurrent": self.fetch_concurrent,
+            "fetch_wavelength_range": self.fetch_wavelength_range,
+            "parse": self.parse,
+            "sanitize_numeric": self.sanitize_numeric,
+            "rgb_colors": self.rgb_colors,
+            "load_cached": self.load_cached,
+            "load_cached_compact": self.load_cached_compact,
+            "filtered_dataframe_cold": self.filtered_dataframe_cold,
+            "filtered_dataframe_warm": self.filtered_dataframe_warm,
+            "filtered_lines_live": self.filtered_lines_live,
+            "get_display_rows": self.get_display_rows,
+            "get_spectral_lines": self.get_spectral_lines,
+            "query_export": self.query_export,
+            "spectrum_plot_mount": self.spectrum_plot_mount,
+        }
+
+    def fetch(self, measure: Measurement) -> None:
+        """Downloads all line lists, one after the other."""
+        with measure():
+            for element in self.elements:
+                with fetch.stream_nist_data(element) as lines:
+                    for _ in lines:
+                        pass
+
+    def fetch_concurrent(self, measure: Measurement) -> None:
+        """Downloads all line lists in parallel."""
+
+        async def fetch_all() -> None:
+            async with httpx.AsyncClient() as client:
+                await asyncio.gather(
+                    *(
+                        fetch.fetch_nist_data_async(client, element)
+                        for element in self.elements
+                    )
+                )
+
+        with measure():
+            asyncio.run(fetch_all())
+
+    def fetch_wavelength_range(self, measure: Measurement) -> None:
+        """Downloads the lines of all elements within a 40 nm range."""
+        with measure():
+            for element in self.elements:
+                with fetch.stream_nist_data(element, (380.0, 420.0)) as lines:
+                    for _ in lines:
+                        pass
+
+    def parse(self, measure: Measurement) -> None:
+        """Parses all line lists, including the numeric sanitization."""
+        with measure():
+            for payload in self.payloads.values():
+                nist_parser.parse_nist_lines(io.StringIO(payload))
+
+    def sanitize_numeric(self, measure: Measurement) -> None:
+        """Extracts the numbers from the annotated columns."""
+        raw = [
+            df.drop(columns=nist_parser.ANNOTATED_COLUMNS).rename(
+                columns={f"{col}_": col for col in nist_parser.ANNOTATED_COLUMNS}
+            )
+            for df in self.parsed.values()
+        ]
+        with measure():
+            for df in raw:
+                nist_parser.sanitize_annotated_columns(df)
+
+    def rgb_colors(self, measure: Measurement) -> None:
+        """Calculates the colors of all lines."""
+        wavelengths = [df["wavelength"].to_numpy() for df in self.processed.values()]
+        lookup_table = data.get_rgb_lookup_table()
+        with measure():
+            for values in wavelengths:
+                lookup_table(values)
+
+    def load_cached(self, measure: Measurement) -> None:
+        """Loads the processed data of all elements from the line store."""
+        spectrum = data.NistSpectralLines()
+        with measure():
+            for element in self.elements:
+                spectrum.load_data_from_nist(element)
+
+    def load_cached_compact(self, measure: Measurement) -> None:
+        """Loads the data of all elements using compact dtypes."""
+        spectrum = data.NistSpectralLines(compact=True)
+        with measure():
+            for element in self.elements:
+                spectrum.load_data_from_nist(element)
+
+    def filtered_dataframe_cold(self, measure: Measurement) -> None:
+        """Merges, sorts and filters the data of all elements."""
+        spectrum = data.NistSpectralLines()
+        with measure():
+            spectrum._get_filtered_dataframe(
+                self.filters, columns=DISPLAY_COLUMNS + ["r", "g", "b"]
+            )
+
+    def filtered_dataframe_warm(self, measure: Measurement) -> None:
+        """Filters the merged data again after changing a filter."""
+        spectrum = data.NistSpectralLines()
+        columns = DISPLAY_COLUMNS + ["r", "g", "b"]
+        spectrum._get_filtered_dataframe(self.filters, columns=columns)
+        filters = data.DataFilters(elements=self.filters.elements)
+        filters.intens.min = 100
+        with measure():
+            spectrum._get_filtered_dataframe(filters, columns=columns)
+
+    def filtered_lines_live(self, measure: Measurement) -> None:
+        """Filters the lines for the table again while a filter is edited."""
+        spectrum = data.NistSpectralLines(compact=True)
+        spectrum.get_filtered_lines(self.filters)
+        filters = data.DataFilters(elements=self.filters.elements)
+        filters.intens.min = 100
+        with measure():
+            filtered_lines = spectrum.get_filtered_lines(filters)
+            filtered_lines.get_page(0, 100, DISPLAY_COLUMNS + ["r", "g", "b"])
+
+    def get_display_rows(self, measure: Measurement) -> None:
+        """Formats all lines for the table."""
+        spectrum = data.NistSpectralLines()
+        spectrum.get_display_frame(DISPLAY_COLUMNS, self.filters)
+        with measure():
+            for _ in spectrum.get_display_rows(DISPLAY_COLUMNS, self.filters):
+                pass
+
+    def get_spectral_lines(self, measure: Measurement) -> None:
+        """Formats all lines for the spectrum plot."""
+        spectrum = data.NistSpectralLines()
+        spectrum.get_wavelengths(self.filters)
+        with measure():
+            spectrum.get_spectral_lines(self.filters)
+
+    def query_export(self, measure: Measurement) -> None:
+        """Writes all lines as tab-separated values, a chunk at a time."""
+        spectrum = data.NistSpectralLines()
+        # Merge the data of all elements outside of the measured region
+        next(spectrum.query_lines(self.filters, chunk_size=1))
+        with open(os.devnull, "w") as file, measure():
+            export.write_rows(spectrum.query_lines(self.filters), file, "tsv")
+
+    def spectrum_plot_mount(self, measure: Measurement) -> None:
+        """Opens the spectrum plot and waits until it is drawn."""
+        spectral_lines = data.NistSpectralLines().get_spectral_lines(self.filters)
+
+        async def mount_plot() -> None:
+            app = App()
+            async with app.run_test(size=(160, 50)) as pilot:
+                with measure():
+                    await app.push_screen(SpectrumPlot(spectral_lines))
+                    await pilot.pause()
+                    await pilot.pause()
+
+        asyncio.run(mount_plot())
+
+
+def run_stage(stage: Stage, repeat: int) -> dict:
+    """Runs a stage a number of times and once more to measure its memory."""
+    timings = []
+    for _ in range(repeat):
+        measurement = Measurement(trace_memory=False)
+        stage(measurement)
+        timings.append(measurement.seconds)
+
+    measurement = Measurement(trace_memory=True)
+    tracemalloc.start()
+    try:
+        stage(measurement)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "min_seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "max_seconds": max(timings),
+        "repeat": repeat,
+        "peak_memory_bytes": measurement.peak_bytes,
+    }
+
+
+def get_metadata() -> dict:
+    try:
+        version = importlib.metadata.version("spectral-line-finder")
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "version": version,
+        "git_commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": importlib.metadata.version("pandas"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--elements",
+        default="H,Na,Fe,Ca",
+        help="comma-separated elements; H uses the hydrogen format",
+    )
+    parser.add_argument(
+        "--lines", type=int, default=50_000, help="number of lines per element"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="server latency in seconds"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stages", help="comma-separated stages to run (default: all)", default=None
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("benchmark-results.json"),
+        help="file to save the results to",
+    )
+    args = parser.parse_args()
+
+    elements = [element.strip() for element in args.elements.split(",")]
+    payloads = make_payloads(elements, args.lines, seed=args.seed)
+    results = {
+        "metadata": get_metadata(),
+        "parameters": {
+            "elements": elements,
+            "lines_per_element": args.lines,
+            "payload_bytes": sum(
+                len(payload.encode()) for payload in payloads.values()
+            ),
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "seed": args.seed,
+        },
+        "stages": {},
+    }
+
+    with (
+        serve_nist_payloads(payloads, latency=args.latency) as server,
+        tempfile.TemporaryDirectory() as store_dir,
+    ):
+        fetch.NIST_LINES_URL = server.lines_url
+        suite = BenchmarkSuite(payloads, server.lines_url, Path(store_dir))
+        stages = suite.stages
+        if args.stages:
+            stages = {name: stages[name] for name in args.stages.split(",")}
+        for name, stage in stages.items():
+            result = run_stage(stage, args.repeat)
+            results["stages"][name] = result
+            print(
+                f"{name:26} {result['min_seconds']:9.4f} s "
+                f"{result['peak_memory_bytes'] / 2**20:10.1f} MiB"
+            )
+
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,876 @@
+import enum
+import importlib.util
+import math
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated
+
 import typer
+from textual import work
 from textual.app import App, ComposeResult
 from textual.widgets import Footer, Header
 
+from spectral_line_finder import startup_profile
+from spectral_line_finder.exceptions import NistDataError
+from spectral_line_finder.filters import DataFilters
+from spectral_line_finder.instrumentation import instrumentation
+from spectral_line_finder.performance_panel import PerformancePanel
 from spectral_line_finder.spectral_lines_table import SpectralLinesTable
 
+if TYPE_CHECKING:
+    from spectral_line_finder.data import NistSpectralLines
+
 app = typer.Typer()
+cache_app = typer.Typer(help="Inspect and manage the cached line data.")
+app.add_typer(cache_app, name="cache")
+
+CACHE_LIST_COLUMNS = [
+    "element",
+    "rows",
+    "size_bytes",
+    "age_days",
+    "last_used_days",
+    "wavelengths",
+    "stale",
+]
 
 
 class FindLinesApp(App[None]):
     CSS_PATH = "app.tcss"
+    BINDINGS = [("p", "toggle_performance", "Performance")]
+
+    def __init__(self, service_url: str | None = None) -> None:
+        """Initializes the app.
+
+        Args:
+            service_url: The URL of a line service to get the lines from. If
+                None, the app loads the lines itself.
+        """
+        super().__init__()
+        self.service_url = service_url
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield Footer()
-        yield SpectralLinesTable()
+        yield SpectralLinesTable(service_url=self.service_url)
+        yield PerformancePanel()
 
     def on_mount(self) -> None:
         self.query_one(SpectralLinesTable).action_filter_data()
+        self.call_after_refresh(self.preload_modules)
+
+    async def on_unmount(self) -> None:
+        # Close the connections to NIST made by the event loop of the app
+        from spectral_line_finder.fetch import close_async_client
+
+        await close_async_client()
+
+    @work(thread=True, exclusive=True, group="preload")
+    def preload_modules(self) -> None:
+        """Imports the data handling modules once the first frame is shown.
+
+        The modules are only needed once the user has chosen the elements, so
+        they are not imported at startup, which makes the app appear faster.
+        """
+        import spectral_line_finder.data
+        import spectral_line_finder.spectrum_plot  # noqa: F401
+
+    def action_toggle_performance(self) -> None:
+        self.query_one(PerformancePanel).toggle()
+
+
+class OutputFormat(str, enum.Enum):
+    tsv = "tsv"
+    json = "json"
+
+
+class ExportFormat(str, enum.Enum):
+    tsv = "tsv"
+    csv = "csv"
+    jsonl = "jsonl"
+    parquet = "parquet"
+
+
+ElementsOption = Annotated[
+    list[str],
+    typer.Option(
+        "--element",
+        "-e",
+        help="Element to include, like Fe or Na. Repeat or separate by commas.",
+    ),
+]
+FiltersOption = Annotated[
+    list[str] | None,
+    typer.Option(
+        "--filter",
+        help="Range filter NAME=MIN:MAX, where NAME is one of sp_num, obs_wl, "
+        "intens, Ei or Ek. MIN or MAX may be omitted.",
+    ),
+]
+ColumnsOption = Annotated[
+    list[str] | None,
+    typer.Option("--column", "-c", help="Line column to include. Repeatable."),
+]
+
+
+@app.callback(invoke_without_command=True)
+def main(
+    ctx: typer.Context,
+    timing_log: Annotated[
+        Path | None,
+        typer.Option(help="Append the timings of all stages to this file as JSON."),
+    ] = None,
+    profile_startup: Annotated[
+        bool,
+        typer.Option(
+            "--profile-startup",
+            help="Show the slowest imports at startup of the app, then exit.",
+        ),
+    ] = False,
+    server: Annotated[
+        str | None,
+        typer.Option(
+            help="URL of a running line service (see the serve command) to get "
+            "the lines from, like http://127.0.0.1:8765.",
+        ),
+    ] = None,
+):
+    """Find spectral lines in the NIST Atomic Spectra Database.
+
+    Starts the interface, unless a command is given.
+    """
+    if ctx.invoked_subcommand is not None:
+        return
+    if profile_startup:
+        startup_profile.print_import_profile("spectral_line_finder.app")
+        return
+    if timing_log is not None:
+        instrumentation.enable(log_path=timing_log)
+    try:
+        FindLinesApp(service_url=server).run()
+    finally:
+        instrumentation.close()
+
+
+@app.command()
+def match(
+    peaks_file: Annotated[
+        Path,
+        typer.Argument(
+            help="File with measured peak wavelengths (nm) in the first column.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+    elements: ElementsOption,
+    tolerance: Annotated[
+        float, typer.Option(help="Maximum difference between a peak and a line.")
+    ] = 0.01,
+    ppm: Annotated[
+        bool,
+        typer.Option("--ppm", help="Tolerance in ppm of the peak, instead of nm."),
+    ] = False,
+    filters: FiltersOption = None,
+    columns: ColumnsOption = None,
+    output_format: Annotated[
+        OutputFormat, typer.Option("--format", help="Output format.")
+    ] = OutputFormat.tsv,
+    output: Annotated[
+        Path | None,
+        typer.Option("--output", "-o", help="Output file. Defaults to stdout."),
+    ] = None,
+):
+    """Match measured peaks against NIST spectral lines."""
+    from spectral_line_finder import data, peak_matching
+
+    data_filters = build_filters(elements, filters or [])
+    check_columns(columns or [])
+    peaks = peak_matching.read_peaks(peaks_file)
+
+    spectrum = data.NistSpectralLines()
+    try:
+        load_elements(spectrum, data_filters.elements.elements)
+        matches = spectrum.match_peaks(
+            peaks,
+            tolerance,
+            data_filters,
+            unit="ppm" if ppm else "nm",
+            columns=columns or None,
+        )
+        if output is None:
+            num_matches = peak_matching.write_matches(
+                matches, sys.stdout, output_format.value
+            )
+        else:
+            with open(output, "w", newline="") as file:
+                num_matches = peak_matching.write_matches(
+                    matches, file, output_format.value
+                )
+    except NistDataError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Found {num_matches} candidate lines for {len(peaks)} peaks.", err=True)
+
+
+@app.command()
+def query(
+    elements: ElementsOption,
+    filters: FiltersOption = None,
+    columns: ColumnsOption = None,
+    output_format: Annotated[
+        ExportFormat, typer.Option("--format", help="Output format.")
+    ] = ExportFormat.tsv,
+    output: Annotated[
+        Path | None,
+        typer.Option("--output", "-o", help="Output file. Defaults to stdout."),
+    ] = None,
+    blend_tolerance: Annotated[
+        float | None,
+        typer.Option(
+            min=0,
+            help="Maximum wavelength difference in nm between neighboring lines "
+            "of a blend, for the cluster column. [default: 0.005]",
+        ),
+    ] = None,
+    only_blends: Annotated[
+        bool,
+        typer.Option(
+            "--only-blends", help="Only export lines which are part of a blend."
+        ),
+    ] = False,
+):
+    """Export the spectral lines which pass the filters.
+
+    Lines with nearby wavelengths are grouped into blends. Add the cluster
+    column using `-c cluster` to number the blends.
+    """
+    from spectral_line_finder import data, export
+
+    data_filters = build_filters(elements, filters or [])
+    if blend_tolerance is not None:
+        data_filters.blends.tolerance = blend_tolerance
+    data_filters.blends.only_blends = only_blends
+    check_columns(columns or [], allow_computed=True)
+    if (
+        output_format == ExportFormat.parquet
+        and importlib.util.find_spec("pyarrow") is None
+    ):
+        raise typer.BadParameter(
+            "Parquet output requires pyarrow, install it using `pip install pyarrow`.",
+            param_hint="--format",
+        )
+    is_binary = output_format.value in export.BINARY_FORMATS
+
+    spectrum = data.NistSpectralLines()
+    try:
+        load_elements(
+            spectrum,
+            data_filters.elements.elements,
+            data_filters.get_wavelength_range(),
+        )
+        # The lines are written a chunk at a time, as they are read
+        lines = spectrum.query_lines(data_filters, columns or None)
+        if output is None:
+            num_lines = export.write_rows(
+                lines,
+                sys.stdout.buffer if is_binary else sys.stdout,
+                output_format.value,
+            )
+        else:
+            with (
+                open(output, "wb") if is_binary else open(output, "w", newline="")
+            ) as file:
+                num_lines = export.write_rows(lines, file, output_format.value)
+    except NistDataError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"Exported {num_lines} spectral lines.", err=True)
+
+
+@app.command()
+def serve(
+    host: Annotated[str, typer.Option(help="Address to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="Port to listen on.")] = 8765,
+):
+    """Serve spectral line queries to several clients over HTTP.
+
+    The data of all elements is kept in memory once, for all clients. Start
+    the interface with --server to show the lines of the service.
+    """
+    from spectral_line_finder import fetch, service
+
+    typer.echo(f"Serving spectral lines on http://{host}:{port}", err=True)
+    try:
+        fetch.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        pass
 
 
 @app.command()
-def main():
-    FindLinesApp().run()
+def identify(
+    peaks_file: Annotated[
+        Path,
+        typer.Argument(
+            help="File with measured peak wavelengths (nm) in the first column.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+    elements: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--element",
+            "-e",
+            help="Element to consider. Repeat or separate by commas. "
+            "Defaults to all cached elements.",
+        ),
+    ] = None,
+    tolerance: Annotated[
+        float, typer.Option(help="Maximum difference between a peak and a line.")
+    ] = 0.01,
+    ppm: Annotated[
+        bool,
+        typer.Option("--ppm", help="Tolerance in ppm of the peak, instead of nm."),
+    ] = False,
+    filters: FiltersOption = None,
+    top: Annotated[
+        int, typer.Option(help="Number of best species to show, 0 for all.")
+    ] = 20,
+    workers: Annotated[
+        int | None,
+        typer.Option(help="Number of worker processes. Defaults to the CPU count."),
+    ] = None,
+    output_format: Annotated[
+        OutputFormat, typer.Option("--format", help="Output format.")
+    ] = OutputFormat.tsv,
+):
+    """Rank elements and ionization stages by how well they explain peaks."""
+    from spectral_line_finder import data, peak_matching
+
+    data_filters = build_filters(elements or [], filters or [])
+    peaks = peak_matching.read_peaks(peaks_file)
+
+    spectrum = data.NistSpectralLines()
+    try:
+        load_elements(spectrum, data_filters.elements.elements)
+        scores = spectrum.identify_species(
+            peaks,
+            tolerance,
+            data_filters,
+            unit="ppm" if ppm else "nm",
+            max_workers=workers,
+        )
+    except NistDataError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    if top:
+        scores = scores.head(top)
+    if output_format == OutputFormat.json:
+        typer.echo(scores.to_json(orient="records", indent=2))
+    else:
+        typer.echo(scores.to_csv(sep="\t", index=False), nl=False)
+
+
+@app.command()
+def memory(
+    elements: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--element",
+            "-e",
+            help="Element to include. Repeat or separate by commas. "
+            "Defaults to all cached elements.",
+        ),
+    ] = None,
+    output_format: Annotated[
+        OutputFormat, typer.Option("--format", help="Output format.")
+    ] = OutputFormat.tsv,
+):
+    """Report the memory needed to keep the data of each element in memory."""
+    from spectral_line_finder import data
+
+    element_list = build_filters(elements or [], []).elements.elements or None
+    try:
+        report = data.NistSpectralLines().memory_report(element_list)
+    except NistDataError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    if output_format == OutputFormat.json:
+        typer.echo(report.to_json(orient="records", indent=2))
+    else:
+        typer.echo(report.to_csv(sep="\t", index=False), nl=False)
+    standard_bytes = report["standard_bytes"].sum()
+    compact_bytes = report["compact_bytes"].sum()
+    if standard_bytes:
+        typer.echo(
+            f"{len(report)} elements use {standard_bytes / 2**20:.1f} MiB, or "
+            f"{compact_bytes / 2**20:.1f} MiB in compact mode "
+            f"({1 - compact_bytes / standard_bytes:.0%} less).",
+            err=True,
+        )
+
+
+@app.command()
+def prefetch(
+    elements: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--element",
+            "-e",
+            help="Element to download. Repeat or separate by commas. "
+            "Defaults to all elements.",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int, typer.Option(help="Maximum number of simultaneous downloads.", min=1)
+    ] = 4,
+    rate: Annotated[
+        float,
+        typer.Option(help="Maximum number of requests per second, 0 for no limit."),
+    ] = 2.0,
+    retries: Annotated[
+        int, typer.Option(help="Number of retries of failed downloads.", min=0)
+    ] = 3,
+    refresh: Annotated[
+        bool,
+        typer.Option("--refresh", help="Download elements which are cached too."),
+    ] = False,
+    bundle: Annotated[
+        Path | None,
+        typer.Option(
+            help="Also write the data of the elements to this bundle file, which "
+            "can be imported on other machines using --from-bundle.",
+            dir_okay=False,
+        ),
+    ] = None,
+    from_bundle: Annotated[
+        Path | None,
+        typer.Option(
+            help="Import the data from this bundle file instead of downloading it.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+):
+    """Download the lines of many elements, to use them offline.
+
+    Elements which are cached already are skipped, so an interrupted prefetch
+    can be resumed by running it again.
+    """
+    from spectral_line_finder import data
+    from spectral_line_finder.prefetch import ELEMENTS
+
+    element_list = build_filters(elements or [], []).elements.elements
+
+    if from_bundle is not None:
+        try:
+            imported = data.line_store.import_bundle(from_bundle, element_list or None)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--from-bundle")
+        except KeyError as e:
+            raise typer.BadParameter(
+                f"Element {e} is not in the bundle.", param_hint="--element"
+            )
+        typer.echo(f"Imported {len(imported)} elements.", err=True)
+        return
+
+    failed = prefetch_elements(
+        element_list or ELEMENTS,
+        concurrency=concurrency,
+        rate=rate,
+        retries=retries,
+        refresh=refresh,
+        # Not all elements of the periodic table have data at NIST
+        allow_unavailable=not element_list,
+    )
+    if bundle is not None:
+        exported = data.line_store.export_bundle(
+            bundle,
+            [
+                element
+                for element in element_list or ELEMENTS
+                if element in data.line_store
+            ],
+        )
+        typer.echo(f"Wrote {len(exported)} elements to {bundle}.", err=True)
+    if failed:
+        typer.echo(
+            f"Failed to download {', '.join(failed)}. Run the command again to "
+            "retry, cached elements are skipped.",
+            err=True,
+        )
+        raise typer.Exit(code=1)
+
+
+@app.command("import")
+def import_files(
+    directory: Annotated[
+        Path,
+        typer.Argument(
+            help="Directory with line lists saved from the NIST website as "
+            "tab-separated text.",
+            exists=True,
+            file_okay=False,
+        ),
+    ],
+    pattern: Annotated[
+        str,
+        typer.Option(
+            help="Glob pattern of the files, like '**/*.tsv' to include subdirectories."
+        ),
+    ] = "*.tsv",
+    wavelengths: Annotated[
+        str | None,
+        typer.Option(
+            help="Wavelength range LOW:HIGH in nm of the line lists, if they "
+            "don't contain all lines of their elements.",
+        ),
+    ] = None,
+    workers: Annotated[
+        int | None,
+        typer.Option(help="Number of worker processes. Defaults to the CPU count."),
+    ] = None,
+):
+    """Import line lists from files into the cache, without contacting NIST."""
+    from spectral_line_finder import data, ingest
+
+    intervals = None
+    if wavelengths is not None:
+        low, _, upp = wavelengths.partition(":")
+        try:
+            intervals = [(float(low), float(upp))]
+        except ValueError:
+            intervals = []
+        if not intervals or intervals[0][0] >= intervals[0][1]:
+            raise typer.BadParameter(
+                f"Invalid range {wavelengths!r}, expected LOW:HIGH.",
+                param_hint="--wavelengths",
+            )
+
+    paths = ingest.find_line_files(directory, pattern)
+    if not paths:
+        typer.echo(f"No files matching {pattern!r} in {directory}.", err=True)
+        raise typer.Exit(code=1)
+    report = ingest.import_line_files(paths, data.line_store, intervals, workers)
+    for element, num_lines in report.num_lines.items():
+        num_files = len(report.files[element])
+        typer.echo(
+            f"{element}: {num_lines} lines from {num_files} "
+            f"{'file' if num_files == 1 else 'files'}",
+            err=True,
+        )
+    for path, error in report.errors.items():
+        typer.echo(f"{path}: {' '.join(error.split())}", err=True)
+    typer.echo(
+        f"Imported {sum(report.num_lines.values())} lines of "
+        f"{len(report.num_lines)} elements from {len(paths) - len(report.errors)} "
+        "files.",
+        err=True,
+    )
+    if report.errors:
+        raise typer.Exit(code=1)
+
+
+@cache_app.command("list")
+def list_cache(
+    output_format: Annotated[
+        OutputFormat, typer.Option("--format", help="Output format.")
+    ] = OutputFormat.tsv,
+):
+    """List the cached elements with their size and age."""
+    import pandas as pd
+
+    from spectral_line_finder import data
+
+    now = time.time()
+    entries = data.line_store.entries()
+    report = pd.DataFrame(
+        [
+            {
+                "element": entry.element,
+                "rows": entry.num_rows,
+                "size_bytes": entry.size_bytes,
+                "age_days": round((now - entry.created) / 86400, 2),
+                "last_used_days": round((now - entry.last_used) / 86400, 2),
+                "wavelengths": format_intervals(entry.intervals),
+                "stale": entry.is_stale,
+            }
+            for entry in entries
+        ],
+        columns=CACHE_LIST_COLUMNS,
+    )
+    if output_format == OutputFormat.json:
+        typer.echo(report.to_json(orient="records", indent=2))
+    else:
+        typer.echo(report.to_csv(sep="\t", index=False), nl=False)
+    total_mib = data.line_store.total_bytes() / 2**20
+    limit = data.line_store.max_bytes
+    limit_text = "" if limit is None else f" of at most {limit / 2**20:.0f} MiB"
+    typer.echo(
+        f"{len(entries)} elements use {total_mib:.1f} MiB{limit_text}.", err=True
+    )
+
+
+@cache_app.command()
+def warm(
+    elements: ElementsOption,
+    refresh: Annotated[
+        bool,
+        typer.Option("--refresh", help="Download elements which are cached too."),
+    ] = False,
+):
+    """Download elements which are missing, incomplete or stale."""
+    element_list = build_filters(elements, []).elements.elements
+    failed = prefetch_elements(element_list, refresh=refresh)
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@cache_app.command()
+def verify(
+    elements: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--element",
+            "-e",
+            help="Element to check. Repeat or separate by commas. "
+            "Defaults to all cached elements.",
+        ),
+    ] = None,
+    delete: Annotated[
+        bool, typer.Option("--delete", help="Remove the data which is invalid.")
+    ] = False,
+):
+    """Check that the cached data is complete and readable."""
+    from spectral_line_finder import data
+
+    element_list = build_filters(elements or [], []).elements.elements or sorted(
+        path.stem for path in data.line_store.directory.glob("*.lines")
+    )
+    invalid = []
+    for element in element_list:
+        problem = data.line_store.verify(element)
+        if problem is None:
+            typer.echo(f"{element}: ok", err=True)
+            continue
+        invalid.append(element)
+        if delete:
+            data.line_store.delete(element)
+            problem += ", removed"
+        typer.echo(f"{element}: {problem}", err=True)
+    typer.echo(
+        f"Checked {len(element_list)} elements, {len(invalid)} invalid.", err=True
+    )
+    if invalid and not delete:
+        raise typer.Exit(code=1)
+
+
+@cache_app.command()
+def clear(
+    elements: Annotated[
+        list[str] | None,
+        typer.Option(
+            "--element",
+            "-e",
+            help="Element to remove. Repeat or separate by commas.",
+        ),
+    ] = None,
+    stale: Annotated[
+        bool, typer.Option("--stale", help="Remove the elements which are stale.")
+    ] = False,
+    partial: Annotated[
+        bool,
+        typer.Option(
+            "--partial", help="Remove the elements with only some wavelengths."
+        ),
+    ] = False,
+    clear_all: Annotated[
+        bool, typer.Option("--all", help="Remove all cached elements.")
+    ] = False,
+):
+    """Remove cached elements, selected by name, staleness or completeness."""
+    from spectral_line_finder import data
+    from spectral_line_finder.intervals import FULL_RANGE
+
+    element_list = build_filters(elements or [], []).elements.elements
+    if not (element_list or stale or partial or clear_all):
+        raise typer.BadParameter(
+            "Select the elements to remove using --element, --stale, --partial "
+            "or --all."
+        )
+    removed = [
+        entry.element
+        for entry in data.line_store.entries()
+        if clear_all
+        or entry.element in element_list
+        or (stale and entry.is_stale)
+        or (partial and entry.intervals != [FULL_RANGE])
+    ]
+    for element in removed:
+        data.line_store.delete(element)
+    typer.echo(f"Removed {len(removed)} elements.", err=True)
+
+
+def build_filters(elements: list[str], filter_specs: list[str]) -> DataFilters:
+    """Builds data filters from command-line options.
+
+    Args:
+        elements: The element symbols, possibly separated by commas.
+        filter_specs: Range filters like "intens=100:" or "sp_num=1:2".
+
+    Returns:
+        The data filters.
+
+    Raises:
+        typer.BadParameter: If a filter is invalid.
+    """
+    filters = DataFilters()
+    filters.elements.elements = [
+        element.strip()
+        for value in elements
+        for element in value.split(",")
+        if element.strip()
+    ]
+    range_filters = {
+        name: getattr(filters, name)
+        for name in ("sp_num", "obs_wl", "intens", "Ei", "Ek")
+    }
+    for spec in filter_specs:
+        name, _, limits = spec.partition("=")
+        min_value, sep, max_value = limits.partition(":")
+        if name not in range_filters or not sep:
+            raise typer.BadParameter(
+                f"Invalid filter {spec!r}, expected NAME=MIN:MAX.",
+                param_hint="--filter",
+            )
+        try:
+            if min_value:
+                range_filters[name].min = float(min_value)
+            if max_value:
+                range_filters[name].max = float(max_value)
+        except ValueError:
+            raise typer.BadParameter(
+                f"Invalid limits in filter {spec!r}.", param_hint="--filter"
+            )
+    return filters
+
+
+def check_columns(columns: list[str], allow_computed: bool = False) -> None:
+    """Checks that columns given on the command line exist.
+
+    Args:
+        columns: The names of the columns.
+        allow_computed: Whether columns computed from the filtered lines, like
+            the cluster column, are allowed.
+
+    Raises:
+        typer.BadParameter: If a column is unknown.
+    """
+    from spectral_line_finder.data import NistSpectralLines
+
+    known_columns = NistSpectralLines.all_columns
+    if allow_computed:
+        known_columns = known_columns + NistSpectralLines.computed_columns
+    unknown_columns = set(columns) - set(known_columns)
+    if unknown_columns:
+        raise typer.BadParameter(
+            f"Unknown columns: {', '.join(sorted(unknown_columns))}",
+            param_hint="--column",
+        )
+
+
+def format_intervals(intervals: list[tuple[float, float]]) -> str:
+    """Formats wavelength intervals for the cache listing.
+
+    Args:
+        intervals: The sorted, disjoint intervals in nm.
+
+    Returns:
+        "all" for all wavelengths, or the intervals like "300-400,500-550".
+    """
+    if intervals == [(-math.inf, math.inf)]:
+        return "all"
+    return ",".join(f"{low:g}-{upp:g}" for low, upp in intervals)
+
+
+def prefetch_elements(
+    elements: list[str],
+    concurrency: int = 4,
+    rate: float = 2.0,
+    retries: int = 3,
+    refresh: bool = False,
+    allow_unavailable: bool = False,
+) -> list[str]:
+    """Downloads elements into the cache, reporting the progress on stderr.
+
+    Args:
+        elements: The element symbols.
+        concurrency: The maximum number of simultaneous downloads.
+        rate: The maximum number of requests per second, 0 for no limit.
+        retries: The number of retries of failed downloads.
+        refresh: Whether to download elements which are cached already.
+        allow_unavailable: Whether elements for which NIST has no data are
+            ignored, instead of counted as failed.
+
+    Returns:
+        The symbols of the elements which failed.
+    """
+    from spectral_line_finder import data, fetch
+
+    async def run() -> list[str]:
+        failed = []
+        async for result in data.NistSpectralLines().prefetch_elements(
+            elements,
+            max_concurrency=concurrency,
+            requests_per_second=rate,
+            max_retries=retries,
+            refresh=refresh,
+        ):
+            if result.status in ("failed", "unavailable"):
+                # Error pages of NIST span several lines
+                error = " ".join((result.error or "").split())
+                typer.echo(f"{result.element}: {result.status}: {error}", err=True)
+            else:
+                typer.echo(
+                    f"{result.element}: {result.num_lines} lines ({result.status})",
+                    err=True,
+                )
+            if result.status == "failed" or (
+                result.status == "unavailable" and not allow_unavailable
+            ):
+                failed.append(result.element)
+        return failed
+
+    return fetch.run(run())
+
+
+def load_elements(
+    spectrum: "NistSpectralLines",
+    elements: list[str],
+    wavelength_range: tuple[float, float] | None = None,
+) -> None:
+    """Makes sure the data of all elements is cached, fetching it in parallel.
+
+    Args:
+        spectrum: The spectral lines instance.
+        elements: The element symbols.
+        wavelength_range: The wavelength range in nm of the lines which are
+            needed. If None, all lines are needed.
+
+    Raises:
+        NistDataError: If the data of an element can't be fetched.
+    """
+
+    from spectral_line_finder import fetch
+
+    async def load() -> None:
+        async for _ in spectrum.load_data_from_nist_concurrently(
+            elements, wavelength_range=wavelength_range
+        ):
+            pass
+
+    fetch.run(load())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# The column with the blend of each line, which can be requested in addition
+# to the columns of the line data
+CLUSTER_COLUMN = "cluster"
+
+
+def cluster_lines(wavelengths: np.ndarray, tolerance: float) -> np.ndarray:
+    """Groups lines with nearby wavelengths into blends.
+
+    The wavelengths are swept once in order. A line joins the blend of the
+    previous line if their wavelengths differ by at most the tolerance, so a
+    blend may span more than the tolerance if it contains several lines. The
+    sweep only compares neighboring lines, so it takes linear time.
+
+    Args:
+        wavelengths: The wavelengths of the lines, sorted.
+        tolerance: The maximum difference in wavelength between neighboring
+            lines of a blend, in the unit of the wavelengths.
+
+    Returns:
+        The blend of each line, numbered from 1 by increasing wavelength, or
+        -1 for lines which are not blended. Lines without a wavelength are
+        never blended.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    if len(wavelengths) < 2:
+        return np.full(len(wavelengths), -1, dtype=np.int32)
+    # Comparisons with NaN are False, so missing wavelengths break blends
+    joins_previous = np.diff(wavelengths) <= tolerance
+    is_blended = np.zeros(len(wavelengths), dtype=bool)
+    is_blended[1:] = joins_previous
+    is_blended[:-1] |= joins_previous
+    # A blend starts at each blended line which doesn't join the previous line
+    starts_blend = is_blended.copy()
+    starts_blend[1:] &= ~joins_previous
+    clusters = np.cumsum(starts_blend, dtype=np.int32)
+    clusters[~is_blended] = -1
+    return clusters
+
+
+def get_blend_mask(
+    wavelengths: np.ndarray, mask: np.ndarray | None, tolerance: float
+) -> np.ndarray:
+    """Selects the lines passing a filter which are blended with each other.
+
+    Only lines passing the filter are grouped into blends, so a line is not
+    blended with lines which are filtered out.
+
+    Args:
+        wavelengths: The wavelengths of all lines, sorted.
+        mask: The mask of the lines passing the filter, or None if all lines
+            pass.
+        tolerance: The maximum difference in wavelength between neighboring
+            lines of a blend.
+
+    Returns:
+        The mask of the lines passing the filter which are part of a blend.
+    """
+    rows = np.arange(len(wavelengths)) if mask is None else np.flatnonzero(mask)
+    clusters = cluster_lines(wavelengths[rows], tolerance)
+    blend_mask = np.zeros(len(wavelengths), dtype=bool)
+    blend_mask[rows[clusters >= 0]] = True
+    return blend_mask
+
+
+def insert_cluster_column(
+    df: pd.DataFrame, columns: list[str], clusters: np.ndarray
+) -> pd.DataFrame:
+    """Adds the blends of lines as a column, in the requested position.
+
+    Args:
+        df: The lines, with the requested columns except the cluster column.
+            The frame is modified.
+        columns: The requested columns, including the cluster column.
+        clusters: The blend of each line, as returned by `cluster_lines()`.
+
+    Returns:
+        The lines, with the cluster column as an integer column which is
+        missing for lines that are not blended.
+    """
+    values = pd.Series(clusters, index=df.index, dtype="Int64").mask(clusters < 0)
+    df.insert(columns.index(CLUSTER_COLUMN), CLUSTER_COLUMN, values)
+    return df
@@ -1,11 +1,63 @@
+import os
+import re
+import shutil
+import warnings
 from pathlib import Path
 
-from diskcache import Cache
 from platformdirs import user_cache_dir
 
+from spectral_line_finder.line_store import LineStore
+
 # Get platform-specific cache directory
 # platformdirs handles Windows/macOS/Linux differences automatically
 cache_dir = Path(user_cache_dir(appname="spectral-line-finder"))
 
-# Create a single cache instance
-cache = Cache(str(cache_dir))
+# The database in which versions before the line store kept pickled frames
+LEGACY_CACHE_FILES = ["cache.db", "cache.db-wal", "cache.db-shm"]
+
+
+def _remove_legacy_cache(directory: Path) -> None:
+    """Removes the data cached by earlier versions, if it is still there."""
+    if not (directory / LEGACY_CACHE_FILES[0]).exists():
+        return
+    try:
+        # Large frames were stored in subdirectories like "3f/a0"
+        for path in directory.iterdir():
+            if path.is_dir() and re.fullmatch("[0-9a-f]{2}", path.name):
+                shutil.rmtree(path)
+        # The database goes last, so that an interrupted removal is retried
+        for name in reversed(LEGACY_CACHE_FILES):
+            (directory / name).unlink(missing_ok=True)
+    except OSError:
+        # Another process, like an older version, may still use the database
+        pass
+
+
+_remove_legacy_cache(cache_dir)
+
+
+def _get_env_number(name: str, default: float) -> float | None:
+    """Reads a limit from an environment variable, where 0 means no limit."""
+    try:
+        value = float(os.environ.get(name, default))
+    except ValueError:
+        warnings.warn(
+            f"Ignoring {name}, which is not a number. Using {default} instead.",
+            stacklevel=2,
+        )
+        value = default
+    return value or None
+
+
+# The maximum size of the line data in MiB, and the number of days after which
+# data is fetched again in the background
+max_size_mib = _get_env_number("SPECTRAL_LINE_FINDER_CACHE_MAX_MIB", 2048)
+ttl_days = _get_env_number("SPECTRAL_LINE_FINDER_CACHE_TTL_DAYS", 30)
+
+# Processed spectral line data is stored in a columnar format, one file per
+# element
+line_store = LineStore(
+    cache_dir / "lines",
+    max_bytes=None if max_size_mib is None else int(max_size_mib * 2**20),
+    ttl=None if ttl_days is None else ttl_days * 24 * 3600,
+)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Text columns with few distinct values, which are stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "element",
+    "Acc",
+    "conf_i",
+    "term_i",
+    "J_i",
+    "conf_k",
+    "term_k",
+    "J_k",
+    "Type",
+    "tp_ref",
+    "line_ref",
+]
+
+# Numeric columns whose values have at most a few significant digits, so that
+# they are represented exactly enough by single precision floats. Wavelengths
+# and energy levels are given with up to nine significant digits and are kept
+# in double precision.
+FLOAT32_COLUMNS = ["unc_obs_wl", "unc_ritz_wl", "intens", "Aki(s^-1)"]
+
+# Color components are in the range [0, 255]
+COLOR_COLUMNS = ["r", "g", "b"]
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts processed spectral line data to compact dtypes.
+
+    Repeated strings are stored as categoricals, colors as unsigned bytes and
+    numeric columns with few significant digits as single precision floats.
+    Columns which are already compact are left as they are.
+
+    Args:
+        df: The processed spectral line data.
+
+    Returns:
+        The data using compact dtypes.
+    """
+    converted = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in CATEGORICAL_COLUMNS and not isinstance(dtype, pd.CategoricalDtype):
+            converted[col] = to_text_categorical(df[col])
+        elif col in FLOAT32_COLUMNS and dtype.kind in "iuf" and dtype != np.float32:
+            converted[col] = df[col].astype(np.float32)
+        elif col in COLOR_COLUMNS and dtype != np.uint8:
+            converted[col] = df[col].astype(np.uint8)
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def to_text_categorical(values: pd.Series) -> pd.Series:
+    """Converts values to a categorical with text categories.
+
+    Columns which only contain numbers, or no values at all, are read as
+    numeric columns for some elements. Their categories are converted to text
+    as well, so they can be combined with the categories of other elements.
+
+    Args:
+        values: The values of a text column.
+
+    Returns:
+        The categorical values.
+    """
+    values = values.astype("category")
+    categories = values.cat.categories
+    if categories.dtype != object:
+        values = values.cat.rename_categories(categories.astype(str).tolist())
+    return values
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Returns the memory usage of a dataframe, including its strings.
+
+    Args:
+        df: The dataframe.
+
+    Returns:
+        The memory usage in bytes.
+    """
+    return int(df.memory_usage(deep=True, index=False).sum())
@@ -1,282 +1,1122 @@
+import asyncio
+import copy
+import functools
 import importlib.resources
 import io
-from dataclasses import dataclass, field, fields
-from typing import Any, Generator, TypeAlias
+import itertools
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, fields, replace
+from typing import Any, AsyncGenerator, Generator, Protocol, TypeAlias
 
 import httpx
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
+from rich.style import Style
 from rich.text import Text
 
-from spectral_line_finder.cache import cache
+from spectral_line_finder import blends, identification, peak_matching, prefetch
+from spectral_line_finder.blends import CLUSTER_COLUMN
+from spectral_line_finder.cache import line_store
+from spectral_line_finder.compact import (
+    CATEGORICAL_COLUMNS,
+    compact_frame,
+    memory_usage,
+)
+from spectral_line_finder.exceptions import NoLinesError
+from spectral_line_finder.fetch import (
+    MAX_CONCURRENT_REQUESTS,
+    NistDataError,
+    SingleFlight,
+    fetch_nist_data_async,
+    get_async_client,
+    stream_nist_data,
+)
+from spectral_line_finder.filter_engine import FilterEngine, RangeFilterState
+from spectral_line_finder.filters import (
+    DataFilters,
+    ElementFilter,
+    IntegerMinMaxFilter,
+    MinMaxFilter,
+    MinMaxNanFilter,
+)
+from spectral_line_finder.instrumentation import instrumentation
+from spectral_line_finder.intervals import (
+    FULL_RANGE,
+    Interval,
+    covers,
+    merge_intervals,
+    missing_intervals,
+)
+from spectral_line_finder.merged_frames import MergedFrameCache
+from spectral_line_finder.nist_parser import COLUMNS, RAW_COLUMNS, parse_nist_lines
+from spectral_line_finder.peak_matching import ToleranceUnit
+from spectral_line_finder.prefetch import PrefetchResult, PrefetchStatus
 
 SpectralLines: TypeAlias = list[tuple[float, str]]
 
+# Columns added to the parsed data by `NistSpectralLines._process_nist_data()`
+DERIVED_COLUMNS = ["wavelength", "r", "g", "b"]
 
-@dataclass
-class ElementFilter:
-    elements: list[str]
+MEMORY_REPORT_COLUMNS = [
+    "element",
+    "rows",
+    "standard_bytes",
+    "compact_bytes",
+    "raw_bytes",
+]
 
+# Number of lines per chunk returned by `NistSpectralLines.query_lines()`
+QUERY_CHUNK_SIZE = 10_000
 
-@dataclass
-class MinMaxFilter:
-    col_name: str
-    min: float | None = None
-    max: float | None = None
+# Serializes adding fetched wavelength ranges to the line store, so that
+# concurrent fetches for the same element don't overwrite each other
+_add_lines_lock = threading.Lock()
 
+# Elements whose stale lines are being fetched again
+_revalidating: set[str] = set()
+_revalidating_lock = threading.Lock()
 
-@dataclass
-class MinMaxNanFilter:
-    col_name: str
-    min: float | None = None
-    max: float | None = None
-    show_nan: bool = True
+# Shares downloads between concurrent loads of the same element and range
+_fetches: SingleFlight[pd.DataFrame] = SingleFlight("nist.fetch")
 
 
-@dataclass
-class IntegerMinMaxFilter:
-    col_name: str
-    min: int | None = None
-    max: int | None = None
+class LineSnapshot(Protocol):
+    """Interface of a snapshot of the lines which pass a set of filters.
 
-    def __setattr__(self, name: str, value: Any) -> None:
-        if name in ("min", "max") and value is not None:
-            value = int(value)
-        super().__setattr__(name, value)
+    It is implemented by `FilteredLines`, and by `service.RemoteFilteredLines`
+    for snapshots kept by a line service.
+    """
 
+    version: int
+    filters: DataFilters
+
+    def __len__(self) -> int: ...
+
+    def get_page(self, start: int, stop: int, columns: list[str]) -> pd.DataFrame: ...
+
+    @property
+    def wavelengths(self) -> np.ndarray: ...
+
+    @property
+    def colors(self) -> np.ndarray: ...
 
-@dataclass
-class DataFilters:
-    elements: ElementFilter = field(default_factory=lambda: ElementFilter([]))
-    sp_num: IntegerMinMaxFilter = field(
-        default_factory=lambda: IntegerMinMaxFilter(col_name="sp_num")
-    )
-    obs_wl: MinMaxNanFilter = field(
-        default_factory=lambda: MinMaxNanFilter(col_name="obs_wl(nm)")
-    )
-    intens: MinMaxNanFilter = field(
-        default_factory=lambda: MinMaxNanFilter(col_name="intens")
-    )
-    Ei: MinMaxFilter = field(default_factory=lambda: MinMaxFilter(col_name="Ei(eV)"))
-    Ek: MinMaxFilter = field(default_factory=lambda: MinMaxFilter(col_name="Ek(eV)"))
 
+@dataclass(eq=False)
+class FilteredLines:
+    """Snapshot of the spectral lines which pass a set of filters.
 
-class NistDataError(Exception):
-    """Custom exception for errors when fetching data from NIST."""
+    A snapshot is shared by all views of the data, like the table, the
+    spectrum plot and jumping to a wavelength, so the filters are only applied
+    once. Only the positions of the lines passing the filters are stored, so a
+    snapshot is cheap to create. The lines themselves are read a page at a
+    time using `get_page()`. Snapshots must not be modified.
+    """
+
+    # Increases with every new snapshot
+    version: int
+    # A copy of the filters which were applied
+    filters: DataFilters
+    # The lines of all selected elements, sorted by wavelength, or None if no
+    # elements are selected. The frame is shared with the merged frame cache.
+    lines: pd.DataFrame | None
+    # The positions of the lines which pass the filters, or None if all lines
+    # pass
+    rows: np.ndarray | None
+
+    def __len__(self) -> int:
+        if self.lines is None:
+            return 0
+        return len(self.lines) if self.rows is None else len(self.rows)
+
+    def get_page(self, start: int, stop: int, columns: list[str]) -> pd.DataFrame:
+        """Returns a range of the filtered lines.
 
-    pass
+        Args:
+            start: The position of the first line.
+            stop: The position after the last line.
+            columns: The columns to return, which may include the cluster
+                column with the blend of each line.
+
+        Returns:
+            The lines in the range, with the given columns.
+        """
+        if self.lines is None:
+            return pd.DataFrame(columns=columns)
+        rows = slice(start, stop) if self.rows is None else self.rows[start:stop]
+        if CLUSTER_COLUMN not in columns:
+            return self.lines.iloc[rows][columns]
+        page = self.lines.iloc[rows][[c for c in columns if c != CLUSTER_COLUMN]]
+        return blends.insert_cluster_column(page, columns, self.clusters[start:stop])
+
+    @functools.cached_property
+    def wavelengths(self) -> np.ndarray:
+        """The sorted wavelengths of the lines."""
+        return self._take(["wavelength"]).reshape(-1)
+
+    @functools.cached_property
+    def colors(self) -> np.ndarray:
+        """An (N, 3) array with the red, green and blue components (0-255)."""
+        return self._take(["r", "g", "b"])
+
+    @functools.cached_property
+    def clusters(self) -> np.ndarray:
+        """The blend of each line, see `blends.cluster_lines()`."""
+        with instrumentation.stage("blends.cluster", rows=len(self)):
+            return blends.cluster_lines(self.wavelengths, self.filters.blends.tolerance)
+
+    def _take(self, columns: list[str]) -> np.ndarray:
+        if self.lines is None:
+            return np.empty((0, len(columns)))
+        values = self.lines[columns].to_numpy()
+        return values if self.rows is None else values[self.rows]
 
 
 class NistSpectralLines:
-    all_columns = [
-        "element",
-        "sp_num",
-        "obs_wl(nm)",
-        "unc_obs_wl",
-        "ritz_wl_vac(nm)",
-        "unc_ritz_wl",
-        "intens",
-        "Aki(s^-1)",
-        "Acc",
-        "Ei(eV)",
-        "Ek(eV)",
-        "conf_i",
-        "term_i",
-        "J_i",
-        "conf_k",
-        "term_k",
-        "J_k",
-        "Type",
-        "tp_ref",
-        "line_ref",
-    ]
+    all_columns = COLUMNS
+    # Columns computed from the filtered lines, which can be requested from
+    # `query_lines()` and `FilteredLines.get_page()` in addition to all columns
+    computed_columns = [CLUSTER_COLUMN]
 
-    def _load_nist_data_for_h(self, data: str) -> pd.DataFrame:
-        """Loads NIST data for Hydrogen, handling its special format.
+    def __init__(self, compact: bool = False) -> None:
+        """Initializes the spectral lines.
 
         Args:
-            data: Raw data from the NIST service.
+            compact: Whether to keep the data in memory using compact dtypes,
+                see `compact.compact_frame()`. In compact mode, the raw values
+                of the annotated columns are only loaded when requested.
+        """
+        self.compact = compact
+        self._merged_frames = MergedFrameCache()
+        # Frames of elements which are only partly cached contain just the
+        # lines within some wavelength ranges, so they are kept separately
+        self._range_frames = MergedFrameCache()
+        self._range_frames_range: Interval | None = None
+        self._range_frames_lock = threading.Lock()
+        self._filter_engine = FilterEngine()
+        self._filtered_lines: FilteredLines | None = None
+        self._filtered_lines_versions = itertools.count(1)
+        self._filtered_lines_lock = threading.Lock()
+
+    def load_data_from_nist(
+        self,
+        element: str,
+        columns: list[str] | None = None,
+        wavelength_range: Interval | None = None,
+    ) -> pd.DataFrame:
+        """Fetches and parses spectral line data from NIST for a given element.
+
+        The processed data is stored in the line store, so that subsequent
+        calls only read the requested columns from disk. If a wavelength range
+        is given, only the parts of the range which are not cached yet are
+        fetched.
+
+        Args:
+            element: The symbol of the element to fetch data for (e.g., "H", "He").
+            columns: The columns to return. If None, all columns are returned.
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
 
         Returns:
-            A pandas DataFrame with parsed spectral data for Hydrogen.
+            A pandas DataFrame with processed spectral data. In compact mode,
+            all columns except the raw columns are returned by default. If a
+            wavelength range is given, the data contains at least all lines
+            within the range, and possibly lines outside of it.
+
+        Raises:
+            NistDataError: If the NIST website returns an error page.
         """
-        # Find and skip header rows, which start with "obs_wl" for H
-        rows_to_skip = [
-            idx for idx, row in enumerate(data.splitlines()) if row.startswith("obs_wl")
-        ]
-
-        df = pd.read_csv(
-            io.StringIO(data),
-            delimiter="\t",
-            header=None,
-            names=self.all_columns[2:],
-            usecols=range(18),
-            skiprows=rows_to_skip,
+        if self.compact and columns is None:
+            columns = COLUMNS + DERIVED_COLUMNS
+        with instrumentation.stage("line_store.load", element=element) as record:
+            try:
+                # The store may hold only some wavelength ranges of the element
+                if not self.is_cached(element, wavelength_range):
+                    raise KeyError(element)
+                df = line_store.load(
+                    element,
+                    columns,
+                    categorical_columns=CATEGORICAL_COLUMNS if self.compact else (),
+                )
+            except KeyError:
+                record["cache"] = "miss"
+                instrumentation.count("line_store.miss")
+            else:
+                record["cache"] = "hit"
+                record["rows"] = len(df)
+                instrumentation.count("line_store.hit")
+                if line_store.is_stale(element):
+                    # Use the stale lines while fetching them again
+                    record["stale"] = True
+                    instrumentation.count("line_store.stale")
+                    self._revalidate(element)
+                return compact_frame(df) if self.compact else df
+        # Concurrent loads of the same data, like by the table and the
+        # spectrum plot, share a single download
+        df = _fetches.do(
+            (element, wavelength_range),
+            functools.partial(self._fetch_lines, element, wavelength_range),
         )
-        df["element"] = "H"
-        df["sp_num"] = "1"
-        # Reorder columns to be consistent with data from other elements.
-        return df[self.all_columns]
+        if columns is not None:
+            df = df[columns]
+        return compact_frame(df) if self.compact else df
 
-    def _load_nist_data_generic(self, data: str) -> pd.DataFrame:
-        """Loads NIST data for any element except Hydrogen.
+    def _fetch_lines(
+        self, element: str, wavelength_range: Interval | None
+    ) -> pd.DataFrame:
+        """Fetches the lines of an element which are missing in the line store.
 
         Args:
-            data: Raw data from the NIST service.
+            element: The symbol of the element (e.g., "H", "He").
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
 
         Returns:
-            A pandas DataFrame with parsed spectral data.
+            All stored lines of the element.
         """
-        # Find header rows, interspersed in the data
-        rows_to_skip = [
-            idx
-            for idx, row in enumerate(data.splitlines())
-            if row.startswith("element")
-        ][1:]
-
-        return pd.read_csv(
-            io.StringIO(data),
-            delimiter="\t",
-            usecols=range(20),
-            skiprows=rows_to_skip,
+        # Another call may have fetched the lines just before this one started
+        if self.is_cached(element, wavelength_range):
+            return line_store.load(element)
+        if wavelength_range is None:
+            with instrumentation.stage(
+                "nist.fetch_and_parse", element=element
+            ) as record:
+                with stream_nist_data(element) as lines:
+                    df = self._process_nist_data(lines)
+                record["rows"] = len(df)
+            with instrumentation.stage("line_store.save", element=element):
+                line_store.save(element, df)
+            return df
+
+        gaps = missing_intervals(line_store.cached_intervals(element), wavelength_range)
+        dfs = []
+        for gap in gaps:
+            with instrumentation.stage(
+                "nist.fetch_and_parse", element=element
+            ) as record:
+                try:
+                    with stream_nist_data(element, gap) as lines:
+                        dfs.append(self._process_nist_data(lines))
+                except NoLinesError:
+                    continue
+                record["rows"] = len(dfs[-1])
+        with instrumentation.stage("line_store.save", element=element):
+            return self._add_lines(element, gaps, dfs)
+
+    def _add_lines(
+        self, element: str, intervals: list[Interval], dfs: list[pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Adds the lines fetched for wavelength intervals to the line store.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+            intervals: The wavelength intervals which were fetched.
+            dfs: The processed lines of the intervals which contain lines.
+
+        Returns:
+            All stored lines of the element.
+        """
+        with _add_lines_lock:
+            cached = line_store.cached_intervals(element)
+            created = None
+            if cached:
+                try:
+                    # The age of the data is the age of its oldest part
+                    created = line_store.read_header(element)["created"]
+                    dfs = [line_store.load(element), *dfs]
+                except (OSError, ValueError, KeyError):
+                    cached = []
+            if cached == [FULL_RANGE]:
+                # All lines were fetched in the meantime
+                return dfs[0]
+            dfs = [df for df in dfs if len(df)]
+            if dfs:
+                # Lines at the bounds of an interval are fetched with both
+                # neighboring intervals
+                df = pd.concat(dfs, ignore_index=True).drop_duplicates(
+                    subset=COLUMNS, ignore_index=True
+                )
+            else:
+                df = self._process_nist_data(["\t".join(COLUMNS)])
+            line_store.save(
+                element, df, merge_intervals([*cached, *intervals]), created
+            )
+            return df
+
+    def _revalidate(self, element: str) -> None:
+        """Fetches the stored lines of an element again in the background.
+
+        Until the new lines are stored, the stale lines are used. Only one
+        revalidation per element runs at a time.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+        """
+        with _revalidating_lock:
+            if element in _revalidating:
+                return
+            _revalidating.add(element)
+
+        def revalidate() -> None:
+            try:
+                with instrumentation.stage("line_store.revalidate", element=element):
+                    self._refetch_lines(element)
+                instrumentation.count("line_store.revalidated")
+            except Exception:
+                # Keep using the stale lines, and try again on the next load
+                instrumentation.count("line_store.revalidate_failed")
+            finally:
+                with _revalidating_lock:
+                    _revalidating.discard(element)
+
+        threading.Thread(
+            target=revalidate, name=f"revalidate-{element}", daemon=True
+        ).start()
+
+    def _refetch_lines(self, element: str) -> None:
+        """Fetches the stored wavelength intervals of an element again.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+        """
+        intervals = line_store.cached_intervals(element)
+        if intervals == [FULL_RANGE]:
+            with stream_nist_data(element) as lines:
+                df = self._process_nist_data(lines)
+        else:
+            dfs = []
+            for interval in intervals:
+                try:
+                    with stream_nist_data(element, interval) as lines:
+                        dfs.append(self._process_nist_data(lines))
+                except NoLinesError:
+                    continue
+            dfs = [df for df in dfs if len(df)]
+            if dfs:
+                df = pd.concat(dfs, ignore_index=True).drop_duplicates(
+                    subset=COLUMNS, ignore_index=True
+                )
+            else:
+                df = self._process_nist_data(["\t".join(COLUMNS)])
+        with _add_lines_lock:
+            # Don't drop lines which were added in the meantime
+            if line_store.cached_intervals(element) == intervals:
+                line_store.save(
+                    element, df, None if intervals == [FULL_RANGE] else intervals
+                )
+
+    def is_cached(self, element: str, wavelength_range: Interval | None = None) -> bool:
+        """Checks whether the data for an element is available in the cache.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
+
+        Returns:
+            True if the data can be loaded without contacting NIST.
+        """
+        return covers(
+            line_store.cached_intervals(element), wavelength_range or FULL_RANGE
         )
 
-    @cache.memoize()
-    def load_data_from_nist(self, element: str) -> pd.DataFrame:
-        """Fetches and parses spectral line data from NIST for a given element.
+    def are_cached(
+        self, elements: list[str], wavelength_range: Interval | None = None
+    ) -> bool:
+        """Checks whether the data for all elements is available in the cache.
 
         Args:
-            element: The symbol of the element to fetch data for (e.g., "H", "He").
+            elements: The symbols of the elements.
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
 
         Returns:
-            A pandas DataFrame with processed spectral data.
+            True if the data can be loaded without contacting NIST.
+        """
+        return all(self.is_cached(element, wavelength_range) for element in elements)
+
+    async def load_data_from_nist_concurrently(
+        self,
+        elements: list[str],
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        wavelength_range: Interval | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """Loads data for multiple elements, fetching uncached elements in parallel.
+
+        The data of all uncached elements is fetched at the same time using the
+        shared client of the event loop, see `fetch.get_async_client()`. Each
+        element is yielded as soon as its data is available in the cache, so
+        `load_data_from_nist()` returns immediately for that element.
+
+        Args:
+            elements: The symbols of the elements to load.
+            max_concurrency: The maximum number of simultaneous requests.
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If given, only the parts of the range which are not
+                cached yet are fetched.
+
+        Yields:
+            The symbols of the elements, in the order they become available.
 
         Raises:
-            NistDataError: If the NIST website returns an error page.
+            NistDataError: If the NIST website returns an error page for any of
+                the elements.
         """
-        url = f"https://physics.nist.gov/cgi-bin/ASD/lines1.pl?spectra={element}&output_type=0&low_w=&upp_w=&unit=1&de=0&plot_out=0&I_scale_type=1&format=3&line_out=0&remove_js=on&en_unit=1&output=0&bibrefs=1&page_size=15&show_obs_wl=1&show_calc_wl=1&unc_out=1&order_out=0&max_low_enrg=&show_av=2&max_upp_enrg=&tsb_value=0&min_str=&A_out=0&intens_out=on&max_str=&allowed_out=1&forbid_out=1&min_accur=&min_intens=&conf_out=on&term_out=on&enrg_out=on&J_out=on&submit=Retrieve+Data"
+        missing = []
+        for element in elements:
+            if self.is_cached(element, wavelength_range):
+                yield element
+            else:
+                missing.append(element)
+        if not missing:
+            return
 
-        response = httpx.get(url)
-        response.raise_for_status()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        client = get_async_client()
 
-        data = response.text
-        if "html" in response.headers.get("Content-Type", ""):
-            soup = BeautifulSoup(data, "html.parser")
-            for script in soup(["script", "style"]):
-                script.decompose()
-            text = soup.get_text(separator="\n", strip=True)
-            raise NistDataError(text)
+        async def fetch(
+            element: str, wavelength_range: Interval | None = None
+        ) -> pd.DataFrame:
+            async with semaphore:
+                with instrumentation.stage("nist.fetch", element=element) as record:
+                    data = await fetch_nist_data_async(
+                        client, element, wavelength_range
+                    )
+                    record["bytes"] = len(data)
+            # Parse in a thread to keep the event loop responsive
+            with instrumentation.stage("nist.parse", element=element) as record:
+                df = await asyncio.to_thread(self._process_nist_data, io.StringIO(data))
+                record["rows"] = len(df)
+            return df
 
-        if element == "H":
-            df = self._load_nist_data_for_h(data)
-        else:
-            df = self._load_nist_data_generic(data)
-
-        # The following steps sanitize columns that are supposed to be numeric
-        # but may contain extra non-numeric characters. For each of these
-        # columns, we extract the leading floating-point number and convert the
-        # column to a numeric type. We keep the original columns in the
-        # dataframe by appending an underscore to the name.
-        extract_columns = ["intens", "Ei(eV)", "Ek(eV)", "ritz_wl_vac(nm)"]
-        df = (
-            df.rename(columns={"obs_wl_vac(nm)": "obs_wl(nm)"})
-            .rename(columns={col: col + "_" for col in extract_columns})
-            .assign(
-                **{
-                    col: lambda x, col=col: x[col + "_"]
-                    .astype(str)
-                    .str.extract(r"(\d+\.?\d*)", expand=False)
-                    .pipe(pd.to_numeric)
-                    for col in extract_columns
-                }
+        async def fetch_lines(element: str) -> pd.DataFrame:
+            # Another call may have fetched the lines just before this one
+            if self.is_cached(element, wavelength_range):
+                return await asyncio.to_thread(line_store.load, element)
+            if wavelength_range is None:
+                df = await fetch(element)
+                with instrumentation.stage("line_store.save", element=element):
+                    await asyncio.to_thread(line_store.save, element, df)
+                return df
+
+            gaps = missing_intervals(
+                line_store.cached_intervals(element), wavelength_range
             )
-        )
+            dfs = []
+            for gap in gaps:
+                try:
+                    dfs.append(await fetch(element, gap))
+                except NoLinesError:
+                    pass
+            with instrumentation.stage("line_store.save", element=element):
+                return await asyncio.to_thread(self._add_lines, element, gaps, dfs)
+
+        async def load(element: str) -> str:
+            await _fetches.do_async(
+                (element, wavelength_range), functools.partial(fetch_lines, element)
+            )
+            return element
 
-        # Create a wavelength column preferring the ritz wavelength but using
-        # the observed wavelength if missing.
-        wavelength = df["ritz_wl_vac(nm)"].fillna(df["obs_wl(nm)"])
-        df["wavelength"] = wavelength
-        # Create rgb color values and add them to the dataframe
-        rgb_colors = wavelength.apply(wavelength_to_rgb)
-        df[["r", "g", "b"]] = pd.DataFrame(rgb_colors.to_list(), index=df.index)
+        tasks = [asyncio.create_task(load(element)) for element in missing]
+        try:
+            for next_loaded in asyncio.as_completed(tasks):
+                yield await next_loaded
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        return df
+    async def prefetch_elements(
+        self,
+        elements: list[str],
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        requests_per_second: float | None = prefetch.DEFAULT_REQUESTS_PER_SECOND,
+        max_retries: int = prefetch.DEFAULT_MAX_RETRIES,
+        refresh: bool = False,
+    ) -> AsyncGenerator[PrefetchResult, None]:
+        """Downloads all lines of many elements into the line store.
+
+        Elements whose lines are all cached, and not stale, are skipped, so an
+        interrupted prefetch continues where it stopped. Each element is
+        stored as soon as it is processed. Temporary failures are retried with
+        exponential backoff, and unlike `load_data_from_nist_concurrently()`,
+        a failing element doesn't stop the others.
+
+        Args:
+            elements: The symbols of the elements to download.
+            max_concurrency: The maximum number of simultaneous requests.
+            requests_per_second: The maximum rate at which requests are
+                started, including retries. If None, the rate is not limited.
+            max_retries: The maximum number of retries per element.
+            refresh: Whether to download elements which are cached already.
+
+        Yields:
+            The result for each element, in the order they are finished.
+        """
+        missing = []
+        for element in elements:
+            if (
+                not refresh
+                and element in line_store
+                and not line_store.is_stale(element)
+            ):
+                num_lines = line_store.read_header(element)["num_rows"]
+                yield PrefetchResult(element, "cached", num_lines)
+            else:
+                missing.append(element)
+        if not missing:
+            return
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        rate_limiter = prefetch.RateLimiter(requests_per_second)
+        limits = httpx.Limits(max_connections=max_concurrency)
+        async with httpx.AsyncClient(
+            limits=limits, timeout=prefetch.PREFETCH_TIMEOUT
+        ) as client:
+
+            async def load(element: str) -> PrefetchResult:
+                status: PrefetchStatus
+                try:
+                    async with semaphore:
+                        with instrumentation.stage(
+                            "nist.fetch", element=element
+                        ) as record:
+                            data = await prefetch.fetch_with_retries(
+                                client, element, rate_limiter, max_retries
+                            )
+                            record["bytes"] = len(data)
+                except NoLinesError:
+                    # Store the element without lines, so it isn't fetched again
+                    df = self._process_nist_data(["\t".join(COLUMNS)])
+                    status = "no_lines"
+                except NistDataError as e:
+                    return PrefetchResult(element, "unavailable", error=str(e))
+                except httpx.HTTPError as e:
+                    return PrefetchResult(
+                        element, "failed", error=str(e) or type(e).__name__
+                    )
+                else:
+                    with instrumentation.stage("nist.parse", element=element) as record:
+                        df = await asyncio.to_thread(
+                            self._process_nist_data, io.StringIO(data)
+                        )
+                        record["rows"] = len(df)
+                    status = "fetched"
+                with instrumentation.stage("line_store.save", element=element):
+                    await asyncio.to_thread(line_store.save, element, df)
+                return PrefetchResult(element, status, len(df))
+
+            tasks = [asyncio.create_task(load(element)) for element in missing]
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    yield await next_result
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def _process_nist_data(self, lines: Iterable[str]) -> pd.DataFrame:
+        """Parses and processes raw spectral line data from NIST.
+
+        Args:
+            lines: The lines of the raw data from the NIST service.
+
+        Returns:
+            A pandas DataFrame with processed spectral data.
+        """
+        return process_nist_lines(lines)
 
     def get_display_rows(
         self, display_columns: list[str], filters: DataFilters
     ) -> Generator[tuple[Text | str, ...], None, None]:
-        df = self._get_filtered_dataframe(filters)
+        df = self.get_display_frame(display_columns, filters)
         if df is None:
             return
+        yield from format_display_rows(df, display_columns)
+
+    def get_display_frame(
+        self, display_columns: list[str], filters: DataFilters
+    ) -> pd.DataFrame | None:
+        """Returns the filtered data needed to display the spectral lines.
+
+        The rows can be formatted for display, in whole or in part, using
+        `format_display_rows()`.
 
+        Args:
+            display_columns: The columns to display.
+            filters: The filters to apply.
+
+        Returns:
+            A dataframe with the display columns and the color columns, sorted
+            by wavelength, or None if no elements are selected.
+        """
         columns_to_fetch = display_columns + ["r", "g", "b"]
-        filtered_df = df[columns_to_fetch]
-        for _, row in filtered_df.iterrows():
-            r, g, b = row["r"], row["g"], row["b"]
-            color_swatch = Text("█████", style=f"rgb({r},{g},{b})")
-            display_values = tuple(
-                "" if pd.isna(row[c]) else str(row[c]) for c in display_columns
-            )
-            yield (color_swatch,) + display_values
-
-    def _get_filtered_dataframe(self, filters: DataFilters) -> pd.DataFrame | None:
-        # Read all elements
-        dfs = [
-            self.load_data_from_nist(element) for element in filters.elements.elements
-        ]
-        if not dfs:
+        df = self._get_filtered_dataframe(filters, columns=columns_to_fetch)
+        if df is None:
+            return None
+        return df[columns_to_fetch]
+
+    def get_filtered_lines(self, filters: DataFilters) -> FilteredLines:
+        """Returns a snapshot of the spectral lines which pass the filters.
+
+        The latest snapshot is reused until the filters, including the
+        selected elements, change. If the snapshot is requested from several
+        threads at once, the filters are applied only once.
+
+        Args:
+            filters: The filters to apply.
+
+        Returns:
+            The snapshot of the filtered lines, with all columns.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        with self._filtered_lines_lock:
+            if (snapshot := self.peek_filtered_lines(filters)) is not None:
+                instrumentation.count("filtered_lines.hit")
+                return snapshot
+            instrumentation.count("filtered_lines.miss")
+            self._filtered_lines = self.filter_lines(filters)
+            return self._filtered_lines
+
+    def filter_lines(self, filters: DataFilters) -> FilteredLines:
+        """Creates a new snapshot of the spectral lines which pass the filters.
+
+        Unlike `get_filtered_lines()`, the snapshot is neither reused nor
+        kept, so snapshots for different filters can be created in several
+        threads at once.
+
+        Args:
+            filters: The filters to apply.
+
+        Returns:
+            The snapshot of the filtered lines, with all columns.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        lines, mask = self._get_filter_mask(filters, columns=COLUMNS + DERIVED_COLUMNS)
+        return FilteredLines(
+            version=next(self._filtered_lines_versions),
+            filters=copy.deepcopy(filters),
+            lines=lines,
+            rows=None if mask is None else np.flatnonzero(mask),
+        )
+
+    def peek_filtered_lines(self, filters: DataFilters) -> FilteredLines | None:
+        """Returns the latest snapshot if it matches the filters, without waiting.
+
+        Args:
+            filters: The filters which should have been applied.
+
+        Returns:
+            The snapshot, or None if there is no snapshot for these filters.
+        """
+        snapshot = self._filtered_lines
+        if snapshot is not None and snapshot.filters == filters:
+            return snapshot
+        return None
+
+    def _get_filtered_dataframe(
+        self, filters: DataFilters, columns: list[str] | None = None
+    ) -> pd.DataFrame | None:
+        df, mask = self._get_filter_mask(filters, columns)
+        if df is None:
             return None
+        with instrumentation.stage("filter.take") as record:
+            # The merged frame may contain more columns than requested; only
+            # copy the requested ones.
+            if columns is None:
+                df = df if mask is None else df.loc[mask]
+            else:
+                columns = list(dict.fromkeys(columns + ["wavelength"]))
+                df = df[columns] if mask is None else df.loc[mask, columns]
+            record["rows"] = len(df)
+        return df
+
+    def _get_filter_mask(
+        self, filters: DataFilters, columns: list[str] | None = None
+    ) -> tuple[pd.DataFrame | None, np.ndarray | None]:
+        """Merges the data of the selected elements and applies the filters.
+
+        Args:
+            filters: The filters to apply.
+            columns: The columns which are needed. If None, all columns are
+                loaded.
 
-        # Stack them into a single dataframe
-        df = pd.concat(dfs, ignore_index=True).sort_values(by="wavelength")
+        Returns:
+            The merged data, sorted by wavelength, and a mask of the lines
+            which pass the filters, or None if all lines pass. The merged data
+            is None if no elements are selected. It may contain more columns
+            than requested and must not be modified.
+        """
+        if columns is not None:
+            # Only read the requested columns and the columns needed for
+            # sorting and filtering
+            filter_columns = [
+                filter.col_name
+                for filter in (getattr(filters, f.name) for f in fields(filters))
+                if hasattr(filter, "col_name")
+            ]
+            columns = list(dict.fromkeys(columns + ["wavelength"] + filter_columns))
+
+        # Stack all elements into a single dataframe, sorted by wavelength.
+        # If the filters restrict the wavelengths, only the lines within that
+        # range are needed from elements which are not fully cached.
+        elements = filters.elements.elements
+        wavelength_range = filters.get_wavelength_range()
+        if wavelength_range is not None and all(map(self.is_cached, elements)):
+            wavelength_range = None
+        with instrumentation.stage("merge", elements=len(elements)) as record:
+            df = self._get_merged_frames(wavelength_range).get(
+                elements,
+                columns,
+                functools.partial(
+                    self.load_data_from_nist, wavelength_range=wavelength_range
+                ),
+            )
+            record["rows"] = 0 if df is None else len(df)
+        if df is None:
+            return None, None
 
-        mask = pd.Series(True, index=df.index)
+        # Only the masks of filters which have changed are recomputed
+        range_filters = []
         for field_ in (f for f in fields(filters)):
             filter = getattr(filters, field_.name)
             if isinstance(filter, (MinMaxFilter, MinMaxNanFilter, IntegerMinMaxFilter)):
-                if filter.min is not None:
-                    mask &= df[filter.col_name] >= filter.min
-                if filter.max is not None:
-                    mask &= df[filter.col_name] <= filter.max
-            if isinstance(filter, MinMaxNanFilter):
-                if not filter.show_nan:
-                    mask &= df[filter.col_name].notna()
-        return df.loc[mask]
+                state = RangeFilterState(
+                    filter.col_name,
+                    filter.min,
+                    filter.max,
+                    getattr(filter, "show_nan", True),
+                )
+                range_filters.append((field_.name, state))
+        with instrumentation.stage("filter") as record:
+            mask = self._filter_engine.get_mask(df, range_filters)
+            record["rows"] = len(df) if mask is None else int(mask.sum())
+        if filters.blends.only_blends:
+            with instrumentation.stage("filter.blends") as record:
+                mask = blends.get_blend_mask(
+                    df["wavelength"].to_numpy(), mask, filters.blends.tolerance
+                )
+                record["rows"] = int(mask.sum())
+        return df, mask
+
+    def _get_merged_frames(self, wavelength_range: Interval | None) -> MergedFrameCache:
+        """Returns the cache of merged frames containing the lines in a range.
+
+        Args:
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed, or None if all lines are needed.
+
+        Returns:
+            The cache of the merged frames.
+        """
+        if wavelength_range is None:
+            return self._merged_frames
+        with self._range_frames_lock:
+            # Elements which are added to the frames are only loaded for the
+            # current range, so the frames are replaced whenever the range
+            # changes. Otherwise, frames of a narrower range could be reused
+            # for a wider range which they don't fully contain.
+            if wavelength_range != self._range_frames_range:
+                self._range_frames = MergedFrameCache()
+                self._range_frames_range = wavelength_range
+            return self._range_frames
 
     def get_spectral_lines(self, filters: DataFilters) -> SpectralLines:
-        df = self._get_filtered_dataframe(filters)
+        df = self._get_filtered_dataframe(
+            filters, columns=["wavelength", "r", "g", "b"]
+        )
         if df is not None:
-            return [
-                (row["wavelength"], f"#{row['r']:02x}{row['g']:02x}{row['b']:02x}")
-                for _, row in df.iterrows()
-            ]
+            with instrumentation.stage("spectral_lines", rows=len(df)):
+                return list(
+                    zip(
+                        df["wavelength"].tolist(),
+                        format_hex_colors(df["r"], df["g"], df["b"]).tolist(),
+                    )
+                )
         else:
             return []
 
+    def query_lines(
+        self,
+        filters: DataFilters,
+        columns: list[str] | None = None,
+        chunk_size: int = QUERY_CHUNK_SIZE,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """Returns the spectral lines which pass the filters, in chunks.
+
+        Only the positions of the lines passing the filters are determined
+        up front. Each chunk is copied from the merged data when it is
+        requested, so all lines can be written out using little extra memory.
+
+        Args:
+            filters: The filters to apply.
+            columns: The columns to return, which may include the cluster
+                column with the blend of each line. Defaults to all columns.
+            chunk_size: The maximum number of lines per chunk.
+
+        Yields:
+            The lines, sorted by wavelength, with the requested columns.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        if columns is None:
+            columns = self.all_columns
+        line_columns = [c for c in columns if c != CLUSTER_COLUMN]
+        df, mask = self._get_filter_mask(filters, line_columns)
+        if df is None:
+            return
+        rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+        clusters = None
+        if CLUSTER_COLUMN in columns:
+            with instrumentation.stage("blends.cluster", rows=len(rows)):
+                clusters = blends.cluster_lines(
+                    df["wavelength"].to_numpy()[rows], filters.blends.tolerance
+                )
+        column_positions = df.columns.get_indexer(pd.Index(line_columns))
+        for start in range(0, len(rows), chunk_size):
+            chunk = df.iloc[rows[start : start + chunk_size], column_positions]
+            chunk = chunk.reset_index(drop=True)
+            if clusters is not None:
+                blends.insert_cluster_column(
+                    chunk, columns, clusters[start : start + chunk_size]
+                )
+            yield chunk
+
+    def match_peaks(
+        self,
+        peaks: np.ndarray,
+        tolerance: float,
+        filters: DataFilters,
+        unit: ToleranceUnit = "nm",
+        columns: list[str] | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """Finds the candidate spectral lines for measured peaks.
+
+        Args:
+            peaks: The measured peak wavelengths in nm.
+            tolerance: The maximum difference between a peak and a line.
+            filters: The filters to apply to the spectral lines.
+            unit: The unit of the tolerance, either "nm" or "ppm" of the peak
+                wavelength.
+            columns: The columns of the lines to include in the matches.
+                Defaults to `peak_matching.DEFAULT_COLUMNS`.
+
+        Yields:
+            The matches, in chunks of peaks. See `peak_matching.match_peaks()`.
+        """
+        if columns is None:
+            columns = peak_matching.DEFAULT_COLUMNS
+        columns = list(dict.fromkeys(["wavelength", *columns]))
+        df = self._get_filtered_dataframe(filters, columns=columns)
+        if df is None:
+            return
+        yield from peak_matching.match_peaks(df[columns], peaks, tolerance, unit)
+
+    def identify_species(
+        self,
+        peaks: np.ndarray,
+        tolerance: float,
+        filters: DataFilters,
+        unit: ToleranceUnit = "nm",
+        max_workers: int | None = None,
+    ) -> pd.DataFrame:
+        """Ranks elements and ionization stages by how well they explain peaks.
+
+        Args:
+            peaks: The measured peak wavelengths in nm.
+            tolerance: The maximum difference between a peak and a line.
+            filters: The filters to apply to the spectral lines. If no
+                elements are selected, all cached elements are ranked.
+            unit: The unit of the tolerance, either "nm" or "ppm" of the peak
+                wavelength.
+            max_workers: The number of worker processes. Defaults to the
+                number of CPUs.
+
+        Returns:
+            The scores of all species, best first. See
+            `identification.identify_species()`.
+        """
+        if not filters.elements.elements:
+            filters = replace(filters, elements=ElementFilter(line_store.elements()))
+        columns = ["element", "sp_num", "wavelength", "intens"]
+        df = self._get_filtered_dataframe(filters, columns=columns)
+        if df is None:
+            return pd.DataFrame(columns=identification.RESULT_COLUMNS)
+        return identification.identify_species(
+            df[columns], peaks, tolerance, unit, max_workers
+        )
+
+    def memory_report(self, elements: list[str] | None = None) -> pd.DataFrame:
+        """Reports the memory needed to keep the data of each element in memory.
+
+        Data which is not cached yet is fetched from NIST.
+
+        Args:
+            elements: The symbols of the elements. Defaults to all cached
+                elements.
+
+        Returns:
+            A dataframe with the number of lines of each element, the memory
+            usage in bytes of all its columns using the standard dtypes and
+            in compact mode, and the memory usage of the raw columns, which
+            are only loaded on request in compact mode.
+        """
+        if elements is None:
+            elements = line_store.elements()
+        standard_lines = NistSpectralLines()
+        compact_lines = NistSpectralLines(compact=True)
+        rows = []
+        for element in elements:
+            standard = standard_lines.load_data_from_nist(element)
+            compact = compact_lines.load_data_from_nist(element)
+            rows.append(
+                (
+                    element,
+                    len(standard),
+                    memory_usage(standard),
+                    memory_usage(compact),
+                    memory_usage(standard[RAW_COLUMNS]),
+                )
+            )
+        return pd.DataFrame(rows, columns=MEMORY_REPORT_COLUMNS)
+
     def get_wavelengths(self, filters: DataFilters) -> pd.Series | None:
-        if (df := self._get_filtered_dataframe(filters)) is not None:
+        if (
+            df := self._get_filtered_dataframe(filters, columns=["wavelength"])
+        ) is not None:
             return df["wavelength"]
         else:
             return None
 
 
-# Load CIE 1931 2° Standard Observer data globally
-with importlib.resources.path(
-    "spectral_line_finder", "CIE_xyz_1931_2deg.csv"
-) as data_path:
-    cie_data = pd.read_csv(data_path, header=None, names=["wavelength", "X", "Y", "Z"])
+def process_nist_lines(lines: Iterable[str]) -> pd.DataFrame:
+    """Parses and processes raw spectral line data from NIST.
+
+    The numeric columns are sanitized, and the wavelength and color columns
+    are added, see `DERIVED_COLUMNS`.
+
+    Args:
+        lines: The lines of the raw tab-separated data, like the lines of a
+            response of the NIST service or of a saved line list.
+
+    Returns:
+        A pandas DataFrame with processed spectral data.
+    """
+    df = parse_nist_lines(lines)
+
+    # Create a wavelength column preferring the ritz wavelength but using
+    # the observed wavelength if missing.
+    wavelength = df["ritz_wl_vac(nm)"].fillna(df["obs_wl(nm)"])
+    df["wavelength"] = wavelength
+    # Create rgb color values and add them to the dataframe
+    rgb_colors = get_rgb_lookup_table()(wavelength.to_numpy())
+    df[["r", "g", "b"]] = rgb_colors
 
+    return df
 
-def wavelength_to_xyz(wavelength: float) -> tuple[float, float, float]:
+
+def format_display_rows(
+    df: pd.DataFrame, display_columns: list[str]
+) -> Generator[tuple[Text | str, ...], None, None]:
+    """Formats spectral lines for display in a table.
+
+    Each column is converted to strings at once, and a single style is created
+    for each distinct color.
+
+    Args:
+        df: The spectral lines, including the color columns.
+        display_columns: The columns to display.
+
+    Yields:
+        A color swatch followed by the display values of each line.
+    """
+    colors = _pack_rgb(df["r"], df["g"], df["b"])
+    unique_colors, color_indexes = np.unique(colors, return_inverse=True)
+    styles = [
+        Style.parse("rgb({},{},{})".format(*_unpack_rgb(c))) for c in unique_colors
+    ]
+    color_swatches = [Text("█████", style=styles[idx]) for idx in color_indexes]
+    display_values = [format_column(df[c]) for c in display_columns]
+    yield from zip(color_swatches, *display_values)
+
+
+def format_column(values: pd.Series) -> list[str]:
+    """Converts the values of a column to strings, for display.
+
+    Args:
+        values: The values of the column.
+
+    Returns:
+        The values as strings, with missing values as empty strings.
+    """
+    if values.dtype == np.float32:
+        # Format single precision values like the double precision values they
+        # were converted from, using their shortest decimal representation
+        values = values.astype(str).astype(np.float64)
+    strings = values.astype(str).to_numpy(dtype=object)
+    strings[values.isna().to_numpy()] = ""
+    return strings.tolist()
+
+
+def format_hex_colors(r: pd.Series, g: pd.Series, b: pd.Series) -> np.ndarray:
+    """Formats colors as hexadecimal color codes like "#ff8000".
+
+    Args:
+        r: The red components of the colors (0-255).
+        g: The green components of the colors (0-255).
+        b: The blue components of the colors (0-255).
+
+    Returns:
+        An array of color codes.
+    """
+    colors = _pack_rgb(r, g, b)
+    unique_colors, color_indexes = np.unique(colors, return_inverse=True)
+    codes = np.array([f"#{color:06x}" for color in unique_colors], dtype=object)
+    return codes[color_indexes]
+
+
+def _pack_rgb(r: pd.Series, g: pd.Series, b: pd.Series) -> np.ndarray:
+    return (
+        r.to_numpy(dtype=np.int64) << 16
+        | g.to_numpy(dtype=np.int64) << 8
+        | b.to_numpy(dtype=np.int64)
+    )
+
+
+def _unpack_rgb(color: int) -> tuple[int, int, int]:
+    return (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF
+
+
+@functools.cache
+def get_cie_data() -> pd.DataFrame:
+    """Returns the CIE 1931 2° Standard Observer data, reading it on first use."""
+    with importlib.resources.path(
+        "spectral_line_finder", "CIE_xyz_1931_2deg.csv"
+    ) as data_path:
+        return pd.read_csv(data_path, header=None, names=["wavelength", "X", "Y", "Z"])
+
+
+def __getattr__(name: str) -> Any:
+    # The CIE data used to be loaded when importing this module
+    if name == "cie_data":
+        return get_cie_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def wavelength_to_xyz(wavelength: float | np.ndarray) -> tuple[Any, Any, Any]:
     """Convert wavelength to CIE XYZ values using linear interpolation.
 
     Args:
-        wavelength: Wavelength in nanometers
+        wavelength: Wavelength in nanometers, either a single value or an array
+            of values.
 
     Returns:
-        The (X, Y, Z) values as a tuple.
+        The (X, Y, Z) values as a tuple. Each value has the shape of the input.
     """
+    cie_data = get_cie_data()
     x = np.interp(wavelength, cie_data["wavelength"], cie_data["X"])
     y = np.interp(wavelength, cie_data["wavelength"], cie_data["Y"])
     z = np.interp(wavelength, cie_data["wavelength"], cie_data["Z"])
@@ -288,10 +1128,11 @@ def xyz_to_srgb(x, y, z):
     """Convert CIE XYZ to sRGB values.
 
     Args:
-        x, y, z (float): CIE XYZ values
+        x, y, z (float or np.ndarray): CIE XYZ values
 
     Returns:
-        tuple: (R, G, B) values in range [0, 1]
+        np.ndarray: (R, G, B) values in range [0, 1]. For array input the
+            result has shape (3, N).
     """
     # XYZ to linear RGB transformation matrix (sRGB/Rec.709)
     r = 3.2406 * x - 1.5372 * y - 0.4986 * z
@@ -300,10 +1141,12 @@ def xyz_to_srgb(x, y, z):
 
     # sRGB gamma correction
     def gamma_correct(val):
-        if val > 0.0031308:
-            return 1.055 * (val ** (1 / 2.4)) - 0.055
-        else:
-            return 12.92 * val
+        val = np.asarray(val, dtype=float)
+        # Only raise values above the threshold to the power 1 / 2.4, to avoid
+        # warnings for negative values which are discarded anyway.
+        is_high = val > 0.0031308
+        high = 1.055 * (np.where(is_high, val, 1.0) ** (1 / 2.4)) - 0.055
+        return np.where(is_high, high, 12.92 * val)
 
     r = gamma_correct(r)
     g = gamma_correct(g)
@@ -324,3 +1167,86 @@ def wavelength_to_rgb(wavelength: float) -> tuple[int, int, int]:
     x, y, z = wavelength_to_xyz(wavelength)
     r, g, b = xyz_to_srgb(x, y, z)
     return int(r * 255), int(g * 255), int(b * 255)
+
+
+def wavelengths_to_rgb(wavelengths: np.ndarray) -> np.ndarray:
+    """Convert an array of wavelengths to sRGB values.
+
+    This is the batched version of `wavelength_to_rgb()` and gives identical
+    results. Missing (NaN) wavelengths are mapped to black.
+
+    Args:
+        wavelengths: Array of wavelengths in nanometers.
+
+    Returns:
+        An integer array of shape (N, 3) with (R, G, B) values in range [0,
+        255].
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    rgb = xyz_to_srgb(*wavelength_to_xyz(wavelengths))
+    rgb = np.nan_to_num(rgb, nan=0.0)
+    return (rgb * 255).astype(int).T
+
+
+class RgbLookupTable:
+    """Dense lookup table to quickly convert wavelengths to sRGB values.
+
+    The table stores the colors for wavelengths on a regular grid which covers
+    the CIE data. Within one interval of the CIE data, each color component is
+    a monotonic function of the wavelength. So, if both grid points
+    surrounding a wavelength have the same color, the wavelength itself has
+    that color as well. Only the (few) wavelengths for which the surrounding
+    grid points differ are calculated exactly, which makes the results
+    identical to those of `wavelengths_to_rgb()`.
+    """
+
+    def __init__(self, steps_per_nm: int = 20) -> None:
+        """Initializes the lookup table.
+
+        Args:
+            steps_per_nm: Number of grid points per nanometer.
+        """
+        self.steps_per_nm = steps_per_nm
+        cie_data = get_cie_data()
+        self.wl_min = float(cie_data["wavelength"].iloc[0])
+        self.wl_max = float(cie_data["wavelength"].iloc[-1])
+        num_steps = round((self.wl_max - self.wl_min) * steps_per_nm)
+        # Dividing integers keeps the grid points which coincide with the CIE
+        # data points exact.
+        grid = self.wl_min + np.arange(num_steps + 1) / steps_per_nm
+        self.table = wavelengths_to_rgb(grid).astype(np.uint8)
+
+    def __call__(self, wavelengths: np.ndarray) -> np.ndarray:
+        """Converts an array of wavelengths to sRGB values.
+
+        Args:
+            wavelengths: Array of wavelengths in nanometers.
+
+        Returns:
+            An integer array of shape (N, 3) with (R, G, B) values in range
+            [0, 255].
+        """
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        # The CIE data is constant outside its range, so clipping the
+        # wavelengths does not change the colors.
+        position = (
+            np.clip(wavelengths, self.wl_min, self.wl_max) - self.wl_min
+        ) * self.steps_per_nm
+        lower = np.clip(
+            np.floor(np.nan_to_num(position)).astype(int), 0, len(self.table) - 2
+        )
+        rgb = self.table[lower].astype(int)
+
+        # Missing wavelengths are handled by the exact calculation as well.
+        is_exact = ~np.isnan(wavelengths) & np.all(
+            self.table[lower] == self.table[lower + 1], axis=1
+        )
+        if not is_exact.all():
+            rgb[~is_exact] = wavelengths_to_rgb(wavelengths[~is_exact])
+        return rgb
+
+
+@functools.cache
+def get_rgb_lookup_table() -> RgbLookupTable:
+    """Returns the shared RGB lookup table, building it on first use."""
+    return RgbLookupTable()
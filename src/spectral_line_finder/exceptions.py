@@ -0,0 +1,14 @@
+class NistDataError(Exception):
+    """Custom exception for errors when fetching data from NIST."""
+
+    pass
+
+
+class NoLinesError(NistDataError):
+    """Raised when NIST has no lines matching a query, like an empty range."""
+
+    pass
+
+
+class UnknownColumnsError(ValueError):
+    """Raised when requested columns are not in the spectral line data."""
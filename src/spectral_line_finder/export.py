@@ -0,0 +1,138 @@
+import json
+from collections.abc import Callable, Iterable
+from typing import IO, Any, BinaryIO, TextIO
+
+import pandas as pd
+
+# Formats which are written to files opened in binary mode
+BINARY_FORMATS = ["parquet"]
+
+
+def write_tsv(chunks: Iterable[pd.DataFrame], file: TextIO) -> int:
+    """Writes rows as tab-separated values, one chunk at a time.
+
+    Args:
+        chunks: The rows, in chunks with the same columns.
+        file: The file to write to.
+
+    Returns:
+        The number of rows written.
+    """
+    return _write_delimited(chunks, file, sep="\t")
+
+
+def write_csv(chunks: Iterable[pd.DataFrame], file: TextIO) -> int:
+    """Writes rows as comma-separated values, one chunk at a time.
+
+    Args:
+        chunks: The rows, in chunks with the same columns.
+        file: The file to write to.
+
+    Returns:
+        The number of rows written.
+    """
+    return _write_delimited(chunks, file, sep=",")
+
+
+def _write_delimited(chunks: Iterable[pd.DataFrame], file: TextIO, sep: str) -> int:
+    num_rows = 0
+    for idx, chunk in enumerate(chunks):
+        chunk.to_csv(file, sep=sep, index=False, header=idx == 0)
+        num_rows += len(chunk)
+    return num_rows
+
+
+def write_jsonl(chunks: Iterable[pd.DataFrame], file: TextIO) -> int:
+    """Writes rows as JSON lines, one object per row, one chunk at a time.
+
+    Args:
+        chunks: The rows, in chunks.
+        file: The file to write to.
+
+    Returns:
+        The number of rows written.
+    """
+    num_rows = 0
+    for chunk in chunks:
+        # Convert to Python objects, with missing values as None (null)
+        records = chunk.astype(object).where(chunk.notna(), None)
+        file.writelines(
+            json.dumps(record) + "\n" for record in records.to_dict(orient="records")
+        )
+        num_rows += len(chunk)
+    return num_rows
+
+
+def write_parquet(chunks: Iterable[pd.DataFrame], file: BinaryIO) -> int:
+    """Writes rows to a Parquet file, one row group per chunk.
+
+    Text columns are written as strings, also if a chunk contains only
+    missing or numeric values in such a column.
+
+    Args:
+        chunks: The rows, in chunks with the same columns.
+        file: The binary file to write to.
+
+    Returns:
+        The number of rows written.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    # pyarrow is an optional dependency, only needed for Parquet output
+    import pyarrow as pa  # type: ignore[import-untyped]
+    import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+    num_rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            # Object and categorical columns contain text
+            chunk = chunk.astype(
+                {
+                    col: "string"
+                    for col, dtype in chunk.dtypes.items()
+                    if dtype.kind == "O"
+                }
+            )
+            table = pa.Table.from_pandas(
+                chunk,
+                schema=None if writer is None else writer.schema,
+                preserve_index=False,
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(file, table.schema)
+            writer.write_table(table)
+            num_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return num_rows
+
+
+def write_rows(chunks: Iterable[pd.DataFrame], file: IO, format: str = "tsv") -> int:
+    """Writes rows in the given format.
+
+    Args:
+        chunks: The rows, in chunks with the same columns.
+        file: The file to write to, opened in binary mode for the formats in
+            `BINARY_FORMATS` and in text mode otherwise.
+        format: The output format, either "tsv", "csv", "jsonl" or "parquet".
+
+    Returns:
+        The number of rows written.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If the format needs a package which is not installed.
+    """
+    # Text formats take a text file and Parquet a binary file
+    writers: dict[str, Callable[[Iterable[pd.DataFrame], Any], int]] = {
+        "tsv": write_tsv,
+        "csv": write_csv,
+        "jsonl": write_jsonl,
+        "parquet": write_parquet,
+    }
+    if format not in writers:
+        raise ValueError(f"Unknown output format: {format!r}")
+    return writers[format](chunks, file)
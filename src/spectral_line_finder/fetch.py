@@ -0,0 +1,380 @@
+import asyncio
+import contextlib
+import threading
+import time
+import weakref
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from typing import Generic, TypeVar
+
+import httpx
+
+from spectral_line_finder.exceptions import NistDataError, NoLinesError
+from spectral_line_finder.instrumentation import instrumentation
+from spectral_line_finder.intervals import Interval
+
+NIST_LINES_URL = "https://physics.nist.gov/cgi-bin/ASD/lines1.pl"
+
+# Maximum number of simultaneous requests to the NIST server
+MAX_CONCURRENT_REQUESTS = 4
+
+# NIST answers queries without matching lines with an error page containing
+# this message
+NO_LINES_MESSAGE = "No lines are available"
+
+# Error pages of NIST, like for misspelled elements, are remembered for this
+# number of seconds, so repeated queries don't contact NIST again
+ERROR_CACHE_TTL = 60.0
+
+# Requests wait for a free connection as long as needed, since the number of
+# simultaneous requests is limited by the callers
+CLIENT_TIMEOUT = httpx.Timeout(5.0, pool=None)
+
+T = TypeVar("T")
+
+
+def get_nist_url(element: str, wavelength_range: Interval | None = None) -> str:
+    """Builds the URL to retrieve the spectral lines of an element.
+
+    Args:
+        element: The symbol of the element to fetch data for (e.g., "H", "He").
+        wavelength_range: The vacuum wavelength range of the lines in nm. If
+            None, all lines are retrieved.
+
+    Returns:
+        The URL of the tab-separated line list.
+    """
+    low_w, upp_w = ("", "") if wavelength_range is None else wavelength_range
+    return f"{NIST_LINES_URL}?spectra={element}&output_type=0&low_w={low_w}&upp_w={upp_w}&unit=1&de=0&plot_out=0&I_scale_type=1&format=3&line_out=0&remove_js=on&en_unit=1&output=0&bibrefs=1&page_size=15&show_obs_wl=1&show_calc_wl=1&unc_out=1&order_out=0&max_low_enrg=&show_av=2&max_upp_enrg=&tsb_value=0&min_str=&A_out=0&intens_out=on&max_str=&allowed_out=1&forbid_out=1&min_accur=&min_intens=&conf_out=on&term_out=on&enrg_out=on&J_out=on&submit=Retrieve+Data"
+
+
+def check_response(response: httpx.Response) -> None:
+    """Checks a response from the NIST server for errors.
+
+    Only the headers are inspected for successful responses, so this can be
+    used before streaming the body.
+
+    Args:
+        response: The response from the NIST server.
+
+    Raises:
+        NoLinesError: If no lines match the query.
+        NistDataError: If the NIST website returns an error page.
+    """
+    response.raise_for_status()
+
+    if "html" in response.headers.get("Content-Type", ""):
+        # Parsing HTML is rare, so BeautifulSoup is only imported when needed
+        from bs4 import BeautifulSoup
+
+        response.read()
+        soup = BeautifulSoup(response.text, "html.parser")
+        for script in soup(["script", "style"]):
+            script.decompose()
+        text = soup.get_text(separator="\n", strip=True)
+        if NO_LINES_MESSAGE in text:
+            raise NoLinesError(text)
+        raise NistDataError(text)
+
+
+class ErrorCache:
+    """Remembers the errors of NIST queries for a short time.
+
+    Error pages don't change from one moment to the next, so a query which
+    failed recently fails again right away, without contacting NIST.
+    """
+
+    def __init__(self, ttl: float = ERROR_CACHE_TTL) -> None:
+        """Initializes the cache.
+
+        Args:
+            ttl: The number of seconds for which an error is remembered.
+        """
+        self.ttl = ttl
+        self._errors: dict[Hashable, tuple[float, NistDataError]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, key: Hashable) -> None:
+        """Raises the error of a query again if it failed recently.
+
+        Args:
+            key: The query, like the element and the wavelength range.
+
+        Raises:
+            NistDataError: If the query failed less than `ttl` seconds ago.
+        """
+        with self._lock:
+            expires, error = self._errors.get(key, (0.0, None))
+            if error is not None and expires <= time.monotonic():
+                del self._errors[key]
+                error = None
+        if error is None:
+            instrumentation.count("nist.error_cache.miss")
+            return
+        instrumentation.count("nist.error_cache.hit")
+        # Raise a new exception, so tracebacks don't pile up
+        raise type(error)(*error.args)
+
+    def add(self, key: Hashable, error: NistDataError) -> None:
+        """Remembers the error of a query.
+
+        Args:
+            key: The query, like the element and the wavelength range.
+            error: The error returned by NIST.
+        """
+        with self._lock:
+            self._errors[key] = (time.monotonic() + self.ttl, error)
+
+    def clear(self) -> None:
+        """Forgets all errors."""
+        with self._lock:
+            self._errors.clear()
+
+
+class _Call(Generic[T]):
+    """A call whose result is shared by `SingleFlight`."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    """Runs a call only once for concurrent callers asking for the same key.
+
+    Callers which ask for a key while a call for that key is running wait for
+    it, and get its result or its exception, instead of repeating the call.
+    This works across threads, and for both functions and coroutines. If the
+    running call is cancelled or interrupted, a waiting caller makes the call
+    itself.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initializes the single-flight group.
+
+        Args:
+            name: The prefix of the "coalesced" counter, which counts the
+                callers which waited for another call.
+        """
+        self.name = name
+        self._calls: dict[Hashable, _Call[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """Calls a function, unless a call for the same key is running.
+
+        Args:
+            key: Identifies the calls which have the same result.
+            function: The function to call.
+
+        Returns:
+            The result of the function, of this or of the running call.
+        """
+        while True:
+            call, is_leader = self._join(key)
+            if is_leader:
+                return self._run(key, call, function)
+            call.done.wait()
+            if call.error is None or isinstance(call.error, Exception):
+                return self._get_result(call)
+
+    async def do_async(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """Awaits a coroutine function, unless a call for the same key is running.
+
+        Args:
+            key: Identifies the calls which have the same result.
+            function: The coroutine function to await.
+
+        Returns:
+            The result of the function, of this or of the running call.
+        """
+        while True:
+            call, is_leader = self._join(key)
+            if is_leader:
+                try:
+                    result = await function()
+                except BaseException as e:
+                    self._finish(key, call, error=e)
+                    raise
+                self._finish(key, call, result=result)
+                return result
+            # The call may run in another thread, so wait without blocking
+            # the event loop
+            await asyncio.to_thread(call.done.wait)
+            if call.error is None or isinstance(call.error, Exception):
+                return self._get_result(call)
+
+    def _join(self, key: Hashable) -> tuple[_Call[T], bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                instrumentation.count(f"{self.name}.coalesced")
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _run(self, key: Hashable, call: _Call[T], function: Callable[[], T]) -> T:
+        try:
+            result = function()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    def _finish(
+        self,
+        key: Hashable,
+        call: _Call[T],
+        result: T | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        call.result = result
+        call.error = error
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def _get_result(self, call: _Call[T]) -> T:
+        if call.error is not None:
+            raise call.error
+        return call.result  # type: ignore[return-value]
+
+
+error_cache = ErrorCache()
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.Client:
+    """Returns the client shared by all synchronous requests to NIST.
+
+    The client keeps connections open between requests, so later requests
+    don't have to connect again. It can be used from several threads.
+
+    Returns:
+        The shared client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(timeout=CLIENT_TIMEOUT)
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the client shared by all asynchronous requests of an event loop.
+
+    Like `get_client()`, but for the running event loop, since asynchronous
+    connections can't be shared between event loops. The client must be closed
+    before the event loop finishes, using `close_async_client()`, or by
+    running the event loop using `run()`.
+
+    Returns:
+        The shared client of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(timeout=CLIENT_TIMEOUT)
+    return client
+
+
+async def close_async_client() -> None:
+    """Closes the client of the running event loop, if it has one."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def run(main: Awaitable[T]) -> T:
+    """Runs a coroutine in a new event loop, like `asyncio.run()`.
+
+    The shared client of the event loop is closed before the event loop
+    finishes, see `get_async_client()`.
+
+    Args:
+        main: The coroutine to run.
+
+    Returns:
+        The result of the coroutine.
+    """
+
+    async def run_and_close() -> T:
+        try:
+            return await main
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run_and_close())
+
+
+@contextlib.contextmanager
+def stream_nist_data(
+    element: str, wavelength_range: Interval | None = None
+) -> Iterator[Iterator[str]]:
+    """Streams the raw spectral line data of an element from NIST.
+
+    The request uses the shared client, see `get_client()`. Errors are
+    remembered for a short time, see `ErrorCache`.
+
+    Args:
+        element: The symbol of the element to fetch data for (e.g., "H", "He").
+        wavelength_range: The wavelength range of the lines in nm. If None,
+            all lines are fetched.
+
+    Yields:
+        An iterator over the lines of the tab-separated data.
+
+    Raises:
+        NoLinesError: If no lines match the query.
+        NistDataError: If the NIST website returns an error page.
+    """
+    key = (element, wavelength_range)
+    error_cache.check(key)
+    url = get_nist_url(element, wavelength_range)
+    with get_client().stream("GET", url) as response:
+        try:
+            check_response(response)
+        except NistDataError as e:
+            error_cache.add(key, e)
+            raise
+        yield response.iter_lines()
+
+
+async def fetch_nist_data_async(
+    client: httpx.AsyncClient,
+    element: str,
+    wavelength_range: Interval | None = None,
+) -> str:
+    """Fetches the raw spectral line data of an element from NIST.
+
+    Errors are remembered for a short time, see `ErrorCache`.
+
+    Args:
+        client: The client to use for the request. Sharing one client between
+            requests allows reusing connections, see `get_async_client()`.
+        element: The symbol of the element to fetch data for (e.g., "H", "He").
+        wavelength_range: The wavelength range of the lines in nm. If None,
+            all lines are fetched.
+
+    Returns:
+        The raw tab-separated data.
+
+    Raises:
+        NoLinesError: If no lines match the query.
+        NistDataError: If the NIST website returns an error page.
+    """
+    key = (element, wavelength_range)
+    error_cache.check(key)
+    response = await client.get(get_nist_url(element, wavelength_range))
+    try:
+        check_response(response)
+    except NistDataError as e:
+        error_cache.add(key, e)
+        raise
+    return response.text
@@ -1,14 +1,17 @@
+import copy
 import re
+from collections.abc import Callable
 
 from textual import on
 from textual.app import ComposeResult
 from textual.containers import HorizontalGroup, VerticalScroll
 from textual.css.query import NoMatches
 from textual.screen import ModalScreen
+from textual.timer import Timer
 from textual.validation import Integer, Number, ValidationResult, Validator
 from textual.widgets import Button, Checkbox, Footer, Input, Label
 
-from spectral_line_finder.data import (
+from spectral_line_finder.filters import (
     DataFilters,
     ElementFilter,
     MinMaxNanFilter,
@@ -16,6 +19,9 @@ from spectral_line_finder.data import (
 
 re_element = re.compile(r"^[A-Z][a-z]?(?:,\s*[A-Z][a-z]?)*$")
 
+# Time in seconds after the last edit before the table is updated live
+LIVE_UPDATE_DELAY = 0.25
+
 
 class ElementsValidator(Validator):
     def validate(self, value: str) -> ValidationResult:
@@ -36,12 +42,28 @@ class FilterDataDialog(ModalScreen):
     def __init__(
         self,
         initial_filters: DataFilters,
+        on_change: Callable[[DataFilters], None] | None = None,
         name: str | None = None,
         id: str | None = None,
         classes: str | None = None,
     ) -> None:
+        """Initializes the dialog.
+
+        Args:
+            initial_filters: The filters to edit. They are updated when the
+                choices are confirmed.
+            on_change: Called with a copy of the edited filters shortly after
+                a range filter is changed, if live updates are enabled. The
+                elements of the copy are those of the initial filters.
+            name: The name of the screen.
+            id: The ID of the screen in the DOM.
+            classes: The CSS classes of the screen.
+        """
         super().__init__(name, id, classes)
         self.filters = initial_filters
+        self.on_change = on_change
+        self._live_filters = copy.deepcopy(initial_filters)
+        self._live_update_timer: Timer | None = None
 
     def compose(self) -> ComposeResult:
         yield Footer()
@@ -71,6 +93,7 @@ class FilterDataDialog(ModalScreen):
                         validators=[Validator()],
                         valid_empty=True,
                         id=f"{name}_min",
+                        classes="range",
                     )
                     yield Input(
                         placeholder="Max",
@@ -78,6 +101,7 @@ class FilterDataDialog(ModalScreen):
                         validators=[Validator()],
                         valid_empty=True,
                         id=f"{name}_max",
+                        classes="range",
                     )
                     filter = getattr(self.filters, name)
                     if hasattr(filter, "show_nan"):
@@ -85,9 +109,50 @@ class FilterDataDialog(ModalScreen):
                             label="Show empty",
                             value=filter.show_nan,
                             id=f"{name}_show_nan",
+                            classes="range",
                         )
+            with HorizontalGroup():
+                yield Label("Blend Tolerance (nm): ")
+                yield Input(
+                    value=str(self.filters.blends.tolerance),
+                    validators=[Number(minimum=0)],
+                    id="blends_tolerance",
+                    classes="range",
+                )
+                yield Checkbox(
+                    label="Only blends",
+                    value=self.filters.blends.only_blends,
+                    id="blends_only",
+                    classes="range",
+                )
+            if self.on_change is not None:
+                yield Checkbox(label="Update table while typing", value=True, id="live")
             yield Button("Confirm and Close", variant="primary")
 
+    @on(Input.Changed, ".range")
+    @on(Checkbox.Changed, ".range")
+    @on(Checkbox.Changed, "#live")
+    def schedule_live_update(self) -> None:
+        """Updates the table once the range filters haven't changed for a while."""
+        if self.on_change is None or not self.query_one("#live", Checkbox).value:
+            return
+        if self._live_update_timer is not None:
+            self._live_update_timer.stop()
+        self._live_update_timer = self.set_timer(
+            LIVE_UPDATE_DELAY, self.apply_live_update
+        )
+
+    def apply_live_update(self) -> None:
+        assert self.on_change is not None
+        if not all(input.is_valid for input in self.query(".range").results(Input)):
+            return
+        filters = copy.deepcopy(self.filters)
+        self._read_range_filters(filters)
+        # Only update the table if the filters have actually changed
+        if filters != self._live_filters:
+            self._live_filters = filters
+            self.on_change(copy.deepcopy(filters))
+
     @on(Button.Pressed)
     def action_confirm_choices(self) -> None:
         for input in self.query(Input):
@@ -101,8 +166,17 @@ class FilterDataDialog(ModalScreen):
             for e in self.query_one("#elements", Input).value.split(",")
             if (stripped := e.strip())
         ]
+        self._read_range_filters(self.filters)
+        self.dismiss(True)
+
+    def _read_range_filters(self, filters: DataFilters) -> None:
+        """Sets the range and blend filters to the values of the inputs.
+
+        Args:
+            filters: The filters to update.
+        """
         for name in ["sp_num", "obs_wl", "intens", "Ei", "Ek"]:
-            filter: MinMaxNanFilter = getattr(self.filters, name)
+            filter: MinMaxNanFilter = getattr(filters, name)
             min_value = self.query_one(f"#{name}_min", Input).value
             filter.min = float(min_value) if min_value else None
             max_value = self.query_one(f"#{name}_max", Input).value
@@ -112,7 +186,10 @@ class FilterDataDialog(ModalScreen):
                 filter.show_nan = show_nan
             except NoMatches:
                 pass
-        self.dismiss(True)
+        filters.blends.tolerance = float(
+            self.query_one("#blends_tolerance", Input).value
+        )
+        filters.blends.only_blends = self.query_one("#blends_only", Checkbox).value
 
     def action_discard_choices(self) -> None:
         self.dismiss(False)
@@ -0,0 +1,119 @@
+import threading
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from spectral_line_finder.instrumentation import instrumentation
+
+
+class RangeFilterState(NamedTuple):
+    """The settings of a single range filter."""
+
+    col_name: str
+    min: float | None
+    max: float | None
+    show_nan: bool = True
+
+
+class _SortedColumn(NamedTuple):
+    # Indices that sort the column
+    order: np.ndarray
+    values: np.ndarray
+    # Number of values which are not NaN; these come first after sorting
+    num_valid: int
+
+
+class FilterEngine:
+    """Evaluates range filters on a frame, caching one mask per filter.
+
+    When the filters are applied again to the same frame, only the masks of
+    filters whose settings have changed are recomputed. Range filters use a
+    binary search in the sorted values of the column instead of comparing all
+    values. Each filtered column is sorted once per frame.
+    """
+
+    def __init__(self) -> None:
+        self._df: pd.DataFrame | None = None
+        self._masks: dict[str, tuple[RangeFilterState, np.ndarray | None]] = {}
+        self._sorted_columns: dict[str, _SortedColumn] = {}
+        self._lock = threading.Lock()
+
+    def get_mask(
+        self, df: pd.DataFrame, filters: Iterable[tuple[str, RangeFilterState]]
+    ) -> np.ndarray | None:
+        """Returns the combined mask of all filters.
+
+        Args:
+            df: The data to filter.
+            filters: Pairs of a unique name and the settings of a filter.
+
+        Returns:
+            A boolean array selecting the rows which pass all filters, or None
+            if all rows pass.
+        """
+        with self._lock:
+            if df is not self._df:
+                # Keep a reference to the frame, so its identity can't be
+                # reused by another frame
+                self._df = df
+                self._masks.clear()
+                self._sorted_columns.clear()
+
+            combined = None
+            for name, state in filters:
+                cached = self._masks.get(name)
+                if cached is not None and cached[0] == state:
+                    mask = cached[1]
+                    instrumentation.count("filter.cached_mask")
+                else:
+                    mask = self._compute_mask(df, state)
+                    instrumentation.count("filter.computed_mask")
+                    self._masks[name] = (state, mask)
+                if mask is not None:
+                    combined = mask if combined is None else combined & mask
+            return combined
+
+    def _compute_mask(
+        self, df: pd.DataFrame, state: RangeFilterState
+    ) -> np.ndarray | None:
+        values = df[state.col_name].to_numpy()
+        if state.min is None and state.max is None:
+            return None if state.show_nan else pd.notna(values)
+
+        if values.dtype.kind not in "iuf":
+            # Fall back to comparing all values
+            mask = np.ones(len(values), dtype=bool)
+            if state.min is not None:
+                mask &= (df[state.col_name] >= state.min).to_numpy()
+            if state.max is not None:
+                mask &= (df[state.col_name] <= state.max).to_numpy()
+            return mask
+
+        # NaN values never pass a range filter, so only the valid values are
+        # searched.
+        sorted_column = self._get_sorted_column(state.col_name, values)
+        valid_values = sorted_column.values[: sorted_column.num_valid]
+        start = 0 if state.min is None else valid_values.searchsorted(state.min, "left")
+        stop = (
+            len(valid_values)
+            if state.max is None
+            else valid_values.searchsorted(state.max, "right")
+        )
+
+        mask = np.zeros(len(values), dtype=bool)
+        mask[sorted_column.order[start:stop]] = True
+        return mask
+
+    def _get_sorted_column(self, col_name: str, values: np.ndarray) -> _SortedColumn:
+        if (sorted_column := self._sorted_columns.get(col_name)) is None:
+            # NaN values are sorted to the end
+            order = np.argsort(values, kind="stable")
+            values = values[order]
+            num_valid = len(values)
+            if values.dtype.kind == "f":
+                num_valid -= int(np.count_nonzero(np.isnan(values)))
+            sorted_column = _SortedColumn(order, values, num_valid)
+            self._sorted_columns[col_name] = sorted_column
+        return sorted_column
@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class ElementFilter:
+    elements: list[str]
+
+
+@dataclass
+class MinMaxFilter:
+    col_name: str
+    min: float | None = None
+    max: float | None = None
+
+
+@dataclass
+class MinMaxNanFilter:
+    col_name: str
+    min: float | None = None
+    max: float | None = None
+    show_nan: bool = True
+
+
+@dataclass
+class IntegerMinMaxFilter:
+    col_name: str
+    min: int | None = None
+    max: int | None = None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in ("min", "max") and value is not None:
+            value = int(value)
+        super().__setattr__(name, value)
+
+
+@dataclass
+class BlendFilter:
+    # The maximum difference in wavelength in nm between neighboring lines
+    # which are grouped into a blend
+    tolerance: float = 0.005
+    only_blends: bool = False
+
+
+@dataclass
+class DataFilters:
+    elements: ElementFilter = field(default_factory=lambda: ElementFilter([]))
+    sp_num: IntegerMinMaxFilter = field(
+        default_factory=lambda: IntegerMinMaxFilter(col_name="sp_num")
+    )
+    obs_wl: MinMaxNanFilter = field(
+        default_factory=lambda: MinMaxNanFilter(col_name="obs_wl(nm)")
+    )
+    intens: MinMaxNanFilter = field(
+        default_factory=lambda: MinMaxNanFilter(col_name="intens")
+    )
+    Ei: MinMaxFilter = field(default_factory=lambda: MinMaxFilter(col_name="Ei(eV)"))
+    Ek: MinMaxFilter = field(default_factory=lambda: MinMaxFilter(col_name="Ek(eV)"))
+    blends: BlendFilter = field(default_factory=BlendFilter)
+
+    def get_wavelength_range(self) -> tuple[float, float] | None:
+        """Returns the wavelength range outside of which no lines pass.
+
+        Lines without an observed wavelength never pass a wavelength filter
+        with limits, so all lines passing it are within its limits.
+
+        Returns:
+            The range of observed wavelengths in nm, or None if lines of any
+            wavelength may pass.
+        """
+        if self.obs_wl.min is None or self.obs_wl.max is None:
+            return None
+        return self.obs_wl.min, self.obs_wl.max
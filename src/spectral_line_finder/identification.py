@@ -0,0 +1,283 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from spectral_line_finder.peak_matching import ToleranceUnit
+
+# Weight of lines with an unknown intensity, and the minimum weight of lines
+# with a known intensity, relative to the strongest line of a species
+MIN_LINE_WEIGHT = 0.1
+
+# Lines with at least this relative intensity are expected to be observed
+STRONG_LINE_INTENSITY = 0.5
+
+# Number of tasks per worker, to balance the load between workers
+TASKS_PER_WORKER = 4
+
+# Below this number of lines, scoring in a process pool is not worth the
+# overhead of starting the workers
+MIN_LINES_FOR_POOL = 200_000
+
+RESULT_COLUMNS = [
+    "element",
+    "sp_num",
+    "score",
+    "matched_peaks",
+    "missing_strong_lines",
+    "num_lines",
+]
+
+
+@dataclass
+class _SpeciesLines:
+    """Lines of all species, concatenated and sorted by wavelength per species."""
+
+    wavelengths: np.ndarray
+    weights: np.ndarray
+    # Lines of species i are at offsets[i]:offsets[i + 1]
+    offsets: np.ndarray
+
+
+@dataclass
+class _Peaks:
+    """The lower and upper bounds of the wavelength interval of each peak."""
+
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def identify_species(
+    lines: pd.DataFrame,
+    peaks: np.ndarray,
+    tolerance: float,
+    unit: ToleranceUnit = "nm",
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """Ranks species (element and ionization stage) by how well they explain peaks.
+
+    For each species, only the lines within the wavelength range of the peaks
+    are considered. Each line has a weight equal to its intensity relative to
+    the strongest line of the species in that range, but at least
+    MIN_LINE_WEIGHT. Every peak with at least one line within the tolerance
+    adds the largest weight of those lines to the score. Every strong line,
+    with a relative intensity of at least STRONG_LINE_INTENSITY, without a
+    peak within the tolerance subtracts its weight from the score.
+
+    Species are scored in parallel in a process pool. The line data is put in
+    shared memory once, so only the ranges of species to score are sent to
+    the workers.
+
+    Args:
+        lines: Spectral line data with the element, sp_num, wavelength and
+            intens columns.
+        peaks: The measured peak wavelengths in nm.
+        tolerance: The maximum difference between a peak and a line.
+        unit: The unit of the tolerance, either "nm" or "ppm" of the peak
+            wavelength.
+        max_workers: The number of worker processes. Defaults to the number of
+            CPUs. If 1, all species are scored in the current process.
+
+    Returns:
+        A dataframe with the score, the number of matched peaks, the number of
+        missing strong lines and the number of lines in range for each species,
+        sorted by descending score.
+    """
+    if unit not in ("nm", "ppm"):
+        raise ValueError(f"Unknown tolerance unit: {unit!r}")
+    peaks = np.sort(np.asarray(peaks, dtype=float))
+    peaks = peaks[~np.isnan(peaks)]
+    tolerances = tolerance * peaks * 1e-6 if unit == "ppm" else tolerance
+    # Both bounds increase with the peak wavelength
+    sorted_peaks = _Peaks(lower=peaks - tolerances, upper=peaks + tolerances)
+    if not len(peaks):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    # Only lines near the peaks can be matched or are expected to be observed
+    lines = lines[
+        lines["wavelength"].between(sorted_peaks.lower[0], sorted_peaks.upper[-1])
+    ].dropna(subset=["element", "sp_num"])
+    if lines.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    species, species_lines = _group_species(lines)
+    num_species = len(species)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(species_lines.wavelengths) < MIN_LINES_FOR_POOL:
+        scores = _score_species(species_lines, sorted_peaks, 0, num_species)
+    else:
+        scores = _score_species_in_pool(species_lines, sorted_peaks, max_workers)
+
+    result = species.assign(
+        score=scores[:, 0],
+        matched_peaks=scores[:, 1].astype(int),
+        missing_strong_lines=scores[:, 2].astype(int),
+        num_lines=np.diff(species_lines.offsets),
+    )
+    return result.sort_values(
+        by=["score", "matched_peaks"], ascending=False, kind="stable", ignore_index=True
+    )[RESULT_COLUMNS]
+
+
+def _group_species(lines: pd.DataFrame) -> tuple[pd.DataFrame, _SpeciesLines]:
+    """Groups lines by species, keeping the lines of each species sorted."""
+    codes, _ = pd.MultiIndex.from_arrays(
+        [lines["element"], lines["sp_num"]]
+    ).factorize()
+    # Species are numbered in order of their first line
+    first_lines = np.unique(codes, return_index=True)[1]
+    species = pd.DataFrame(
+        {
+            "element": lines["element"].to_numpy()[first_lines],
+            "sp_num": lines["sp_num"].to_numpy()[first_lines],
+        }
+    )
+    order = np.lexsort((lines["wavelength"].to_numpy(), codes))
+    wavelengths = lines["wavelength"].to_numpy(dtype=float)[order]
+    intensities = lines["intens"].to_numpy(dtype=float)[order]
+    counts = np.bincount(codes, minlength=len(species))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    # Weigh each line relative to the strongest line of its species
+    max_intensities = np.full(len(species), np.nan)
+    has_lines = counts > 0
+    with np.errstate(invalid="ignore"):
+        max_intensities[has_lines] = np.fmax.reduceat(
+            intensities, offsets[:-1][has_lines]
+        )
+    relative = intensities / np.repeat(max_intensities, counts)
+    weights = np.where(
+        np.isfinite(relative), np.clip(relative, MIN_LINE_WEIGHT, 1), MIN_LINE_WEIGHT
+    )
+
+    return species, _SpeciesLines(wavelengths, weights, offsets)
+
+
+def _score_species(
+    lines: _SpeciesLines, peaks: _Peaks, start: int, stop: int
+) -> np.ndarray:
+    """Scores a range of species.
+
+    Returns:
+        An array with the score, number of matched peaks and number of missing
+        strong lines of each species in the range.
+    """
+    scores = np.zeros((stop - start, 3))
+    for idx in range(start, stop):
+        wavelengths = lines.wavelengths[lines.offsets[idx] : lines.offsets[idx + 1]]
+        weights = lines.weights[lines.offsets[idx] : lines.offsets[idx + 1]]
+        if not len(wavelengths):
+            continue
+
+        # Candidate lines of each peak
+        line_starts = wavelengths.searchsorted(peaks.lower, "left")
+        line_stops = wavelengths.searchsorted(peaks.upper, "right")
+        is_matched = line_stops > line_starts
+        peak_weights = _range_maxima(
+            weights, line_starts[is_matched], line_stops[is_matched]
+        )
+
+        # Peaks near each line; a line is observed if the first peak whose
+        # interval does not end before the line, starts before the line.
+        peak_idx = peaks.upper.searchsorted(wavelengths, "left")
+        is_observed = np.zeros(len(wavelengths), dtype=bool)
+        in_range = peak_idx < len(peaks.upper)
+        is_observed[in_range] = peaks.lower[peak_idx[in_range]] <= wavelengths[in_range]
+        is_missing = ~is_observed & (weights >= STRONG_LINE_INTENSITY)
+
+        scores[idx - start] = (
+            peak_weights.sum() - weights[is_missing].sum(),
+            np.count_nonzero(is_matched),
+            np.count_nonzero(is_missing),
+        )
+    return scores
+
+
+def _range_maxima(
+    values: np.ndarray, starts: np.ndarray, stops: np.ndarray
+) -> np.ndarray:
+    """Returns the maximum of each non-empty range of values.
+
+    The ranges may overlap, so the values of all ranges are gathered first.
+    """
+    if not len(starts):
+        return np.zeros(0)
+    counts = stops - starts
+    range_starts = np.cumsum(counts) - counts
+    indexes = np.repeat(starts - range_starts, counts) + np.arange(counts.sum())
+    return np.maximum.reduceat(values[indexes], range_starts)
+
+
+def _score_species_in_pool(
+    lines: _SpeciesLines, peaks: _Peaks, max_workers: int
+) -> np.ndarray:
+    """Scores all species in a process pool, sharing the line data."""
+    arrays = {
+        "wavelengths": lines.wavelengths,
+        "weights": lines.weights,
+        "offsets": lines.offsets,
+        "lower": peaks.lower,
+        "upper": peaks.upper,
+    }
+    blocks = {}
+    try:
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            blocks[name] = block
+        specs = {
+            name: (blocks[name].name, array.shape, array.dtype.str)
+            for name, array in arrays.items()
+        }
+
+        ranges = _split_species(lines.offsets, max_workers * TASKS_PER_WORKER)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(specs,),
+        ) as executor:
+            results = executor.map(_score_species_task, *zip(*ranges))
+            return np.concatenate(list(results))
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def _split_species(offsets: np.ndarray, num_tasks: int) -> list[tuple[int, int]]:
+    """Splits species into ranges with roughly equal numbers of lines."""
+    num_species = len(offsets) - 1
+    targets = np.linspace(0, offsets[-1], num_tasks + 1)[1:-1]
+    bounds = np.unique(
+        np.concatenate([[0], offsets.searchsorted(targets), [num_species]])
+    )
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+# Shared line data in a worker process
+_worker_blocks: list[shared_memory.SharedMemory] = []
+_worker_lines: _SpeciesLines | None = None
+_worker_peaks: _Peaks | None = None
+
+
+def _init_worker(specs: dict[str, tuple[str, tuple[int, ...], str]]) -> None:
+    global _worker_lines, _worker_peaks
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    _worker_lines = _SpeciesLines(
+        arrays["wavelengths"], arrays["weights"], arrays["offsets"]
+    )
+    _worker_peaks = _Peaks(arrays["lower"], arrays["upper"])
+
+
+def _score_species_task(start: int, stop: int) -> np.ndarray:
+    assert _worker_lines is not None and _worker_peaks is not None
+    return _score_species(_worker_lines, _worker_peaks, start, stop)
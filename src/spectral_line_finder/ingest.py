@@ -0,0 +1,134 @@
+import os
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from spectral_line_finder.data import process_nist_lines
+from spectral_line_finder.intervals import Interval
+from spectral_line_finder.line_store import LineStore
+from spectral_line_finder.nist_parser import COLUMNS
+
+# Line lists saved from the NIST website as tab-separated text
+FILE_PATTERN = "*.tsv"
+
+
+@dataclass
+class ImportReport:
+    """The outcome of importing line list files."""
+
+    # The number of imported lines, by element
+    num_lines: dict[str, int] = field(default_factory=dict)
+    # The files containing the lines of each element
+    files: dict[str, list[Path]] = field(default_factory=dict)
+    # The error messages of the files which couldn't be parsed, by file
+    errors: dict[Path, str] = field(default_factory=dict)
+
+
+def find_line_files(directory: Path, pattern: str = FILE_PATTERN) -> list[Path]:
+    """Finds the line list files in a directory.
+
+    Args:
+        directory: The directory to search.
+        pattern: The glob pattern of the files, like "**/*.tsv" to include
+            subdirectories.
+
+    Returns:
+        The paths of the files, sorted.
+    """
+    return sorted(path for path in directory.glob(pattern) if path.is_file())
+
+
+def parse_line_file(path: Path) -> dict[str, pd.DataFrame]:
+    """Parses and processes a line list file saved from the NIST website.
+
+    Both the generic and the hydrogen format are recognized, and the lines are
+    processed like downloaded lines, see `data.process_nist_lines()`.
+
+    Args:
+        path: The path of the tab-separated line list.
+
+    Returns:
+        The processed lines, by element, since a line list may contain the
+        lines of several elements.
+    """
+    with open(path, encoding="utf-8") as f:
+        df = process_nist_lines(f)
+    return {
+        str(element): lines.reset_index(drop=True)
+        for element, lines in df.groupby("element", sort=False)
+    }
+
+
+def import_line_files(
+    paths: list[Path],
+    store: LineStore,
+    intervals: list[Interval] | None = None,
+    max_workers: int | None = None,
+) -> ImportReport:
+    """Imports line list files into a line store, parsing them in parallel.
+
+    The files are parsed in a process pool. The lines of an element which
+    are spread over several files are combined, dropping duplicate lines,
+    and replace any stored lines of the element. Files which can't be parsed
+    are skipped.
+
+    Args:
+        paths: The paths of the tab-separated line lists.
+        store: The line store to save the lines to.
+        intervals: The wavelength intervals which the files cover, if they
+            don't contain all lines of their elements.
+        max_workers: The number of worker processes. Defaults to the number
+            of CPUs. If 1, the files are parsed in the current process.
+
+    Returns:
+        The number of imported lines and the files of each element, and the
+        files which couldn't be parsed.
+    """
+    report = ImportReport()
+    frames: dict[str, list[pd.DataFrame]] = defaultdict(list)
+    for path, result in _parse_files(paths, max_workers or os.cpu_count() or 1):
+        if isinstance(result, Exception):
+            report.errors[path] = str(result) or type(result).__name__
+            continue
+        for element, df in result.items():
+            frames[element].append(df)
+            report.files.setdefault(element, []).append(path)
+
+    for element in sorted(frames):
+        dfs = frames.pop(element)
+        if len(dfs) == 1:
+            df = dfs[0]
+        else:
+            # Line lists of overlapping queries contain the same lines
+            df = pd.concat(dfs, ignore_index=True).drop_duplicates(
+                subset=COLUMNS, ignore_index=True
+            )
+        store.save(element, df, intervals)
+        report.num_lines[element] = len(df)
+    return report
+
+
+def _parse_files(
+    paths: Iterable[Path], max_workers: int
+) -> Iterator[tuple[Path, dict[str, pd.DataFrame] | Exception]]:
+    """Parses files, yielding the lines or the error of each file when done."""
+    paths = list(paths)
+    if max_workers == 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, parse_line_file(path)
+            except Exception as exc:
+                yield path, exc
+        return
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        futures = {executor.submit(parse_line_file, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as exc:
+                yield futures[future], exc
@@ -0,0 +1,116 @@
+import collections
+import contextlib
+import json
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Number of recent stage records kept in memory, e.g. for the performance panel
+MAX_RECORDS = 200
+
+
+class Instrumentation:
+    """Lightweight timing hooks for the stages of loading and showing data.
+
+    Code wraps a stage in `with instrumentation.stage("name") as record:` and
+    may add details, like row counts, to the record. When enabled, each
+    finished stage is kept in memory and, if a log file is set, appended to it
+    as a line of JSON. Cache hits and misses are counted using `count()`.
+
+    The hooks are disabled by default, in which case they do nothing.
+    """
+
+    def __init__(self, max_records: int = MAX_RECORDS) -> None:
+        self.enabled = False
+        self.records: collections.deque[dict[str, Any]] = collections.deque(
+            maxlen=max_records
+        )
+        self.counters: collections.Counter[str] = collections.Counter()
+        self._log_path: Path | None = None
+        self._lock = threading.Lock()
+
+    def enable(self, log_path: Path | None = None) -> None:
+        """Enables the hooks.
+
+        Args:
+            log_path: A file to append the records to, as JSON lines. If None,
+                the records are only kept in memory.
+        """
+        with self._lock:
+            if log_path is not None:
+                self._log_path = log_path
+            self.enabled = True
+
+    def disable(self) -> None:
+        """Disables the hooks, unless records are written to a log file."""
+        with self._lock:
+            if self._log_path is None:
+                self.enabled = False
+
+    def close(self) -> None:
+        """Disables the hooks and stops writing to the log file."""
+        with self._lock:
+            self.enabled = False
+            self._log_path = None
+
+    def clear(self) -> None:
+        """Removes all records and counts kept in memory."""
+        with self._lock:
+            self.records.clear()
+            self.counters.clear()
+
+    def stage(self, name: str, **details: Any):
+        """Times a stage.
+
+        Args:
+            name: The name of the stage, like "nist.fetch".
+            **details: Details to add to the record, like the element.
+
+        Returns:
+            A context manager yielding the record of the stage, to which more
+            details can be added.
+        """
+        if not self.enabled:
+            # Callers add details to the record, so each stage gets its own
+            return contextlib.nullcontext({})
+        return self._timed_stage(name, details)
+
+    @contextlib.contextmanager
+    def _timed_stage(self, name: str, details: dict[str, Any]) -> Iterator[dict]:
+        record = {"stage": name, **details}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as exc:
+            record["error"] = type(exc).__name__
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            record["time"] = time.time()
+            record["thread"] = threading.current_thread().name
+            self._add_record(record)
+
+    def count(self, name: str, increment: int = 1) -> None:
+        """Increments a counter, like "line_store.hit".
+
+        Args:
+            name: The name of the counter.
+            increment: The amount to add.
+        """
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += increment
+
+    def _add_record(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self._log_path is not None:
+                # The file is only open while writing, so it is never left
+                # open when the program exits
+                with open(self._log_path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+
+instrumentation = Instrumentation()
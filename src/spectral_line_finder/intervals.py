@@ -0,0 +1,69 @@
+import math
+from collections.abc import Iterable
+from typing import TypeAlias
+
+# A closed wavelength interval (low, upp), in nm
+Interval: TypeAlias = tuple[float, float]
+
+# The interval covering all wavelengths
+FULL_RANGE: Interval = (-math.inf, math.inf)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Merges overlapping and touching intervals.
+
+    Args:
+        intervals: The intervals, in any order.
+
+    Returns:
+        The disjoint intervals covering the same wavelengths, sorted.
+    """
+    merged: list[Interval] = []
+    for low, upp in sorted(intervals):
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], upp))
+        else:
+            merged.append((low, upp))
+    return merged
+
+
+def missing_intervals(cached: Iterable[Interval], wanted: Interval) -> list[Interval]:
+    """Finds the parts of an interval which are not covered by other intervals.
+
+    The gaps share their bounds with the surrounding cached intervals, so
+    lines exactly at a bound may be found in both.
+
+    Args:
+        cached: The intervals which are available, in any order.
+        wanted: The interval which is needed.
+
+    Returns:
+        The gaps in the cached intervals within the wanted interval, sorted.
+    """
+    low, upp = wanted
+    gaps = []
+    for cached_low, cached_upp in merge_intervals(cached):
+        if cached_upp < low:
+            continue
+        if cached_low > upp:
+            break
+        if cached_low > low:
+            gaps.append((low, cached_low))
+        low = max(low, cached_upp)
+        if low >= upp:
+            return gaps
+    gaps.append((low, upp))
+    return gaps
+
+
+def covers(cached: Iterable[Interval], wanted: Interval) -> bool:
+    """Checks whether intervals cover another interval completely.
+
+    Args:
+        cached: The intervals which are available, in any order.
+        wanted: The interval which is needed.
+
+    Returns:
+        True if every wavelength of the wanted interval is covered.
+    """
+    return not missing_intervals(cached, wanted)
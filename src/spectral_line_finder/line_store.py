@@ -0,0 +1,634 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+import numpy as np
+import pandas as pd
+
+from spectral_line_finder.exceptions import UnknownColumnsError
+from spectral_line_finder.intervals import FULL_RANGE, Interval
+
+# Increase this version whenever the processing of the NIST data changes. Files
+# written with a different version are ignored and overwritten.
+SCHEMA_VERSION = 3
+
+# Column data is aligned to this number of bytes
+ALIGNMENT = 64
+
+# Each file starts with a magic string and the length of the JSON header
+MAGIC = b"SLFLINES"
+PREAMBLE = struct.Struct("<8sQ")
+
+# Bundles are zip archives of data files, described by a manifest
+BUNDLE_FORMAT = "spectral-line-finder bundle"
+BUNDLE_MANIFEST = "manifest.json"
+
+
+@dataclass
+class StoreEntry:
+    """Describes the data of an element in the line store."""
+
+    element: str
+    num_rows: int
+    size_bytes: int
+    # When the data was fetched from NIST, and when it was last loaded, as
+    # seconds since the epoch
+    created: float
+    last_used: float
+    # The stored wavelength intervals, `intervals.FULL_RANGE` for all lines
+    intervals: list[Interval]
+    is_stale: bool
+
+
+class LineStore:
+    """Columnar on-disk store for processed spectral line data.
+
+    The data of each element is stored in a single file. The file starts with
+    a JSON header describing the columns, followed by the raw column data.
+    Numeric columns are stored as-is. Text columns are stored as integer codes,
+    with -1 for missing values, into a table of their distinct values, which
+    are encoded as UTF-8. All columns are aligned so that they can be
+    memory-mapped and only the requested columns are read from disk.
+
+    A file holds either all lines of an element, or only the lines within
+    some wavelength intervals, which are listed in the header.
+
+    The size of the store can be limited, in which case the least recently
+    used elements are removed when data is saved. Loading an element updates
+    the modification time of its file, which is used as its last use.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        """Initializes the store.
+
+        Args:
+            directory: The directory containing the data files.
+            max_bytes: The maximum total size of the data files. If None, the
+                size is not limited.
+            ttl: The number of seconds after which data is stale and should be
+                fetched again, see `is_stale()`. If None, data never expires.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get_path(self, element: str) -> Path:
+        """Returns the path of the file containing the data of an element.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+
+        Returns:
+            The path of the data file.
+        """
+        return self.directory / f"{element}.lines"
+
+    def __contains__(self, element: str) -> bool:
+        return self.cached_intervals(element) == [FULL_RANGE]
+
+    def cached_intervals(self, element: str) -> list[Interval]:
+        """Returns the wavelength intervals for which an element has data.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+
+        Returns:
+            The sorted, disjoint intervals. `intervals.FULL_RANGE` is the only
+            interval if all lines are stored, and there are no intervals if
+            there is no valid data.
+        """
+        try:
+            header = self.read_header(element)
+        except (OSError, ValueError):
+            return []
+        if header["schema_version"] != SCHEMA_VERSION:
+            return []
+        # Files without intervals contain all lines
+        intervals = header.get("intervals")
+        if intervals is None:
+            return [FULL_RANGE]
+        return [(low, upp) for low, upp in intervals]
+
+    def is_stale(self, element: str) -> bool:
+        """Checks whether the data of an element is older than the TTL.
+
+        Stale data can still be loaded, but should be fetched again.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+
+        Returns:
+            True if there is valid data which was fetched more than `ttl`
+            seconds ago.
+        """
+        if self.ttl is None:
+            return False
+        try:
+            header = self.read_header(element)
+        except (OSError, ValueError):
+            return False
+        return (
+            header["schema_version"] == SCHEMA_VERSION
+            and time.time() - header["created"] > self.ttl
+        )
+
+    def elements(self) -> list[str]:
+        """Returns all elements with all their lines in the store."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path.stem for path in self.directory.glob("*.lines") if path.stem in self
+        )
+
+    def read_header(self, element: str) -> dict[str, Any]:
+        """Reads the header of the data file of an element.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+
+        Returns:
+            The header, containing the schema version, the number of rows, a
+            description of all columns and the stored wavelength intervals.
+
+        Raises:
+            OSError: If the file can't be read.
+            ValueError: If the file is not a valid data file.
+        """
+        with open(self.get_path(element), "rb") as f:
+            return self._read_header(f)
+
+    def _read_header(self, f) -> dict[str, Any]:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) != PREAMBLE.size:
+            raise ValueError("Truncated data file.")
+        magic, header_size = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError("Not a spectral line data file.")
+        return json.loads(f.read(header_size))
+
+    def save(
+        self,
+        element: str,
+        df: pd.DataFrame,
+        intervals: list[Interval] | None = None,
+        created: float | None = None,
+    ) -> None:
+        """Stores the data of an element, replacing any existing data.
+
+        If the size of the store is limited, the least recently used other
+        elements are removed afterwards to stay within the limit.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+            df: The processed spectral line data.
+            intervals: The sorted, disjoint wavelength intervals whose lines
+                the data contains. If None, the data contains all lines.
+            created: When the oldest part of the data was fetched, as seconds
+                since the epoch. Defaults to now.
+        """
+        # The arrays to write, with their offsets
+        arrays: list[tuple[int, np.ndarray]] = []
+
+        def add_array(array: np.ndarray) -> int:
+            offset = _align(arrays[-1][0] + arrays[-1][1].nbytes if arrays else 0)
+            arrays.append((offset, array))
+            return offset
+
+        columns: list[dict[str, Any]] = []
+        for name in df.columns:
+            series = df[name]
+            if series.dtype.kind in "biuf":
+                array = series.to_numpy()
+                columns.append(
+                    {
+                        "name": name,
+                        "dtype": array.dtype.str,
+                        "is_text": False,
+                        "offset": add_array(array),
+                    }
+                )
+                continue
+            codes, categories = _encode_text(series)
+            encoded = [category.encode() for category in categories]
+            ends = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+            columns.append(
+                {
+                    "name": name,
+                    "dtype": codes.dtype.str,
+                    "is_text": True,
+                    "offset": add_array(codes),
+                    "categories": {
+                        "count": len(encoded),
+                        "ends": add_array(ends),
+                        "data": add_array(np.frombuffer(b"".join(encoded), np.uint8)),
+                    },
+                }
+            )
+        header = {
+            "schema_version": SCHEMA_VERSION,
+            "created": time.time() if created is None else created,
+            "num_rows": len(df),
+            "columns": columns,
+            "intervals": None if intervals is None else [list(i) for i in intervals],
+        }
+        header_bytes = json.dumps(header).encode()
+        # Column offsets are relative to the (aligned) end of the header
+        data_start = _align(PREAMBLE.size + len(header_bytes))
+
+        def write(f: IO[bytes]) -> None:
+            f.write(PREAMBLE.pack(MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            for offset, array in arrays:
+                f.seek(data_start + offset)
+                f.write(array.tobytes())
+
+        self._write_file(element, write)
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes, keep=element)
+
+    def _write_file(self, element: str, write: Callable[[IO[bytes]], None]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so readers never see partial data
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, self.get_path(element))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def load(
+        self,
+        element: str,
+        columns: list[str] | None = None,
+        categorical_columns: Collection[str] = (),
+    ) -> pd.DataFrame:
+        """Loads the data of an element.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+            columns: The columns to load. If None, all columns are loaded.
+            categorical_columns: Text columns to load as categoricals, which
+                is faster and uses less memory than loading them as strings.
+
+        Returns:
+            A pandas DataFrame with the requested columns.
+
+        Raises:
+            KeyError: If there is no valid data for the element in the store.
+            UnknownColumnsError: If some of the columns are not in the data.
+        """
+        try:
+            path = self.get_path(element)
+            with open(path, "rb") as f:
+                header = self._read_header(f)
+                if header["schema_version"] != SCHEMA_VERSION:
+                    raise KeyError(element)
+                data_start = _align(f.tell())
+                _check_columns(header, columns)
+                # The modification time tracks the last use, for eviction. It
+                # is set by path, since Windows doesn't support file descriptors.
+                os.utime(path)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return self._read_columns(
+                        buffer, data_start, header, columns, categorical_columns
+                    )
+        except UnknownColumnsError:
+            raise
+        except (OSError, ValueError) as exc:
+            raise KeyError(element) from exc
+
+    def _read_columns(
+        self,
+        buffer: mmap.mmap,
+        data_start: int,
+        header: dict[str, Any],
+        columns: list[str] | None,
+        categorical_columns: Collection[str],
+    ) -> pd.DataFrame:
+        num_rows = header["num_rows"]
+        available = {column["name"]: column for column in header["columns"]}
+        if columns is None:
+            columns = list(available)
+
+        data: dict[str, np.ndarray | pd.Categorical] = {}
+        for name in columns:
+            column = available[name]
+            array = _read_array(
+                buffer, data_start + column["offset"], column["dtype"], num_rows
+            )
+            if column["is_text"]:
+                categories = _read_categories(buffer, data_start, column["categories"])
+                if name in categorical_columns:
+                    data[name] = pd.Categorical.from_codes(
+                        array, categories=pd.Index(categories, dtype=object)
+                    )
+                else:
+                    # Missing values have the code -1, so they are looked up
+                    # in the last entry
+                    lookup = np.array([*categories, np.nan], dtype=object)
+                    data[name] = lookup[array]
+            else:
+                data[name] = array
+        # The columns are copies already, so don't copy them again
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    def delete(self, element: str) -> None:
+        """Removes the data of an element from the store.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+        """
+        self.get_path(element).unlink(missing_ok=True)
+
+    def entries(self) -> list[StoreEntry]:
+        """Describes the data of all elements in the store.
+
+        Returns:
+            The entries of all elements with valid data, sorted by element.
+        """
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for path in sorted(self.directory.glob("*.lines")):
+            try:
+                header = self.read_header(path.stem)
+                stat = path.stat()
+            except (OSError, ValueError):
+                continue
+            if header["schema_version"] != SCHEMA_VERSION:
+                continue
+            entries.append(
+                StoreEntry(
+                    element=path.stem,
+                    num_rows=header["num_rows"],
+                    size_bytes=stat.st_size,
+                    created=header["created"],
+                    last_used=stat.st_mtime,
+                    intervals=self.cached_intervals(path.stem),
+                    is_stale=self.ttl is not None
+                    and time.time() - header["created"] > self.ttl,
+                )
+            )
+        return entries
+
+    def total_bytes(self) -> int:
+        """Returns the total size of all files in the store."""
+        if not self.directory.is_dir():
+            return 0
+        return sum(path.stat().st_size for path in self.directory.iterdir())
+
+    def evict(self, max_bytes: int, keep: str | None = None) -> list[str]:
+        """Removes the least recently used elements until the store is small enough.
+
+        Files of other versions and leftover temporary files are removed
+        first.
+
+        Args:
+            max_bytes: The maximum total size of the files in the store.
+            keep: An element which is never removed, like the one which was
+                just saved.
+
+        Returns:
+            The symbols of the removed elements, including invalid files.
+        """
+        if not self.directory.is_dir():
+            return []
+        files = []
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            # Unusable files are removed before any valid data
+            is_valid = path.suffix == ".lines" and bool(
+                self.cached_intervals(path.stem)
+            )
+            files.append((is_valid, stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, _, size, _ in files)
+
+        removed = []
+        now = time.time()
+        for is_valid, last_used, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            if path.suffix == ".lines" and path.stem == keep:
+                continue
+            # Temporary files of recent saves may still be written to
+            if path.suffix == ".tmp" and now - last_used < 60:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            if path.suffix == ".lines":
+                removed.append(path.stem)
+        return removed
+
+    def verify(self, element: str) -> str | None:
+        """Checks that the data file of an element is complete and readable.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+
+        Returns:
+            A description of the problem, or None if the data is valid.
+        """
+        path = self.get_path(element)
+        try:
+            with open(path, "rb") as f:
+                header = self._read_header(f)
+                data_start = _align(f.tell())
+        except FileNotFoundError:
+            return "no data"
+        except (OSError, ValueError) as exc:
+            return f"invalid header: {exc}"
+        if header["schema_version"] != SCHEMA_VERSION:
+            return (
+                f"schema version {header['schema_version']}, expected {SCHEMA_VERSION}"
+            )
+        size = path.stat().st_size
+        for column in header["columns"]:
+            end = (
+                column["offset"]
+                + header["num_rows"] * np.dtype(column["dtype"]).itemsize
+            )
+            if column["is_text"]:
+                # The size of the text is checked when loading the data
+                categories = column["categories"]
+                end = max(end, categories["ends"] + 8 * categories["count"])
+            if data_start + end > size:
+                return f"truncated column {column['name']!r}"
+        try:
+            self.load(element)
+        except KeyError as exc:
+            return f"unreadable data: {exc.__cause__}"
+        return None
+
+    def export_bundle(self, path: Path, elements: list[str] | None = None) -> list[str]:
+        """Writes the data of elements to a single, portable bundle file.
+
+        A bundle is a zip archive of the data files of the elements, which can
+        be imported into the store of another machine using
+        `import_bundle()`, without contacting NIST.
+
+        Args:
+            path: The path of the bundle file.
+            elements: The symbols of the elements. Defaults to all elements
+                with all their lines in the store.
+
+        Returns:
+            The symbols of the exported elements.
+
+        Raises:
+            KeyError: If not all lines of an element are in the store.
+        """
+        if elements is None:
+            elements = self.elements()
+        for element in elements:
+            if element not in self:
+                raise KeyError(element)
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "schema_version": SCHEMA_VERSION,
+            "created": time.time(),
+            "elements": elements,
+        }
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr(BUNDLE_MANIFEST, json.dumps(manifest))
+            for element in elements:
+                bundle.write(self.get_path(element), f"{element}.lines")
+        return elements
+
+    def import_bundle(self, path: Path, elements: list[str] | None = None) -> list[str]:
+        """Adds the data of the elements in a bundle file to the store.
+
+        The imported data replaces any data of the same elements in the store.
+
+        Args:
+            path: The path of a bundle file written by `export_bundle()`.
+            elements: The symbols of the elements to import. Defaults to all
+                elements in the bundle.
+
+        Returns:
+            The symbols of the imported elements.
+
+        Raises:
+            OSError: If the file can't be read.
+            ValueError: If the file is not a bundle, or its data was written
+                using a different schema version.
+            KeyError: If an element is not in the bundle.
+        """
+        try:
+            bundle = zipfile.ZipFile(path)
+        except zipfile.BadZipFile as exc:
+            raise ValueError("Not a spectral line bundle.") from exc
+        with bundle:
+            try:
+                manifest = json.loads(bundle.read(BUNDLE_MANIFEST))
+            except (KeyError, ValueError) as exc:
+                raise ValueError("Not a spectral line bundle.") from exc
+            if manifest.get("format") != BUNDLE_FORMAT:
+                raise ValueError("Not a spectral line bundle.")
+            if manifest["schema_version"] != SCHEMA_VERSION:
+                raise ValueError(
+                    "The bundle was written by an incompatible version, with "
+                    f"schema version {manifest['schema_version']}."
+                )
+            # Element symbols are used as file names
+            if not all(element.isalnum() for element in manifest["elements"]):
+                raise ValueError("Invalid element in bundle.")
+            if elements is None:
+                elements = manifest["elements"]
+            for element in elements:
+                if element not in manifest["elements"]:
+                    raise KeyError(element)
+
+            for element in elements:
+                with bundle.open(f"{element}.lines") as f:
+                    header = self._read_header(f)
+                if header["schema_version"] != SCHEMA_VERSION:
+                    raise ValueError(f"Invalid data of {element} in bundle.")
+                with bundle.open(f"{element}.lines") as source:
+                    self._write_file(element, lambda f: shutil.copyfileobj(source, f))
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+        return elements
+
+
+def _encode_text(series: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """Encodes a text column as codes into its distinct values.
+
+    Returns:
+        The code of each value, -1 for missing values, and the distinct values.
+        The codes use the smallest integer type which fits all codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        categories = series.cat.categories
+    else:
+        codes, categories = pd.factorize(series)
+    code_type = next(
+        code_type
+        for code_type in (np.int8, np.int16, np.int32)
+        if len(categories) <= np.iinfo(code_type).max
+    )
+    return codes.astype(code_type), [str(category) for category in categories]
+
+
+def _read_array(buffer: mmap.mmap, offset: int, dtype: str, count: int) -> np.ndarray:
+    """Reads an array from the memory map, as a copy.
+
+    The data is copied instead of keeping views of the memory map. On Windows,
+    a file which is mapped can't be replaced or deleted, which would block
+    saving fetched lines and eviction for as long as any frame uses the data.
+    Only the requested columns are paged in and copied.
+    """
+    if count == 0:
+        # Empty arrays may start beyond the end of the file
+        return np.array([], dtype=np.dtype(dtype))
+    return np.frombuffer(
+        buffer, dtype=np.dtype(dtype), count=count, offset=offset
+    ).copy()
+
+
+def _read_categories(
+    buffer: mmap.mmap, data_start: int, categories: dict[str, int]
+) -> list[str]:
+    ends = _read_array(
+        buffer, data_start + categories["ends"], "<i8", categories["count"]
+    ).tolist()
+    start = data_start + categories["data"]
+    data = buffer[start : start + (ends[-1] if ends else 0)]
+    if len(data) != (ends[-1] if ends else 0):
+        raise ValueError("Truncated data file.")
+    return [data[begin:end].decode() for begin, end in zip([0, *ends[:-1]], ends)]
+
+
+def _check_columns(header: dict[str, Any], columns: list[str] | None) -> None:
+    if columns is None:
+        return
+    available = [column["name"] for column in header["columns"]]
+    unknown = [name for name in columns if name not in available]
+    if unknown:
+        raise UnknownColumnsError(
+            f"Unknown columns: {', '.join(unknown)}. "
+            f"Available columns: {', '.join(available)}."
+        )
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,251 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from spectral_line_finder.fetch import SingleFlight
+from spectral_line_finder.instrumentation import instrumentation
+
+# Default memory budget for all merged frames together
+MAX_MERGED_FRAMES_BYTES = 256 * 1024 * 1024
+
+FrameLoader = Callable[[str, list[str] | None], pd.DataFrame]
+
+
+@dataclass
+class _Entry:
+    df: pd.DataFrame
+    # The loaded columns, or None if all columns are loaded
+    columns: frozenset[str] | None
+    nbytes: int
+
+    def has_columns(self, columns: list[str] | None) -> bool:
+        if self.columns is None:
+            return True
+        return columns is not None and self.columns.issuperset(columns)
+
+
+class MergedFrameCache:
+    """In-memory LRU cache of merged, wavelength-sorted multi-element frames.
+
+    Frames are keyed by the set of elements they contain. When a frame for a
+    new set of elements is requested, the largest cached frame for a subset of
+    those elements is reused and only the data of the missing elements is
+    merged into it. Least recently used frames are evicted when the total
+    memory usage exceeds the budget.
+
+    Frames are built without holding the lock of the cache, so a slow load,
+    like fetching an element from NIST, doesn't hold up requests for other
+    frames. Concurrent requests for the same frame share a single build.
+    """
+
+    def __init__(self, max_bytes: int = MAX_MERGED_FRAMES_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[frozenset[str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._builds: SingleFlight[pd.DataFrame] = SingleFlight("merged_frames")
+
+    @property
+    def nbytes(self) -> int:
+        """The total memory usage of all cached frames."""
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(
+        self,
+        elements: Iterable[str],
+        columns: list[str] | None,
+        load: FrameLoader,
+    ) -> pd.DataFrame | None:
+        """Returns the merged frame of the given elements, sorted by wavelength.
+
+        Args:
+            elements: The symbols of the elements.
+            columns: The columns which are needed. The returned frame may
+                contain more columns. If None, all columns are needed.
+            load: Function returning the data of a single element, given the
+                element and the columns to load.
+
+        Returns:
+            The merged data, or None if no elements are given. The frame is
+            shared between callers and must not be modified.
+        """
+        key = frozenset(elements)
+        if not key:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.has_columns(columns):
+                    self._entries.move_to_end(key)
+                    instrumentation.count("merged_frames.hit")
+                    return entry.df
+                # Also load the previously loaded columns, so alternating
+                # between column selections does not rebuild the frame
+                # every time.
+                if columns is not None:
+                    assert entry.columns is not None
+                    columns = sorted(entry.columns.union(columns))
+
+            base_key = self._find_base(key, columns)
+            base = None
+            if base_key is not None:
+                base = self._entries[base_key]
+                self._entries.move_to_end(base_key)
+
+        build_key = (key, None if columns is None else tuple(columns))
+        df = self._builds.do(
+            build_key, lambda: self._build_from(key, columns, base_key, base, load)
+        )
+
+        with self._lock:
+            self._entries[key] = _Entry(
+                df=df,
+                columns=None if columns is None else frozenset(df.columns),
+                nbytes=estimate_nbytes(df),
+            )
+            self._entries.move_to_end(key)
+            self._evict()
+        return df
+
+    def _build_from(
+        self,
+        key: frozenset[str],
+        columns: list[str] | None,
+        base_key: frozenset[str] | None,
+        base: _Entry | None,
+        load: FrameLoader,
+    ) -> pd.DataFrame:
+        """Builds a frame, merging the missing elements into a base frame."""
+        if base_key is None or base is None:
+            instrumentation.count("merged_frames.build")
+            return self._build(key, columns, load)
+        instrumentation.count("merged_frames.extend")
+        # Load the same columns as the base frame
+        base_columns = None if base.columns is None else list(base.df.columns)
+        df = base.df
+        for element in sorted(key - base_key):
+            df = merge_sorted(df, load(element, base_columns))
+        return df
+
+    def clear(self) -> None:
+        """Removes all frames from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def _find_base(
+        self, key: frozenset[str], columns: list[str] | None
+    ) -> frozenset[str] | None:
+        """Finds the largest cached frame for a strict subset of elements."""
+        candidates = [
+            other
+            for other, entry in self._entries.items()
+            if other < key and entry.has_columns(columns)
+        ]
+        return max(candidates, key=len, default=None)
+
+    def _build(
+        self, key: frozenset[str], columns: list[str] | None, load: FrameLoader
+    ) -> pd.DataFrame:
+        dfs = [load(element, columns) for element in sorted(key)]
+        return concat_frames(dfs).sort_values(
+            by="wavelength", kind="stable", ignore_index=True
+        )
+
+    def _evict(self) -> None:
+        """Evicts least recently used frames, always keeping the newest."""
+        total = self.nbytes
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+
+
+def merge_sorted(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Merges new lines into a frame which is already sorted by wavelength.
+
+    Only the new lines are sorted. Their positions in the merged frame are
+    found by a binary search in the existing wavelengths, after which all rows
+    are put in place at once.
+
+    Args:
+        base: Spectral line data, sorted by wavelength.
+        new: Spectral line data to add, in any order.
+
+    Returns:
+        The merged data, sorted by wavelength.
+    """
+    num_base, num_new = len(base), len(new)
+    new_wavelengths = new["wavelength"].to_numpy()
+    new_order = np.argsort(new_wavelengths, kind="stable")
+    # Insert new lines after existing lines with the same wavelength
+    insert_at = np.searchsorted(
+        base["wavelength"].to_numpy(), new_wavelengths[new_order], side="right"
+    )
+
+    is_new = np.zeros(num_base + num_new, dtype=bool)
+    is_new[insert_at + np.arange(num_new)] = True
+    order = np.empty(num_base + num_new, dtype=np.intp)
+    order[~is_new] = np.arange(num_base)
+    order[is_new] = num_base + new_order
+
+    if not new.columns.equals(base.columns):
+        new = new[base.columns]
+    merged = concat_frames([base, new]).take(order)
+    # Setting the index directly avoids copying all data, unlike reset_index()
+    merged.index = pd.RangeIndex(len(merged))
+    return merged
+
+
+def concat_frames(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates frames with the same columns, keeping categoricals compact.
+
+    pandas converts categorical columns to object columns when their
+    categories differ, which they do for different elements. Instead, the
+    categories of these columns are combined.
+
+    Args:
+        dfs: The frames, which all have the same columns in the same order.
+
+    Returns:
+        The concatenated frame, with a new index.
+    """
+    # Empty frames, like those of elements without lines in a wavelength
+    # range, may have other dtypes, which would change the merged dtypes
+    dfs = [df for df in dfs if len(df)] or dfs[:1]
+    categorical_columns = [
+        col
+        for col in dfs[0].columns
+        if all(isinstance(df[col].dtype, pd.CategoricalDtype) for df in dfs)
+    ]
+    if not categorical_columns or len(dfs) == 1:
+        return pd.concat(dfs, ignore_index=True)
+
+    merged = pd.concat(
+        [df.drop(columns=categorical_columns) for df in dfs], ignore_index=True
+    )
+    for col in categorical_columns:
+        merged[col] = union_categoricals([df[col] for df in dfs])
+    return merged[dfs[0].columns]
+
+
+def estimate_nbytes(df: pd.DataFrame, sample_size: int = 10_000) -> int:
+    """Estimates the memory usage of a dataframe, including its strings.
+
+    Measuring the size of every string is slow for large frames, so the
+    memory usage of a regular sample of rows is extrapolated instead.
+
+    Args:
+        df: The dataframe.
+        sample_size: The approximate number of rows to measure.
+
+    Returns:
+        The estimated memory usage in bytes.
+    """
+    if len(df) <= sample_size:
+        return int(df.memory_usage(deep=True).sum())
+    sample = df.iloc[:: len(df) // sample_size]
+    return int(sample.memory_usage(deep=True).sum() * len(df) / len(sample))
@@ -0,0 +1,167 @@
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from pandas._typing import ReadCsvBuffer
+
+# Columns of the tab-separated line lists, after renaming the observed
+# wavelength column
+COLUMNS = [
+    "element",
+    "sp_num",
+    "obs_wl(nm)",
+    "unc_obs_wl",
+    "ritz_wl_vac(nm)",
+    "unc_ritz_wl",
+    "intens",
+    "Aki(s^-1)",
+    "Acc",
+    "Ei(eV)",
+    "Ek(eV)",
+    "conf_i",
+    "term_i",
+    "J_i",
+    "conf_k",
+    "term_k",
+    "J_k",
+    "Type",
+    "tp_ref",
+    "line_ref",
+]
+
+# Columns which are supposed to be numeric but may contain extra non-numeric
+# characters, like "[5.1]" or "1000bl"
+ANNOTATED_COLUMNS = ["intens", "Ei(eV)", "Ek(eV)", "ritz_wl_vac(nm)"]
+NUMBER_PATTERN = r"(\d+\.?\d*)"
+
+# The original values of the annotated columns are kept in these columns
+RAW_COLUMNS = [f"{col}_" for col in ANNOTATED_COLUMNS]
+
+# Header rows are repeated throughout the data. The data for hydrogen lacks the
+# element and sp_num columns, so its header starts with the wavelength.
+GENERIC_HEADER_PREFIX = "element"
+HYDROGEN_HEADER_PREFIX = "obs_wl"
+
+
+class _HeaderFilter(io.TextIOBase):
+    """File-like object reading lines and dropping repeated header rows.
+
+    The lines are consumed lazily while pandas reads the data, so the complete
+    text is never kept in memory.
+    """
+
+    def __init__(self, lines: Iterator[str], header_prefix: str) -> None:
+        self._lines = lines
+        self._header_prefix = header_prefix
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        chunks = []
+        num_chars = 0
+        for line in self._lines:
+            if line.startswith(self._header_prefix):
+                continue
+            line = line.rstrip("\r\n") + "\n"
+            chunks.append(line)
+            num_chars += len(line)
+            if size is not None and 0 <= size <= num_chars:
+                break
+        return "".join(chunks)
+
+
+def _header_filter(lines: Iterator[str], header_prefix: str) -> "ReadCsvBuffer[str]":
+    # The filter provides all that pandas uses of a text file, but not the
+    # complete interface which the type stubs of `read_csv()` ask for
+    return cast("ReadCsvBuffer[str]", _HeaderFilter(lines, header_prefix))
+
+
+def parse_nist_lines(lines: Iterable[str]) -> pd.DataFrame:
+    """Parses a tab-separated line list from NIST in a single pass.
+
+    The lines can be any iterable of strings, e.g. an open file, the lines of
+    a streamed HTTP response or an `io.StringIO`. Both the generic format and
+    the hydrogen format (which lacks the element and ionization stage columns)
+    are recognized. Repeated header rows are dropped while reading.
+
+    Args:
+        lines: The lines of the tab-separated data, including the header.
+
+    Returns:
+        A pandas DataFrame with the sanitized spectral line data.
+    """
+    lines = iter(lines)
+    header = next(lines, "")
+    if header.startswith(HYDROGEN_HEADER_PREFIX):
+        df = pd.read_csv(
+            _header_filter(lines, HYDROGEN_HEADER_PREFIX),
+            delimiter="\t",
+            header=None,
+            names=COLUMNS[2:],
+            usecols=range(18),
+        )
+        df["element"] = "H"
+        df["sp_num"] = 1
+        # Reorder columns to be consistent with data from other elements.
+        df = df[COLUMNS]
+    else:
+        df = pd.read_csv(
+            _header_filter(lines, GENERIC_HEADER_PREFIX),
+            delimiter="\t",
+            header=None,
+            names=next(csv.reader([header], delimiter="\t"))[:20],
+            usecols=range(20),
+        ).rename(columns={"obs_wl_vac(nm)": "obs_wl(nm)"})
+    return sanitize_annotated_columns(df)
+
+
+def sanitize_annotated_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts columns with NIST annotations to numeric columns.
+
+    For each annotated column the leading number is extracted. The original
+    columns are kept in the dataframe by appending an underscore to the name.
+
+    Args:
+        df: The parsed spectral line data.
+
+    Returns:
+        The dataframe with the numeric columns added.
+    """
+    df = df.rename(columns={col: col + "_" for col in ANNOTATED_COLUMNS})
+    for col in ANNOTATED_COLUMNS:
+        df[col] = extract_numbers(df[col + "_"])
+    return df
+
+
+def extract_numbers(values: pd.Series) -> pd.Series:
+    """Extracts the leading number from values which may contain annotations.
+
+    Columns which are already numeric are returned as-is. Otherwise, the
+    regular expression is only matched once for every distinct value, which
+    is much faster since most values occur many times.
+
+    Args:
+        values: The raw values.
+
+    Returns:
+        The numeric values, or NaN if there is no number.
+    """
+    if values.dtype.kind in "iuf":
+        return values
+
+    codes, uniques = pd.factorize(values)
+    numbers = pd.to_numeric(
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.extract(NUMBER_PATTERN, expand=False)
+    ).to_numpy()
+    if (codes == -1).any():
+        # Missing values are marked by -1, which picks the appended NaN
+        numbers = np.append(numbers.astype(float), np.nan)
+    return pd.Series(numbers[codes], index=values.index)
@@ -0,0 +1,169 @@
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Literal, TextIO
+
+import numpy as np
+import pandas as pd
+
+ToleranceUnit = Literal["nm", "ppm"]
+
+# Columns describing the measured peak of each match
+PEAK_INDEX_COLUMN = "peak"
+PEAK_COLUMN = "peak(nm)"
+DELTA_COLUMN = "delta(nm)"
+
+# Line columns included in the matches by default
+DEFAULT_COLUMNS = [
+    "element",
+    "sp_num",
+    "obs_wl(nm)",
+    "ritz_wl_vac(nm)",
+    "intens",
+    "Ei(eV)",
+    "Ek(eV)",
+    "conf_i",
+    "conf_k",
+]
+
+# Number of peaks which are matched at once
+CHUNK_SIZE = 10_000
+
+
+def read_peaks(path: Path) -> np.ndarray:
+    """Reads measured peak wavelengths from a file.
+
+    The wavelengths are read from the first column of a text file, separated
+    from other columns by whitespace or commas. Lines which start with "#" and
+    lines which do not start with a number, like a header, are ignored.
+
+    Args:
+        path: The path of the file.
+
+    Returns:
+        The peak wavelengths in nm, in the order of the file.
+    """
+    peaks = pd.read_csv(
+        path,
+        sep=r"[\s,]+",
+        header=None,
+        usecols=[0],
+        comment="#",
+        engine="python",
+        skip_blank_lines=True,
+    )[0]
+    peaks = pd.to_numeric(peaks, errors="coerce").dropna()
+    return peaks.to_numpy(dtype=float)
+
+
+def match_peaks(
+    lines: pd.DataFrame,
+    peaks: np.ndarray,
+    tolerance: float,
+    unit: ToleranceUnit = "nm",
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """Finds the candidate spectral lines for each measured peak.
+
+    A line is a candidate for a peak if its wavelength differs from the peak
+    wavelength by at most the tolerance. The candidates of all peaks in a
+    chunk are found at once, by a binary search in the sorted wavelengths.
+
+    Args:
+        lines: Spectral line data, sorted by wavelength.
+        peaks: The measured peak wavelengths in nm, in any order.
+        tolerance: The maximum difference between a peak and a line.
+        unit: The unit of the tolerance, either "nm" or "ppm" of the peak
+            wavelength.
+        chunk_size: The number of peaks matched at once.
+
+    Yields:
+        Dataframes with one row per candidate line, with the index of the peak,
+        the peak wavelength, the difference between the line and the peak
+        wavelength, and the columns of the lines. Peaks are in the order in
+        which they were given, candidates of a peak are sorted by wavelength.
+    """
+    if unit not in ("nm", "ppm"):
+        raise ValueError(f"Unknown tolerance unit: {unit!r}")
+
+    wavelengths = lines["wavelength"].to_numpy()
+    peaks = np.asarray(peaks, dtype=float)
+    for chunk_start in range(0, len(peaks), chunk_size):
+        chunk = peaks[chunk_start : chunk_start + chunk_size]
+        tolerances = tolerance * chunk * 1e-6 if unit == "ppm" else tolerance
+        starts = wavelengths.searchsorted(chunk - tolerances, "left")
+        stops = wavelengths.searchsorted(chunk + tolerances, "right")
+
+        # Expand the [start, stop) ranges of all peaks into line indexes
+        counts = stops - starts
+        peak_indexes = np.repeat(np.arange(len(chunk)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        line_indexes = np.repeat(starts, counts) + offsets
+
+        matches = lines.iloc[line_indexes].reset_index(drop=True)
+        matched_peaks = chunk[peak_indexes]
+        matches.insert(0, PEAK_INDEX_COLUMN, chunk_start + peak_indexes)
+        matches.insert(1, PEAK_COLUMN, matched_peaks)
+        matches.insert(2, DELTA_COLUMN, wavelengths[line_indexes] - matched_peaks)
+        yield matches
+
+
+def write_tsv(matches: Iterable[pd.DataFrame], file: TextIO) -> int:
+    """Writes matches as tab-separated values, one chunk at a time.
+
+    Args:
+        matches: The matches, in chunks.
+        file: The file to write to.
+
+    Returns:
+        The number of matches written.
+    """
+    num_matches = 0
+    for idx, chunk in enumerate(matches):
+        chunk.to_csv(file, sep="\t", index=False, header=idx == 0)
+        num_matches += len(chunk)
+    return num_matches
+
+
+def write_json(matches: Iterable[pd.DataFrame], file: TextIO) -> int:
+    """Writes matches as a JSON array of objects, one chunk at a time.
+
+    Args:
+        matches: The matches, in chunks.
+        file: The file to write to.
+
+    Returns:
+        The number of matches written.
+    """
+    num_matches = 0
+    file.write("[")
+    for chunk in matches:
+        # Convert to Python objects, with missing values as None (null)
+        records = chunk.astype(object).where(chunk.notna(), None)
+        for record in records.to_dict(orient="records"):
+            file.write(",\n" if num_matches else "\n")
+            file.write(json.dumps(record))
+            num_matches += 1
+    file.write("\n]\n" if num_matches else "]\n")
+    return num_matches
+
+
+def write_matches(
+    matches: Iterable[pd.DataFrame], file: TextIO, format: str = "tsv"
+) -> int:
+    """Writes matches in the given format.
+
+    Args:
+        matches: The matches, in chunks.
+        file: The file to write to.
+        format: The output format, either "tsv" or "json".
+
+    Returns:
+        The number of matches written.
+    """
+    writers = {"tsv": write_tsv, "json": write_json}
+    if format not in writers:
+        raise ValueError(f"Unknown output format: {format!r}")
+    return writers[format](matches, file)
@@ -0,0 +1,62 @@
+from rich.table import Table
+from rich.text import Text
+from textual.widgets import Static
+
+from spectral_line_finder.instrumentation import instrumentation
+
+# Details of a record which are shown in their own columns
+_STANDARD_FIELDS = {"stage", "duration_ms", "time", "thread", "rows"}
+
+
+class PerformancePanel(Static):
+    """Shows the timings of the most recent stages and the cache counters.
+
+    The timing hooks are enabled while the panel is shown.
+    """
+
+    # Interval between updates of the panel, in seconds
+    UPDATE_INTERVAL = 0.5
+
+    # Number of recent stages shown
+    NUM_RECORDS = 10
+
+    def on_mount(self) -> None:
+        self._timer = self.set_interval(
+            self.UPDATE_INTERVAL, self.update_timings, pause=True
+        )
+
+    def toggle(self) -> None:
+        """Shows or hides the panel, enabling the timing hooks while shown."""
+        self.display = not self.display
+        if self.display:
+            instrumentation.enable()
+            self.update_timings()
+            self._timer.resume()
+        else:
+            self._timer.pause()
+            instrumentation.disable()
+
+    def update_timings(self) -> None:
+        table = Table(box=None, expand=True, padding=(0, 1))
+        table.add_column("Stage")
+        table.add_column("Time (ms)", justify="right")
+        table.add_column("Rows", justify="right")
+        table.add_column("Details", ratio=1)
+        for record in list(instrumentation.records)[-self.NUM_RECORDS :]:
+            details = ", ".join(
+                f"{key}={value}"
+                for key, value in record.items()
+                if key not in _STANDARD_FIELDS
+            )
+            table.add_row(
+                record["stage"],
+                f"{record['duration_ms']:.1f}",
+                str(record.get("rows", "")),
+                details,
+            )
+        counters = "  ".join(
+            f"{name}: {count}"
+            for name, count in sorted(instrumentation.counters.items())
+        )
+        table.caption = Text(counters or "No cache lookups yet.", style="dim")
+        self.update(table)
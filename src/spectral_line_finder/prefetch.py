@@ -0,0 +1,150 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Literal, TypeAlias
+
+import httpx
+
+from spectral_line_finder.fetch import fetch_nist_data_async
+
+# The symbols of all elements, by atomic number
+ELEMENTS = [
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne",
+    "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K", "Ca",
+    "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn",
+    "Ga", "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr",
+    "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn",
+    "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd",
+    "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb",
+    "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg",
+    "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th",
+    "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm",
+    "Md", "No", "Lr", "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds",
+    "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og",
+]  # fmt: skip
+
+# Default limits for downloading many elements, to go easy on the NIST server
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+DEFAULT_MAX_RETRIES = 3
+# Delay before the first retry in seconds, doubled for every further retry
+DEFAULT_BACKOFF = 1.0
+# Line lists of heavy elements are large, and take a while to download
+PREFETCH_TIMEOUT = 120.0
+
+PrefetchStatus: TypeAlias = Literal[
+    "fetched", "cached", "no_lines", "unavailable", "failed"
+]
+
+
+@dataclass
+class PrefetchResult:
+    """The outcome of prefetching the data of an element."""
+
+    element: str
+    # "fetched" if the data was downloaded, "cached" if it was cached already,
+    # "no_lines" if NIST has no lines for the element, "unavailable" if NIST
+    # returned an error page, like for unknown elements, and "failed" if the
+    # download failed, also after retrying
+    status: PrefetchStatus
+    num_lines: int = 0
+    error: str | None = None
+
+
+class RateLimiter:
+    """Spaces the start of requests evenly in time."""
+
+    def __init__(self, requests_per_second: float | None) -> None:
+        """Initializes the rate limiter.
+
+        Args:
+            requests_per_second: The maximum rate of requests. If None or
+                zero, requests are not limited.
+        """
+        self.interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        """Waits until the next request may start."""
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        # Reserve the slot before sleeping, so concurrent callers queue up
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Checks whether a failed request may succeed when repeated.
+
+    Network errors, timeouts, server errors and rate limiting by the server
+    are temporary. Error pages of NIST, like for unknown elements, are not.
+
+    Args:
+        exc: The exception raised by the request.
+
+    Returns:
+        True if the request should be retried.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        status_code = exc.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def get_retry_delay(exc: Exception, attempt: int, backoff: float) -> float:
+    """Calculates the delay before retrying a failed request.
+
+    The delay grows exponentially with the number of attempts, with random
+    jitter so that parallel requests don't retry at the same time. A delay
+    requested by the server using a Retry-After header is respected.
+
+    Args:
+        exc: The exception raised by the request.
+        attempt: The number of attempts so far, starting at 1.
+        backoff: The delay before the first retry in seconds.
+
+    Returns:
+        The delay in seconds.
+    """
+    delay = backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+    return delay
+
+
+async def fetch_with_retries(
+    client: httpx.AsyncClient,
+    element: str,
+    rate_limiter: RateLimiter,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+) -> str:
+    """Fetches the raw spectral line data of an element, retrying on failures.
+
+    Args:
+        client: The client to use for the requests.
+        element: The symbol of the element to fetch data for (e.g., "H", "He").
+        rate_limiter: Limits the rate of all requests, including retries.
+        max_retries: The maximum number of retries after the first attempt.
+        backoff: The delay before the first retry in seconds, doubled for
+            every further retry.
+
+    Returns:
+        The raw tab-separated data.
+
+    Raises:
+        NistDataError: If the NIST website returns an error page.
+        httpx.HTTPError: If the request still fails after all retries.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        await rate_limiter.wait()
+        try:
+            return await fetch_nist_data_async(client, element)
+        except httpx.HTTPError as exc:
+            if attempt > max_retries or not is_retryable(exc):
+                raise
+            await asyncio.sleep(get_retry_delay(exc, attempt, backoff))
@@ -3,8 +3,6 @@ from textual.containers import Vertical
 from textual.screen import ModalScreen
 from textual.widgets import Button, Footer, SelectionList
 
-from spectral_line_finder.data import NistSpectralLines
-
 
 class SelectColumnsDialog(ModalScreen):
     BINDINGS = [("escape", "discard_choices", "Close and Discard Choices")]
@@ -19,15 +17,19 @@ class SelectColumnsDialog(ModalScreen):
         super().__init__(name, id, classes)
         self.initial_selected = initial_selected
 
+    @property
+    def all_columns(self) -> list[str]:
+        # Imported here, since the data module is slow to import
+        from spectral_line_finder.data import NistSpectralLines
+
+        return NistSpectralLines.all_columns + NistSpectralLines.computed_columns
+
     def compose(self) -> ComposeResult:
         yield Footer()
         with Vertical() as container:
             container.border_title = "Select visible columns"
             yield SelectionList[str](
-                *(
-                    (col, col, col in self.initial_selected)
-                    for col in NistSpectralLines.all_columns
-                )
+                *((col, col, col in self.initial_selected) for col in self.all_columns)
             )
             yield Button("Confirm Choices", variant="primary")
 
@@ -35,7 +37,7 @@ class SelectColumnsDialog(ModalScreen):
         self.dismiss(
             [
                 col
-                for col in NistSpectralLines.all_columns
+                for col in self.all_columns
                 if col in self.query_one(SelectionList).selected
             ]
         )
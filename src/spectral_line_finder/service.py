@@ -0,0 +1,766 @@
+import asyncio
+import copy
+import functools
+import json
+import logging
+import threading
+import types
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from dataclasses import asdict, fields
+from typing import Any, get_args, get_origin, get_type_hints
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from spectral_line_finder.blends import CLUSTER_COLUMN
+from spectral_line_finder.data import (
+    QUERY_CHUNK_SIZE,
+    FilteredLines,
+    NistSpectralLines,
+)
+from spectral_line_finder.exceptions import NistDataError
+from spectral_line_finder.fetch import MAX_CONCURRENT_REQUESTS, SingleFlight
+from spectral_line_finder.filters import DataFilters
+from spectral_line_finder.intervals import Interval
+from spectral_line_finder.peak_matching import ToleranceUnit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Number of filtered snapshots kept by the service, for different clients
+MAX_SNAPSHOTS = 16
+
+# Status codes used by the service, with their reason phrases
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+class BadRequest(Exception):
+    """Raised when a request to the service is invalid."""
+
+
+class LineService:
+    """HTTP service answering spectral line queries for several clients.
+
+    The merged line data is loaded once and kept in memory, in compact form,
+    for all clients. Requests are JSON objects posted to an endpoint, and
+    the filters are given by the fields of `DataFilters`:
+
+    - `POST /cached`: which elements are cached.
+    - `POST /load`: fetches elements, streaming a JSON line per loaded element.
+    - `POST /lines`: the number of lines passing the filters and a range of
+      them, with the requested columns.
+    - `POST /spectrum`: the wavelengths and colors of the filtered lines.
+    - `POST /match`: the lines matching measured peaks.
+
+    Snapshots of the filtered lines are kept for the most recently used
+    filters, so clients paging through the same lines share them. The work is
+    done in threads, so slow requests don't hold up other clients.
+    """
+
+    def __init__(
+        self,
+        spectrum: NistSpectralLines | None = None,
+        max_snapshots: int = MAX_SNAPSHOTS,
+    ) -> None:
+        """Initializes the service.
+
+        Args:
+            spectrum: The spectral lines to serve. Defaults to compact lines.
+            max_snapshots: The number of filtered snapshots to keep.
+        """
+        self.spectrum = spectrum or NistSpectralLines(compact=True)
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[str, FilteredLines] = OrderedDict()
+        self._snapshots_lock = threading.Lock()
+        self._computations: SingleFlight[FilteredLines] = SingleFlight(
+            "service.snapshot"
+        )
+        self._handlers: dict[str, Handler] = {
+            "/cached": self._cached,
+            "/lines": self._lines,
+            "/spectrum": self._spectrum,
+            "/match": self._match,
+        }
+
+    async def start(
+        self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+    ) -> asyncio.Server:
+        """Starts listening for requests.
+
+        Args:
+            host: The address to listen on.
+            port: The port to listen on, or 0 for any free port.
+
+        Returns:
+            The running server.
+        """
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def get_filtered_lines(self, filters: DataFilters) -> FilteredLines:
+        """Returns a snapshot of the lines passing the filters, shared by clients.
+
+        Args:
+            filters: The filters to apply.
+
+        Returns:
+            The snapshot of the filtered lines.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        key = json.dumps(encode_filters(filters), sort_keys=True)
+        if (snapshot := self._get_snapshot(key)) is not None:
+            return snapshot
+        # Clients asking for the same filters at once share a single snapshot,
+        # while snapshots for other filters are computed at the same time
+        return self._computations.do(
+            key, functools.partial(self._compute_snapshot, key, filters)
+        )
+
+    def _compute_snapshot(self, key: str, filters: DataFilters) -> FilteredLines:
+        if (snapshot := self._get_snapshot(key)) is not None:
+            return snapshot
+        snapshot = self.spectrum.filter_lines(filters)
+        with self._snapshots_lock:
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def _get_snapshot(self, key: str) -> FilteredLines | None:
+        with self._snapshots_lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+            return snapshot
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answers the requests on a connection, which is kept alive."""
+        try:
+            while request_line := await reader.readline():
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()).strip():
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self._handle_request(method, path, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter
+    ) -> None:
+        if path != "/load" and path not in self._handlers:
+            await _send_json(writer, 404, {"error": f"Unknown endpoint: {path}"})
+            return
+        if method != "POST":
+            await _send_json(writer, 405, {"error": "Only POST is supported."})
+            return
+        # Once the headers of a streamed response are sent, errors are sent as
+        # the last record of the stream instead of as a new response
+        headers_sent = False
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise BadRequest("The request must be a JSON object.")
+            if path == "/load":
+                elements = _decode_elements(request.get("elements"))
+                wavelength_range = _decode_range(request.get("wavelength_range"))
+                await _send_stream_headers(writer)
+                headers_sent = True
+                await self._load(elements, wavelength_range, writer)
+                return
+            response = await self._handlers[path](request)
+        except (BadRequest, ValueError, TypeError, KeyError) as e:
+            await _send_error(writer, 400, str(e), headers_sent)
+        except (NistDataError, httpx.HTTPError) as e:
+            await _send_error(writer, 502, str(e) or type(e).__name__, headers_sent)
+        except ConnectionError:
+            # The client is gone, so there is no one to send an error to
+            raise
+        except Exception:
+            logger.exception("Error handling a request to %s", path)
+            await _send_error(writer, 500, "Internal server error.", headers_sent)
+        else:
+            await _send_json(writer, 200, response)
+
+    async def _cached(self, request: dict[str, Any]) -> dict[str, Any]:
+        elements = _decode_elements(request.get("elements"))
+        wavelength_range = _decode_range(request.get("wavelength_range"))
+        return {
+            "cached": {
+                element: self.spectrum.is_cached(element, wavelength_range)
+                for element in elements
+            }
+        }
+
+    async def _load(
+        self,
+        elements: list[str],
+        wavelength_range: Interval | None,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Loads elements, streaming each element as soon as it is loaded."""
+        async for element in self.spectrum.load_data_from_nist_concurrently(
+            elements, wavelength_range=wavelength_range
+        ):
+            await _send_chunk(writer, {"element": element})
+        await _end_stream(writer)
+
+    async def _lines(self, request: dict[str, Any]) -> dict[str, Any]:
+        filters = decode_filters(request["filters"])
+        columns = request.get("columns") or NistSpectralLines.all_columns
+        _check_columns(columns, allow_computed=True)
+        start = int(request.get("start", 0))
+        stop = request.get("stop")
+
+        def get_lines() -> dict[str, Any]:
+            snapshot = self.get_filtered_lines(filters)
+            page = snapshot.get_page(
+                start, len(snapshot) if stop is None else int(stop), columns
+            )
+            return {"num_lines": len(snapshot), "lines": encode_frame(page)}
+
+        return await asyncio.to_thread(get_lines)
+
+    async def _spectrum(self, request: dict[str, Any]) -> dict[str, Any]:
+        filters = decode_filters(request["filters"])
+
+        def get_spectrum() -> dict[str, Any]:
+            snapshot = self.get_filtered_lines(filters)
+            return {
+                "wavelengths": snapshot.wavelengths.tolist(),
+                "colors": snapshot.colors.astype(np.int64).tolist(),
+            }
+
+        return await asyncio.to_thread(get_spectrum)
+
+    async def _match(self, request: dict[str, Any]) -> dict[str, Any]:
+        filters = decode_filters(request["filters"])
+        peaks = np.asarray(request["peaks"], dtype=float)
+        tolerance = float(request["tolerance"])
+        unit = request.get("unit", "nm")
+        if unit not in ("nm", "ppm"):
+            raise BadRequest(f"Unknown tolerance unit: {unit!r}")
+        columns = request.get("columns")
+        if columns is not None:
+            _check_columns(columns)
+
+        def match() -> dict[str, Any]:
+            chunks = list(
+                self.spectrum.match_peaks(peaks, tolerance, filters, unit, columns)
+            )
+            if not chunks:
+                return {"matches": None}
+            return {"matches": encode_frame(pd.concat(chunks, ignore_index=True))}
+
+        return await asyncio.to_thread(match)
+
+
+class RemoteFilteredLines:
+    """Snapshot of the lines passing a set of filters, kept by a service.
+
+    This implements `data.LineSnapshot`. The lines are requested
+    from the service a page at a time.
+    """
+
+    def __init__(
+        self,
+        client: "LineServiceClient",
+        version: int,
+        filters: DataFilters,
+        num_lines: int,
+    ) -> None:
+        self._client = client
+        self.version = version
+        self.filters = filters
+        self._num_lines = num_lines
+
+    def __len__(self) -> int:
+        return self._num_lines
+
+    def get_page(self, start: int, stop: int, columns: list[str]) -> pd.DataFrame:
+        """Returns a range of the filtered lines.
+
+        Args:
+            start: The position of the first line.
+            stop: The position after the last line.
+            columns: The columns to return.
+
+        Returns:
+            The lines in the range, with the given columns.
+        """
+        return self._client.get_lines(self.filters, columns, start, stop)[1]
+
+    @functools.cached_property
+    def _spectrum(self) -> dict[str, Any]:
+        return self._client.request(
+            "/spectrum", {"filters": encode_filters(self.filters)}
+        )
+
+    @property
+    def wavelengths(self) -> np.ndarray:
+        """The sorted wavelengths of the lines."""
+        return np.array(self._spectrum["wavelengths"], dtype=float)
+
+    @property
+    def colors(self) -> np.ndarray:
+        """An (N, 3) array with the red, green and blue components (0-255)."""
+        return np.array(self._spectrum["colors"], dtype=np.int64).reshape(-1, 3)
+
+
+class LineServiceClient:
+    """Client of a `LineService`, usable in place of `NistSpectralLines`.
+
+    The client offers the methods of `NistSpectralLines` which are used by
+    `SpectralLinesTable`, so that the table can show the lines kept by a
+    service instead of loading them itself.
+    """
+
+    def __init__(self, url: str, timeout: float = 300.0) -> None:
+        """Initializes the client.
+
+        Args:
+            url: The URL of the service, like "http://127.0.0.1:8765".
+            timeout: The maximum time to wait for a response, in seconds.
+                Loading elements which are not cached can take a while.
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # A single client keeps the connection to the service alive
+        self._client = httpx.Client(base_url=self.url, timeout=timeout)
+        self._filtered_lines: RemoteFilteredLines | None = None
+        self._filtered_lines_version = 0
+        self._filtered_lines_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Closes the connection to the service."""
+        self._client.close()
+
+    def request(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """Posts a request to the service.
+
+        Args:
+            path: The endpoint, like "/lines".
+            payload: The request.
+
+        Returns:
+            The response.
+
+        Raises:
+            NistDataError: If the service can't fetch the data of an element.
+            httpx.HTTPStatusError: If the request is rejected.
+        """
+        response = self._client.post(path, json=payload)
+        _check_response(response)
+        return response.json()
+
+    def is_cached(self, element: str, wavelength_range: Interval | None = None) -> bool:
+        """Checks whether the service has the data of an element cached.
+
+        Args:
+            element: The symbol of the element (e.g., "H", "He").
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
+
+        Returns:
+            True if the data can be loaded without contacting NIST.
+        """
+        response = self.request(
+            "/cached", {"elements": [element], "wavelength_range": wavelength_range}
+        )
+        return response["cached"][element]
+
+    def are_cached(
+        self, elements: list[str], wavelength_range: Interval | None = None
+    ) -> bool:
+        """Checks whether the service has the data of all elements cached.
+
+        The elements are checked with a single request.
+
+        Args:
+            elements: The symbols of the elements.
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
+
+        Returns:
+            True if the data can be loaded without contacting NIST.
+        """
+        if not elements:
+            return True
+        response = self.request(
+            "/cached", {"elements": elements, "wavelength_range": wavelength_range}
+        )
+        return all(response["cached"].values())
+
+    async def load_data_from_nist_concurrently(
+        self,
+        elements: list[str],
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        wavelength_range: Interval | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """Makes the service load the data of elements.
+
+        Args:
+            elements: The symbols of the elements to load.
+            max_concurrency: Unused; the service limits the requests to NIST.
+            wavelength_range: The wavelength range in nm of the lines which are
+                needed. If None, all lines are needed.
+
+        Yields:
+            The symbols of the elements, in the order they become available.
+
+        Raises:
+            NistDataError: If the NIST website returns an error page for any of
+                the elements.
+        """
+        payload = {"elements": elements, "wavelength_range": wavelength_range}
+        async with httpx.AsyncClient(base_url=self.url, timeout=self.timeout) as client:
+            async with client.stream("POST", "/load", json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                    _check_response(response)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    message = json.loads(line)
+                    if "error" in message:
+                        raise NistDataError(message["error"])
+                    yield message["element"]
+
+    def get_lines(
+        self,
+        filters: DataFilters,
+        columns: list[str] | None = None,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> tuple[int, pd.DataFrame]:
+        """Returns a range of the lines passing the filters.
+
+        Args:
+            filters: The filters to apply.
+            columns: The columns to return. Defaults to all columns.
+            start: The position of the first line.
+            stop: The position after the last line, or None for all lines.
+
+        Returns:
+            The total number of lines passing the filters, and the lines in
+            the range.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        response = self.request(
+            "/lines",
+            {
+                "filters": encode_filters(filters),
+                "columns": columns,
+                "start": start,
+                "stop": stop,
+            },
+        )
+        lines = decode_frame(response["lines"])
+        if CLUSTER_COLUMN in lines:
+            # Restore the integer column, which is decoded as floats since
+            # lines which are not blended have no cluster
+            lines[CLUSTER_COLUMN] = lines[CLUSTER_COLUMN].astype("Int64")
+        return response["num_lines"], lines
+
+    def get_filtered_lines(self, filters: DataFilters) -> RemoteFilteredLines:
+        """Returns a snapshot of the spectral lines which pass the filters.
+
+        Args:
+            filters: The filters to apply.
+
+        Returns:
+            The snapshot of the filtered lines.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        with self._filtered_lines_lock:
+            if (snapshot := self.peek_filtered_lines(filters)) is not None:
+                return snapshot
+            num_lines, _ = self.get_lines(filters, start=0, stop=0)
+            self._filtered_lines_version += 1
+            self._filtered_lines = RemoteFilteredLines(
+                self, self._filtered_lines_version, copy.deepcopy(filters), num_lines
+            )
+            return self._filtered_lines
+
+    def peek_filtered_lines(self, filters: DataFilters) -> RemoteFilteredLines | None:
+        """Returns the latest snapshot if it matches the filters, without waiting.
+
+        Args:
+            filters: The filters which should have been applied.
+
+        Returns:
+            The snapshot, or None if there is no snapshot for these filters.
+        """
+        snapshot = self._filtered_lines
+        if snapshot is not None and snapshot.filters == filters:
+            return snapshot
+        return None
+
+    def query_lines(
+        self,
+        filters: DataFilters,
+        columns: list[str] | None = None,
+        chunk_size: int = QUERY_CHUNK_SIZE,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """Returns the spectral lines which pass the filters, in chunks.
+
+        Args:
+            filters: The filters to apply.
+            columns: The columns to return. Defaults to all columns.
+            chunk_size: The maximum number of lines per chunk.
+
+        Yields:
+            The lines, sorted by wavelength, with the requested columns.
+
+        Raises:
+            NistDataError: If the data of an element can't be fetched.
+        """
+        start = 0
+        while True:
+            num_lines, chunk = self.get_lines(
+                filters, columns, start, start + chunk_size
+            )
+            if len(chunk):
+                yield chunk
+            start += chunk_size
+            if start >= num_lines:
+                return
+
+    def match_peaks(
+        self,
+        peaks: np.ndarray,
+        tolerance: float,
+        filters: DataFilters,
+        unit: ToleranceUnit = "nm",
+        columns: list[str] | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """Finds the candidate spectral lines for measured peaks.
+
+        See `NistSpectralLines.match_peaks()`.
+
+        Yields:
+            The matches.
+        """
+        response = self.request(
+            "/match",
+            {
+                "filters": encode_filters(filters),
+                "peaks": np.asarray(peaks, dtype=float).tolist(),
+                "tolerance": tolerance,
+                "unit": unit,
+                "columns": columns,
+            },
+        )
+        if response["matches"] is not None:
+            yield decode_frame(response["matches"])
+
+
+def encode_filters(filters: DataFilters) -> dict[str, Any]:
+    """Converts filters to a JSON-compatible dictionary.
+
+    Args:
+        filters: The filters.
+
+    Returns:
+        The settings of each filter, by field name.
+    """
+    return asdict(filters)
+
+
+def decode_filters(data: dict[str, Any]) -> DataFilters:
+    """Converts a dictionary made by `encode_filters()` back to filters.
+
+    Filters which are missing keep their default settings.
+
+    Args:
+        data: The settings of each filter, by field name.
+
+    Returns:
+        The filters.
+
+    Raises:
+        BadRequest: If a filter or setting is unknown, or a setting has the
+            wrong type.
+    """
+    filters = DataFilters()
+    names = {field_.name for field_ in fields(filters)}
+    for name, settings in data.items():
+        if name not in names:
+            raise BadRequest(f"Unknown filter: {name!r}")
+        if not isinstance(settings, dict):
+            raise BadRequest(f"The settings of filter {name!r} must be an object.")
+        filter = getattr(filters, name)
+        types_ = get_type_hints(type(filter))
+        for key, value in settings.items():
+            if key == "col_name":
+                continue
+            if key not in types_:
+                raise BadRequest(f"Unknown setting of filter {name!r}: {key!r}")
+            if not _has_type(value, types_[key]):
+                raise BadRequest(
+                    f"Invalid value of setting {key!r} of filter {name!r}: {value!r}"
+                )
+            setattr(filter, key, value)
+    return filters
+
+
+def _has_type(value: Any, type_: Any) -> bool:
+    if isinstance(type_, types.UnionType):
+        return any(_has_type(value, arg) for arg in get_args(type_))
+    if type_ is bool or isinstance(value, bool):
+        return type_ is bool and isinstance(value, bool)
+    if type_ in (int, float):
+        # JSON numbers may be integers or not, and integer filters convert them
+        return isinstance(value, (int, float))
+    if get_origin(type_) is list:
+        (item_type,) = get_args(type_)
+        return isinstance(value, list) and all(
+            _has_type(item, item_type) for item in value
+        )
+    return isinstance(value, type_)
+
+
+def encode_frame(df: pd.DataFrame) -> dict[str, list]:
+    """Converts a frame to a JSON-compatible dictionary of columns.
+
+    Args:
+        df: The frame.
+
+    Returns:
+        The values of each column, with missing values as None.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == np.float32:
+            # Send the values the single precision values were converted from
+            values = values.astype(str).astype(np.float64)
+        values = values.astype(object)
+        columns[col] = values.where(values.notna(), None).tolist()
+    return columns
+
+
+def decode_frame(columns: dict[str, list]) -> pd.DataFrame:
+    """Converts a dictionary made by `encode_frame()` back to a frame.
+
+    Args:
+        columns: The values of each column.
+
+    Returns:
+        The frame.
+    """
+    return pd.DataFrame(columns, columns=list(columns))
+
+
+def _decode_elements(value: Any) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise BadRequest("The elements must be a list of element symbols.")
+    return value
+
+
+def _decode_range(value: list[float] | None) -> Interval | None:
+    if value is None:
+        return None
+    low, upp = value
+    return float(low), float(upp)
+
+
+def _check_columns(columns: list[str], allow_computed: bool = False) -> None:
+    known_columns = NistSpectralLines.all_columns + ["wavelength", "r", "g", "b"]
+    if allow_computed:
+        known_columns = known_columns + NistSpectralLines.computed_columns
+    unknown_columns = set(columns) - set(known_columns)
+    if unknown_columns:
+        raise BadRequest(f"Unknown columns: {', '.join(sorted(unknown_columns))}")
+
+
+def _check_response(response: httpx.Response) -> None:
+    if response.status_code == 502:
+        raise NistDataError(response.json()["error"])
+    response.raise_for_status()
+
+
+async def _send_json(
+    writer: asyncio.StreamWriter, status: int, payload: dict[str, Any]
+) -> None:
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+
+
+async def _send_error(
+    writer: asyncio.StreamWriter, status: int, message: str, headers_sent: bool
+) -> None:
+    if headers_sent:
+        await _send_chunk(writer, {"error": message})
+        await _end_stream(writer)
+    else:
+        await _send_json(writer, status, {"error": message})
+
+
+async def _send_stream_headers(writer: asyncio.StreamWriter) -> None:
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/x-ndjson\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+    )
+    await writer.drain()
+
+
+async def _send_chunk(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    data = json.dumps(message).encode() + b"\n"
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+
+async def _end_stream(writer: asyncio.StreamWriter) -> None:
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    service: LineService | None = None,
+) -> None:
+    """Runs the line service until cancelled.
+
+    Args:
+        host: The address to listen on.
+        port: The port to listen on.
+        service: The service to run. Defaults to a new service.
+    """
+    server = await (service or LineService()).start(host, port)
+    async with server:
+        await server.serve_forever()
@@ -1,15 +1,28 @@
+import asyncio
+import copy
+import functools
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
 from rich.text import Text
 from textual import work
-from textual.widgets import DataTable
+from textual.worker import get_current_worker
 
-from spectral_line_finder import data
+from spectral_line_finder.exceptions import NistDataError
 from spectral_line_finder.filter_data import FilterDataDialog
+from spectral_line_finder.filters import DataFilters, ElementFilter
+from spectral_line_finder.instrumentation import instrumentation
 from spectral_line_finder.select_columns import SelectColumnsDialog
-from spectral_line_finder.spectrum_plot import SpectrumPlot
+from spectral_line_finder.virtual_table import VirtualTable
 from spectral_line_finder.wavelength_dialog import WavelengthDialog
 
+if TYPE_CHECKING:
+    from spectral_line_finder.data import LineSnapshot, NistSpectralLines
+    from spectral_line_finder.service import LineServiceClient
+    from spectral_line_finder.spectrum_plot import SpectrumPlot
+
 
-class SpectralLinesTable(DataTable):
+class SpectralLinesTable(VirtualTable):
     BINDINGS = [
         ("c", "select_columns", "Select Columns"),
         ("f", "filter_data", "Filter data"),
@@ -29,36 +42,178 @@ class SpectralLinesTable(DataTable):
         "conf_k",
     ]
 
-    filters = data.DataFilters()
+    filters = DataFilters()
 
-    def on_mount(self):
-        self.spectrum = data.NistSpectralLines()
+    # The version of the filtered lines shown in the table
+    _shown_version = 0
+    # Whether the lines passing filters which are being edited are shown
+    _is_previewing = False
 
-    @work
+    def __init__(
+        self,
+        service_url: str | None = None,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        disabled: bool = False,
+    ) -> None:
+        """Initializes the table.
+
+        Args:
+            service_url: The URL of a line service to get the lines from, see
+                `service.LineService`. If None, the table loads the lines
+                itself.
+            name: The name of the widget.
+            id: The ID of the widget in the DOM.
+            classes: The CSS classes of the widget.
+            disabled: Whether the widget is disabled or not.
+        """
+        super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self.service_url = service_url
+
+    @functools.cached_property
+    def spectrum(self) -> "NistSpectralLines | LineServiceClient":
+        # The data module pulls in pandas, so it is imported on first use to
+        # keep the startup of the app fast
+        if self.service_url is not None:
+            from spectral_line_finder.service import LineServiceClient
+
+            return LineServiceClient(self.service_url)
+
+        from spectral_line_finder.data import NistSpectralLines
+
+        # The data is kept in memory for the whole session, so it is stored
+        # compactly
+        return NistSpectralLines(compact=True)
+
+    @work(exclusive=True, group="fill_table")
     async def fill_table(self):
+        with instrumentation.stage(
+            "table.fill", elements=len(self.filters.elements.elements)
+        ) as record:
+            await self._fill_table()
+            record["rows"] = self.row_count
+
+    async def _fill_table(self):
         self.loading = True
-        self.clear(columns=True)
-        self.cursor_type = "row"
-        self.add_columns("Color", *self._selected_columns)
+        self.clear()
+        filters = copy.deepcopy(self.filters)
 
-        worker = self.get_display_rows(
-            display_columns=self._selected_columns, filters=self.filters
+        # Fetch all uncached elements in parallel, showing the rows of the
+        # elements loaded so far as soon as each element is available. If the
+        # filters restrict the wavelengths, only that range is fetched.
+        elements = filters.elements.elements
+        wavelength_range = filters.get_wavelength_range()
+        # Checking the cache may ask the line service, so it runs in a thread
+        show_progress = len(elements) > 1 and not await asyncio.to_thread(
+            self.spectrum.are_cached, elements, wavelength_range
         )
+        loaded_elements = []
+        try:
+            async for element in self.spectrum.load_data_from_nist_concurrently(
+                elements, wavelength_range=wavelength_range
+            ):
+                loaded_elements.append(element)
+                # The lines of all elements are shown below
+                if show_progress and len(loaded_elements) < len(elements):
+                    worker = self.get_filtered_lines(
+                        replace(filters, elements=ElementFilter(list(loaded_elements)))
+                    )
+                    await worker.wait()
+                    self.show_lines(worker.result)
+                    self.loading = False
+                    self.notify(f"Loaded data for {element}.", timeout=2)
+        except NistDataError as e:
+            self.notify(str(e), severity="error")
+            self.clear()
+            self.loading = False
+            self.refresh_bindings()
+            return
+
+        # Show the lines of all elements, merged and sorted by wavelength. The
+        # same snapshot is used by the spectrum plot and jumping to a
+        # wavelength.
+        worker = self.get_filtered_lines(filters)
         await worker.wait()
-        self.add_rows(worker.result)
+        self.show_lines(worker.result)
         self.notify(f"Showing {self.row_count} spectral lines.")
         self.loading = False
         self.refresh_bindings()
 
+    def show_lines(self, filtered_lines: "LineSnapshot | None") -> None:
+        """Shows a snapshot of the filtered spectral lines in the table.
+
+        The rows are read from the snapshot and formatted a page at a time,
+        when they are scrolled into view. Snapshots which are older than the
+        one shown are ignored, so stale results never replace newer ones.
+
+        Args:
+            filtered_lines: The snapshot, or None to clear the table.
+        """
+        if filtered_lines is None:
+            self.clear()
+            return
+        if filtered_lines.version < self._shown_version:
+            return
+        self._shown_version = filtered_lines.version
+        from spectral_line_finder.data import format_display_rows
+
+        display_columns = list(self._selected_columns)
+        columns = display_columns + ["r", "g", "b"]
+
+        def get_rows(start: int, stop: int) -> list[tuple[Text | str, ...]]:
+            with instrumentation.stage("table.format_rows", rows=stop - start):
+                page = filtered_lines.get_page(start, stop, columns)
+                return list(format_display_rows(page, display_columns))
+
+        with instrumentation.stage("table.show_rows", rows=len(filtered_lines)):
+            # Rows requested from a service are fetched in a thread, so a slow
+            # service doesn't block the interface
+            self.set_rows(
+                ["Color", *display_columns],
+                len(filtered_lines),
+                get_rows,
+                fetch_in_thread=self.service_url is not None,
+            )
+
     @work(thread=True)
-    def get_display_rows(
-        self, display_columns, filters
-    ) -> list[tuple[Text | str, ...]]:
+    def get_filtered_lines(self, filters: DataFilters) -> "LineSnapshot | None":
+        try:
+            return self.spectrum.get_filtered_lines(filters)
+        except NistDataError as e:
+            self.notify(str(e), severity="error")
+            return None
+
+    def preview_filters(self, filters: DataFilters) -> None:
+        """Shows the lines passing filters which are still being edited.
+
+        Only the range filters are previewed, using the data of the elements
+        which are already loaded.
+
+        Args:
+            filters: The filters being edited.
+        """
+        self._is_previewing = True
+        self.update_preview(
+            replace(
+                copy.deepcopy(filters), elements=copy.deepcopy(self.filters.elements)
+            )
+        )
+
+    @work(thread=True, exclusive=True, group="preview")
+    def update_preview(self, filters: DataFilters) -> None:
+        # Starting a new preview cancels the previous one
+        worker = get_current_worker()
+        wavelength_range = filters.get_wavelength_range()
+        if not self.spectrum.are_cached(filters.elements.elements, wavelength_range):
+            return
         try:
-            return list(self.spectrum.get_display_rows(display_columns, filters))
-        except data.NistDataError as e:
+            filtered_lines = self.spectrum.get_filtered_lines(filters)
+        except NistDataError as e:
             self.notify(str(e), severity="error")
-            return []
+            return
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self.show_lines, filtered_lines)
 
     def action_select_columns(self) -> None:
         self.select_columns()
@@ -70,30 +225,66 @@ class SpectralLinesTable(DataTable):
         )
         if selection is not None:
             self._selected_columns = selection
-            self.fill_table()
+            # Changing the columns doesn't change which lines pass the filters
+            if (
+                filtered_lines := self.spectrum.peek_filtered_lines(self.filters)
+            ) is not None:
+                self.show_lines(filtered_lines)
+            else:
+                self.fill_table()
 
     def action_filter_data(self) -> None:
         def callback(is_confirmed: bool | None) -> None:
             if is_confirmed:
                 if self.filters.elements.elements:
                     self.fill_table()
+            elif self._is_previewing:
+                # Show the lines passing the unchanged filters again
+                self.update_preview(copy.deepcopy(self.filters))
+            self._is_previewing = False
 
-        self.app.push_screen(FilterDataDialog(self.filters), callback=callback)
+        self.app.push_screen(
+            FilterDataDialog(self.filters, on_change=self.preview_filters),
+            callback=callback,
+        )
 
     def action_visualize_spectrum(self) -> None:
+        from spectral_line_finder.spectrum_plot import SpectrumPlot
+
+        # The plot is shown right away and the lines are added once the
+        # filtered lines are available
+        spectrum_plot = SpectrumPlot()
+        self.app.push_screen(spectrum_plot)
+        self.show_spectrum(spectrum_plot, copy.deepcopy(self.filters))
+
+    @work(thread=True, exclusive=True, group="show_spectrum")
+    def show_spectrum(
+        self, spectrum_plot: "SpectrumPlot", filters: DataFilters
+    ) -> None:
         try:
-            spectral_lines = self.spectrum.get_spectral_lines(filters=self.filters)
-            self.app.push_screen(SpectrumPlot(spectral_lines))
-        except data.NistDataError as e:
+            filtered_lines = self.spectrum.get_filtered_lines(filters)
+        except NistDataError as e:
             self.notify(str(e), severity="error")
+            self.app.call_from_thread(spectrum_plot.dismiss)
+            return
+        self.app.call_from_thread(
+            spectrum_plot.set_lines, filtered_lines.wavelengths, filtered_lines.colors
+        )
 
     def action_jump(self) -> None:
-        def callback(value: int | None) -> None:
+        def callback(value: float | None) -> None:
             if value is not None:
-                if (
-                    wavelengths := self.spectrum.get_wavelengths(self.filters)
-                ) is not None:
-                    index = int(wavelengths.searchsorted(value))
-                    self.move_cursor(row=index)
+                self.jump_to_wavelength(value, copy.deepcopy(self.filters))
 
         self.app.push_screen(WavelengthDialog(), callback=callback)
+
+    @work(thread=True, exclusive=True, group="jump")
+    def jump_to_wavelength(self, wavelength: float, filters: DataFilters) -> None:
+        try:
+            filtered_lines = self.spectrum.get_filtered_lines(filters)
+        except NistDataError as e:
+            self.notify(str(e), severity="error")
+            return
+        if len(filtered_lines):
+            index = int(filtered_lines.wavelengths.searchsorted(wavelength))
+            self.app.call_from_thread(self.move_cursor, row=index)
@@ -1,3 +1,4 @@
+import numpy as np
 from textual import on
 from textual.app import ComposeResult
 from textual.screen import ModalScreen
@@ -6,19 +7,41 @@ from textual_plot import PlotWidget
 
 from spectral_line_finder.data import SpectralLines
 
+# Wavelength range of the plot, in nm
+MIN_WAVELENGTH = 350.0
+MAX_WAVELENGTH = 750.0
+
 
 class SpectrumPlot(ModalScreen):
+    """Plot of spectral lines, drawn in their colors.
+
+    Only one line is drawn per column of the plot, in the blended color of all
+    lines in that column. The lines are binned again whenever the plot is
+    zoomed, panned or resized, so zooming in shows all lines.
+
+    The plot can be shown before the lines are known, in which case it shows
+    a loading indicator until the lines are set using `set_lines()`.
+    """
+
     BINDINGS = [("escape", "dismiss", "Close")]
 
     def __init__(
         self,
-        spectral_lines: SpectralLines,
+        spectral_lines: SpectralLines | None = None,
         name: str | None = None,
         id: str | None = None,
         classes: str | None = None,
     ) -> None:
         super().__init__(name, id, classes)
-        self.spectral_lines = spectral_lines
+        self._x_limits = (MIN_WAVELENGTH, MAX_WAVELENGTH)
+        self._wavelengths = np.array([], dtype=float)
+        self._colors = np.empty((0, 3), dtype=np.int64)
+        self._has_lines = spectral_lines is not None
+        if spectral_lines is not None:
+            self._set_lines(
+                np.array([wavelength for wavelength, _ in spectral_lines]),
+                parse_hex_colors([color for _, color in spectral_lines]),
+            )
 
     def compose(self) -> ComposeResult:
         yield PlotWidget()
@@ -27,15 +50,108 @@ class SpectrumPlot(ModalScreen):
     def on_mount(self) -> None:
         plot = self.query_one(PlotWidget)
         plot.margin_left = 1
-        for wavelength, color in self.spectral_lines:
-            plot.add_v_line(x=wavelength, line_style=color)
-        plot.set_xlimits(350.0, 750.0)
+        plot.set_xlimits(*self._x_limits)
         plot.set_yticks([])
         plot.set_xlabel("Wavelength (nm)")
+        plot.loading = not self._has_lines
+        # The size of the plot is known after the first layout
+        self.call_after_refresh(self.draw_lines)
+
+    def set_lines(self, wavelengths: np.ndarray, colors: np.ndarray) -> None:
+        """Sets the spectral lines and draws them.
+
+        Args:
+            wavelengths: The wavelengths of the lines.
+            colors: An (N, 3) array with the colors of the lines (0-255).
+        """
+        self._set_lines(wavelengths, colors)
+        self._has_lines = True
+        if self.is_mounted:
+            self.query_one(PlotWidget).loading = False
+            self.draw_lines()
+
+    def _set_lines(self, wavelengths: np.ndarray, colors: np.ndarray) -> None:
+        order = np.argsort(wavelengths, kind="stable")
+        self._wavelengths = np.asarray(wavelengths, dtype=float)[order]
+        self._colors = np.asarray(colors, dtype=np.int64).reshape(-1, 3)[order]
+
+    def on_resize(self) -> None:
+        self.call_after_refresh(self.draw_lines)
 
     @on(PlotWidget.ScaleChanged)
     def restrict_zoom(self, event: PlotWidget.ScaleChanged) -> None:
-        x_min = max(350.0, event.x_min)
-        x_max = min(750.0, event.x_max)
+        x_min = max(MIN_WAVELENGTH, event.x_min)
+        x_max = min(MAX_WAVELENGTH, event.x_max)
         if x_min != event.x_min or x_max != event.x_max:
             self.query_one(PlotWidget).set_xlimits(x_min, x_max)
+        self._x_limits = (x_min, x_max)
+        self.draw_lines()
+
+    def draw_lines(self) -> None:
+        """Draws one line per plot column, for the current wavelength range."""
+        plot = self.query_one(PlotWidget)
+        # The plot area excludes the left margin and the axis box
+        num_columns = plot.size.width - plot.margin_left - 2
+        if num_columns <= 0:
+            return
+        wavelengths, colors = bin_spectral_lines(
+            self._wavelengths, self._colors, *self._x_limits, num_columns
+        )
+        plot.clear()
+        for wavelength, color in zip(wavelengths.tolist(), colors):
+            plot.add_v_line(x=wavelength, line_style=color)
+
+
+def parse_hex_colors(colors: list[str]) -> np.ndarray:
+    """Parses hexadecimal color codes like "#ff8000".
+
+    Args:
+        colors: The color codes.
+
+    Returns:
+        An (N, 3) array with the red, green and blue components (0-255).
+    """
+    unique_colors, color_indexes = np.unique(
+        np.array(colors, dtype=str), return_inverse=True
+    )
+    packed = np.array([int(color[1:], 16) for color in unique_colors], dtype=np.int64)
+    components = np.stack([packed >> 16, (packed >> 8) & 0xFF, packed & 0xFF], axis=1)
+    return components[color_indexes].reshape(-1, 3)
+
+
+def bin_spectral_lines(
+    wavelengths: np.ndarray,
+    colors: np.ndarray,
+    x_min: float,
+    x_max: float,
+    num_bins: int,
+) -> tuple[np.ndarray, list[str]]:
+    """Bins spectral lines into equal wavelength intervals.
+
+    Args:
+        wavelengths: The sorted wavelengths of the lines.
+        colors: An (N, 3) array with the colors of the lines.
+        x_min: The start of the wavelength range.
+        x_max: The end of the wavelength range.
+        num_bins: The number of bins.
+
+    Returns:
+        A tuple of the wavelengths of the first line in each non-empty bin and
+        the average color of the lines in each bin, as hexadecimal color
+        codes.
+    """
+    start = wavelengths.searchsorted(x_min, "left")
+    stop = wavelengths.searchsorted(x_max, "right")
+    wavelengths, colors = wavelengths[start:stop], colors[start:stop]
+    if not len(wavelengths):
+        return wavelengths, []
+
+    bins = np.floor((wavelengths - x_min) / (x_max - x_min) * num_bins)
+    bins = np.minimum(bins, num_bins - 1)
+    bin_starts = np.flatnonzero(np.diff(bins, prepend=-1))
+    counts = np.diff(bin_starts, append=len(bins))
+    blended = np.add.reduceat(colors, bin_starts, axis=0) / counts[:, np.newaxis]
+    hex_colors = [
+        f"#{r:02x}{g:02x}{b:02x}" for r, g, b in np.rint(blended).astype(int).tolist()
+    ]
+    return wavelengths[bin_starts], hex_colors
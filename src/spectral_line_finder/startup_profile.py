@@ -0,0 +1,83 @@
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+
+# Number of imports shown by `print_import_profile()`
+NUM_SHOWN_IMPORTS = 25
+
+# A line written by `python -X importtime`, like
+# "import time:       412 |       1539 | spectral_line_finder.data"
+_re_import_time = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_imports(module: str) -> list[ImportTime]:
+    """Measures the time it takes to import a module and its dependencies.
+
+    The module is imported in a fresh interpreter, so modules which are already
+    imported in this process are measured as well.
+
+    Args:
+        module: The name of the module, like "spectral_line_finder.app".
+
+    Returns:
+        The import times of all imported modules, in the order in which their
+        imports finished.
+
+    Raises:
+        RuntimeError: If the module can't be imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    import_times = []
+    for line in result.stderr.splitlines():
+        if match := _re_import_time.match(line):
+            self_us, cumulative_us, indent, name = match.groups()
+            import_times.append(
+                ImportTime(
+                    module=name,
+                    self_us=int(self_us),
+                    cumulative_us=int(cumulative_us),
+                    depth=(len(indent) - 1) // 2,
+                )
+            )
+    return import_times
+
+
+def print_import_profile(module: str, num_shown: int = NUM_SHOWN_IMPORTS) -> None:
+    """Prints the slowest imports of a module and the total import time.
+
+    Args:
+        module: The name of the module, like "spectral_line_finder.app".
+        num_shown: The number of imports to show.
+    """
+    import_times = profile_imports(module)
+    total_us = sum(
+        import_time.cumulative_us
+        for import_time in import_times
+        if import_time.depth == 0
+    )
+    slowest = sorted(import_times, key=lambda t: t.cumulative_us, reverse=True)
+
+    print(f"{'cumulative (ms)':>15}  {'self (ms)':>9}  module")
+    for import_time in slowest[:num_shown]:
+        print(
+            f"{import_time.cumulative_us / 1000:15.1f}  "
+            f"{import_time.self_us / 1000:9.1f}  "
+            f"{'  ' * import_time.depth}{import_time.module}"
+        )
+    print(f"\nImporting {module} took {total_us / 1000:.1f} ms in total.")
@@ -0,0 +1,306 @@
+from collections.abc import Callable, Sequence
+from typing import ClassVar
+
+from rich.cells import cell_len, set_cell_size
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+from textual import events, work
+from textual.binding import Binding, BindingType
+from textual.geometry import Size
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.worker import get_current_worker
+
+Cell = Text | str
+RowGetter = Callable[[int, int], Sequence[tuple[Cell, ...]]]
+
+
+class VirtualTable(ScrollView, can_focus=True):
+    """A table which only formats and renders the rows that are visible.
+
+    Rows are not stored in the table. Instead, the table asks for a range of
+    formatted rows when they scroll into view, including a few rows above and
+    below the viewport. This keeps the time to show the table constant,
+    regardless of the number of rows. Slow rows, like rows requested from a
+    service, can be fetched in a thread, showing placeholders until they
+    arrive.
+    """
+
+    BINDINGS: ClassVar[list[BindingType]] = [
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home,ctrl+home", "first_row", "Top", show=False),
+        Binding("end,ctrl+end", "last_row", "Bottom", show=False),
+        Binding("left", "scroll_left", "Scroll left", show=False),
+        Binding("right", "scroll_right", "Scroll right", show=False),
+    ]
+
+    COMPONENT_CLASSES: ClassVar[set[str]] = {
+        "virtual-table--header",
+        "virtual-table--cursor",
+    }
+
+    DEFAULT_CSS = """
+    VirtualTable {
+        background: $surface;
+        color: $foreground;
+
+        &:focus {
+            background-tint: $foreground 5%;
+            & > .virtual-table--cursor {
+                background: $block-cursor-background;
+                color: $block-cursor-foreground;
+                text-style: $block-cursor-text-style;
+            }
+        }
+
+        & > .virtual-table--header {
+            text-style: bold;
+            background: $panel;
+            color: $foreground;
+        }
+
+        & > .virtual-table--cursor {
+            background: $block-cursor-blurred-background;
+            color: $block-cursor-blurred-foreground;
+            text-style: $block-cursor-blurred-text-style;
+        }
+    }
+    """
+
+    # Number of rows which are formatted above and below the visible rows
+    OVERSCAN = 50
+
+    # Horizontal padding on each side of each cell
+    CELL_PADDING = 1
+
+    # Shown in each cell of rows which are still being fetched
+    PLACEHOLDER = "…"
+
+    cursor_row: reactive[int] = reactive(0, repaint=False, always_update=True)
+    """The index of the highlighted row."""
+
+    def __init__(
+        self,
+        name: str | None = None,
+        id: str | None = None,
+        classes: str | None = None,
+        disabled: bool = False,
+    ) -> None:
+        super().__init__(name=name, id=id, classes=classes, disabled=disabled)
+        self._labels: list[str] = []
+        self._column_widths: list[int] = []
+        self._row_count = 0
+        self._get_rows: RowGetter | None = None
+        self._fetch_in_thread = False
+        # Formatted rows, by row index, for the rows around the viewport
+        self._rows: dict[int, tuple[Cell, ...]] = {}
+        # The range of rows last requested in a thread, until the rows arrive.
+        # If fetching them fails, they aren't requested again until other rows
+        # are scrolled into view.
+        self._pending_rows: range | None = None
+
+    @property
+    def row_count(self) -> int:
+        """The number of rows in the table."""
+        return self._row_count
+
+    def set_rows(
+        self,
+        labels: list[str],
+        row_count: int,
+        get_rows: RowGetter,
+        fetch_in_thread: bool = False,
+    ) -> None:
+        """Sets the contents of the table.
+
+        Args:
+            labels: The column labels.
+            row_count: The total number of rows.
+            get_rows: Function returning the formatted rows, given the start
+                (inclusive) and stop (exclusive) row index.
+            fetch_in_thread: Whether `get_rows` is called in a thread, so
+                that a slow call doesn't block the interface. Placeholders
+                are shown until the rows arrive.
+        """
+        self._labels = labels
+        self._column_widths = [cell_len(label) for label in labels]
+        self._row_count = row_count
+        self._get_rows = get_rows
+        self._fetch_in_thread = fetch_in_thread
+        self._rows = {}
+        self._pending_rows = None
+        self.cursor_row = min(self.cursor_row, max(row_count - 1, 0))
+        self._update_virtual_size()
+        self.refresh()
+
+    def clear(self) -> None:
+        """Removes all rows and columns from the table."""
+        self.set_rows([], 0, lambda start, stop: [])
+        self.cursor_row = 0
+        self.scroll_to(0, 0, animate=False)
+
+    def move_cursor(self, row: int) -> None:
+        """Moves the cursor to a row and scrolls it into view.
+
+        Args:
+            row: The row index. It is clamped to the valid range.
+        """
+        self.cursor_row = row
+
+    def validate_cursor_row(self, row: int) -> int:
+        return max(0, min(row, self._row_count - 1))
+
+    def watch_cursor_row(self, old_row: int, new_row: int) -> None:
+        self._scroll_cursor_into_view()
+        self.refresh()
+
+    def action_cursor_up(self) -> None:
+        self.move_cursor(self.cursor_row - 1)
+
+    def action_cursor_down(self) -> None:
+        self.move_cursor(self.cursor_row + 1)
+
+    def action_page_up(self) -> None:
+        self.move_cursor(self.cursor_row - self._page_height)
+
+    def action_page_down(self) -> None:
+        self.move_cursor(self.cursor_row + self._page_height)
+
+    def action_first_row(self) -> None:
+        self.move_cursor(0)
+
+    def action_last_row(self) -> None:
+        self.move_cursor(self._row_count - 1)
+
+    def on_click(self, event: events.Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is not None and offset.y >= 1:
+            row = int(self.scroll_y) + offset.y - 1
+            if row < self._row_count:
+                self.move_cursor(row)
+
+    @property
+    def _page_height(self) -> int:
+        # The header is always visible
+        return max(self.scrollable_content_region.height - 1, 1)
+
+    def _scroll_cursor_into_view(self) -> None:
+        row = self.cursor_row
+        if row < self.scroll_y:
+            self.scroll_to(y=row, animate=False, force=True)
+        elif row >= self.scroll_y + self._page_height:
+            self.scroll_to(y=row - self._page_height + 1, animate=False, force=True)
+
+    def _update_virtual_size(self) -> None:
+        width = sum(self._column_widths) + 2 * self.CELL_PADDING * len(
+            self._column_widths
+        )
+        self.virtual_size = Size(width, self._row_count + 1)
+
+    def _fetch_rows(self, start: int, stop: int) -> None:
+        """Makes sure the rows in a range are formatted, or being fetched."""
+        if (
+            all(row in self._rows for row in (start, stop - 1))
+            or self._get_rows is None
+        ):
+            return
+        if self._pending_rows is not None and all(
+            row in self._pending_rows for row in (start, stop - 1)
+        ):
+            return
+        start = max(start - self.OVERSCAN, 0)
+        stop = min(stop + self.OVERSCAN, self._row_count)
+        if self._fetch_in_thread:
+            self._pending_rows = range(start, stop)
+            self._fetch_rows_in_thread(self._get_rows, start, stop)
+        else:
+            self._add_rows(start, self._get_rows(start, stop))
+
+    @work(thread=True, exclusive=True, group="fetch_rows", exit_on_error=False)
+    def _fetch_rows_in_thread(self, get_rows: RowGetter, start: int, stop: int) -> None:
+        # Fetching other rows cancels the previous fetch
+        worker = get_current_worker()
+        try:
+            rows = get_rows(start, stop)
+        except Exception as e:
+            self.notify(f"Can't show the rows: {e}", severity="error")
+            return
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._add_fetched_rows, get_rows, start, rows)
+
+    def _add_fetched_rows(
+        self, get_rows: RowGetter, start: int, rows: Sequence[tuple[Cell, ...]]
+    ) -> None:
+        # The contents of the table may have changed while fetching
+        if get_rows is not self._get_rows:
+            return
+        self._pending_rows = None
+        self._add_rows(start, rows)
+        self.refresh()
+
+    def _add_rows(self, start: int, rows: Sequence[tuple[Cell, ...]]) -> None:
+        """Replaces the formatted rows by new rows, starting at a row index."""
+        self._rows = dict(zip(range(start, start + len(rows)), rows))
+
+        # Widen columns if the new rows contain wider cells
+        widths = [
+            max(width, *(cell_len(_plain(row[idx])) for row in rows)) if rows else width
+            for idx, width in enumerate(self._column_widths)
+        ]
+        if widths != self._column_widths:
+            self._column_widths = widths
+            self._update_virtual_size()
+            self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        base_style = self.rich_style
+        if y == 0:
+            style = base_style + self.get_component_rich_style("virtual-table--header")
+            segments = self._render_cells(self._labels, style)
+        else:
+            row = int(self.scroll_y) + y - 1
+            if row >= self._row_count:
+                return Strip.blank(width, base_style)
+            first_visible = int(self.scroll_y)
+            self._fetch_rows(
+                first_visible, min(first_visible + self._page_height, self._row_count)
+            )
+            style = base_style
+            if row == self.cursor_row:
+                style += self.get_component_rich_style("virtual-table--cursor")
+            placeholder = (self.PLACEHOLDER,) * len(self._labels)
+            segments = self._render_cells(self._rows.get(row, placeholder), style)
+
+        scroll_x = int(self.scroll_x)
+        return (
+            Strip(segments)
+            .crop(scroll_x, scroll_x + width)
+            .adjust_cell_length(width, base_style)
+            .simplify()
+        )
+
+    def _render_cells(self, cells: Sequence[Cell], style: Style) -> list[Segment]:
+        padding = Segment(" " * self.CELL_PADDING, style)
+        segments = []
+        for cell, width in zip(cells, self._column_widths):
+            segments.append(padding)
+            cell_style = style
+            if isinstance(cell, Text):
+                if isinstance(cell.style, Style):
+                    cell_style += cell.style
+                elif cell.style:
+                    cell_style += Style.parse(cell.style)
+                cell = cell.plain
+            segments.append(Segment(set_cell_size(cell, width), cell_style))
+            segments.append(padding)
+        return segments
+
+
+def _plain(cell: Cell) -> str:
+    return cell.plain if isinstance(cell, Text) else cell
@@ -0,0 +1,32 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from nist_fixtures import make_payload
+from nist_server import NistStandInServer, serve_nist_payloads
+
+from spectral_line_finder import data, fetch
+from spectral_line_finder.line_store import LineStore
+
+
+@pytest.fixture
+def line_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> LineStore:
+    """An empty line store, used instead of the store in the user cache."""
+    store = LineStore(tmp_path / "lines")
+    monkeypatch.setattr(data, "line_store", store)
+    return store
+
+
+@pytest.fixture
+def nist(
+    line_store: LineStore, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[NistStandInServer]:
+    """A local stand-in for the NIST server, with synthetic line lists."""
+    payloads = {
+        "Fe": make_payload("Fe", 5000, seed=1),
+        "Ni": make_payload("Ni", 5000, seed=2),
+        "H": make_payload("H", 500, seed=3),
+    }
+    with serve_nist_payloads(payloads) as server:
+        monkeypatch.setattr(fetch, "NIST_LINES_URL", server.lines_url)
+        yield server
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral_line_finder.blends import (
+    CLUSTER_COLUMN,
+    cluster_lines,
+    get_blend_mask,
+    insert_cluster_column,
+)
+
+
+def sweep_clusters(wavelengths: list[float], tolerance: float) -> list[int]:
+    """Groups neighboring lines into blends, one line at a time."""
+    clusters = [-1] * len(wavelengths)
+    num_clusters = 0
+    for idx in range(1, len(wavelengths)):
+        if wavelengths[idx] - wavelengths[idx - 1] <= tolerance:
+            if clusters[idx - 1] == -1:
+                num_clusters += 1
+                clusters[idx - 1] = num_clusters
+            clusters[idx] = clusters[idx - 1]
+    return clusters
+
+
+@pytest.mark.parametrize(
+    ("wavelengths", "expected"),
+    [
+        ([], []),
+        ([1.0], [-1]),
+        ([1.0, 1.005], [1, 1]),
+        ([1.0, 1.02], [-1, -1]),
+        # A blend may span more than the tolerance
+        ([1.0, 1.008, 1.016, 1.5, 1.505], [1, 1, 1, 2, 2]),
+        # Lines without a wavelength are never blended
+        ([1.0, np.nan, 1.0], [-1, -1, -1]),
+    ],
+)
+def test_cluster_lines(wavelengths, expected):
+    assert cluster_lines(np.array(wavelengths), 0.01).tolist() == expected
+
+
+def test_cluster_lines_matches_sweep():
+    rng = np.random.default_rng(0)
+    wavelengths = np.sort(rng.uniform(0, 100, 5000))
+
+    clusters = cluster_lines(wavelengths, 0.01)
+
+    assert clusters.tolist() == sweep_clusters(wavelengths.tolist(), 0.01)
+
+
+def test_blend_mask_only_uses_lines_passing_the_filter():
+    wavelengths = np.array([1.0, 1.005, 1.01, 2.0, 2.005])
+    mask = np.array([True, False, True, True, True])
+
+    blend_mask = get_blend_mask(wavelengths, mask, 0.006)
+
+    assert blend_mask.tolist() == [False, False, False, True, True]
+    assert get_blend_mask(wavelengths, None, 0.006).tolist() == [True] * 5
+
+
+def test_insert_cluster_column():
+    df = pd.DataFrame({"element": ["Fe", "Fe", "Ni"]}, index=[3, 4, 5])
+
+    df = insert_cluster_column(
+        df, [CLUSTER_COLUMN, "element"], np.array([1, 1, -1], dtype=np.int32)
+    )
+
+    assert list(df.columns) == [CLUSTER_COLUMN, "element"]
+    assert df[CLUSTER_COLUMN].dtype == "Int64"
+    assert df[CLUSTER_COLUMN].tolist() == [1, 1, pd.NA]
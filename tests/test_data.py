@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from spectral_line_finder.data import NistSpectralLines
+from spectral_line_finder.filters import DataFilters
+
+COLUMNS = ["element", "wavelength", "obs_wl(nm)", "intens"]
+
+
+def get_lines(
+    spectrum: NistSpectralLines,
+    elements: list[str],
+    wavelength_range: tuple[float, float] | None = None,
+) -> pd.DataFrame:
+    filters = DataFilters()
+    filters.elements.elements = elements
+    if wavelength_range is not None:
+        filters.obs_wl.min, filters.obs_wl.max = wavelength_range
+    filtered_lines = spectrum.get_filtered_lines(filters)
+    return filtered_lines.get_page(0, len(filtered_lines), COLUMNS).reset_index(
+        drop=True
+    )
+
+
+def expected_lines(
+    elements: list[str], wavelength_range: tuple[float, float] | None = None
+) -> pd.DataFrame:
+    """Loads the lines of all elements at once, using all of their lines."""
+    spectrum = NistSpectralLines()
+    for element in elements:
+        spectrum.load_data_from_nist(element)
+    return get_lines(spectrum, elements, wavelength_range)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_full_elements(nist, compact):
+    lines = get_lines(NistSpectralLines(compact=compact), ["Fe", "Ni", "H"])
+
+    assert len(lines) == 10_500
+    assert lines["element"].value_counts().to_dict() == {
+        "Fe": 5000,
+        "Ni": 5000,
+        "H": 500,
+    }
+    assert lines["wavelength"].is_monotonic_increasing
+
+
+def test_wavelength_range_is_cached(nist):
+    spectrum = NistSpectralLines()
+    lines = get_lines(spectrum, ["Fe", "Ni"], (380.0, 420.0))
+    num_requests = nist.num_requests
+
+    narrower = get_lines(spectrum, ["Fe", "Ni"], (390.0, 400.0))
+
+    assert nist.num_requests == num_requests
+    assert not lines.empty
+    pd.testing.assert_frame_equal(
+        narrower, expected_lines(["Fe", "Ni"], (390.0, 400.0))
+    )
+
+
+def test_wider_wavelength_range(nist):
+    spectrum = NistSpectralLines()
+    get_lines(spectrum, ["Fe"], (390.0, 400.0))
+
+    lines = get_lines(spectrum, ["Fe"], (380.0, 420.0))
+
+    pd.testing.assert_frame_equal(lines, expected_lines(["Fe"], (380.0, 420.0)))
+
+
+def test_wider_range_after_adding_elements_for_a_narrower_range(nist):
+    spectrum = NistSpectralLines()
+    get_lines(spectrum, ["Fe"], (380.0, 420.0))
+    get_lines(spectrum, ["Fe", "Ni"], (390.0, 400.0))
+
+    lines = get_lines(spectrum, ["Fe", "Ni"], (380.0, 420.0))
+
+    pd.testing.assert_frame_equal(lines, expected_lines(["Fe", "Ni"], (380.0, 420.0)))
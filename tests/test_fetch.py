@@ -0,0 +1,18 @@
+from spectral_line_finder import fetch
+from spectral_line_finder.data import NistSpectralLines
+
+
+def test_run_closes_the_shared_client(nist):
+    async def load():
+        elements = [
+            element
+            async for element in NistSpectralLines().load_data_from_nist_concurrently(
+                ["Fe", "Ni"]
+            )
+        ]
+        return elements, fetch.get_async_client()
+
+    elements, client = fetch.run(load())
+
+    assert sorted(elements) == ["Fe", "Ni"]
+    assert client.is_closed
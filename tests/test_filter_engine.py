@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral_line_finder.filter_engine import FilterEngine, RangeFilterState
+
+
+@pytest.fixture
+def lines() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    num_lines = 1000
+    intens = rng.uniform(0, 100, num_lines).round(1)
+    intens[rng.random(num_lines) < 0.2] = np.nan
+    return pd.DataFrame(
+        {
+            "intens": intens,
+            "sp_num": rng.integers(1, 5, num_lines),
+            "conf": rng.choice(["a", "b", "c"], num_lines),
+        }
+    )
+
+
+def expected_mask(df: pd.DataFrame, state: RangeFilterState) -> np.ndarray:
+    """Applies a range filter using plain comparisons."""
+    values = df[state.col_name]
+    if state.min is None and state.max is None:
+        return values.notna().to_numpy() | state.show_nan
+    mask = pd.Series(True, index=df.index)
+    if state.min is not None:
+        mask &= values >= state.min
+    if state.max is not None:
+        mask &= values <= state.max
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        RangeFilterState("intens", 10.0, 50.0),
+        RangeFilterState("intens", 10.0, None),
+        RangeFilterState("intens", None, 50.0),
+        RangeFilterState("intens", 50.0, 50.0),
+        RangeFilterState("intens", 60.0, 50.0),
+        RangeFilterState("intens", None, None, show_nan=False),
+        RangeFilterState("sp_num", 2, 3),
+        RangeFilterState("conf", "b", "c"),
+    ],
+)
+def test_mask_matches_comparisons(lines, state):
+    mask = FilterEngine().get_mask(lines, [("filter", state)])
+    np.testing.assert_array_equal(mask, expected_mask(lines, state))
+
+
+def test_no_restrictions(lines):
+    state = RangeFilterState("intens", None, None)
+    assert FilterEngine().get_mask(lines, [("filter", state)]) is None
+
+
+def test_masks_are_combined(lines):
+    filters = [
+        ("intens", RangeFilterState("intens", 20.0, 80.0)),
+        ("sp_num", RangeFilterState("sp_num", None, 2)),
+    ]
+    mask = FilterEngine().get_mask(lines, filters)
+    expected = expected_mask(lines, filters[0][1]) & expected_mask(lines, filters[1][1])
+    np.testing.assert_array_equal(mask, expected)
+
+
+def test_changed_filters_and_frames(lines):
+    engine = FilterEngine()
+    engine.get_mask(lines, [("intens", RangeFilterState("intens", 20.0, 80.0))])
+
+    state = RangeFilterState("intens", 30.0, 40.0)
+    mask = engine.get_mask(lines, [("intens", state)])
+    np.testing.assert_array_equal(mask, expected_mask(lines, state))
+
+    other = lines.iloc[::-1].reset_index(drop=True)
+    mask = engine.get_mask(other, [("intens", state)])
+    np.testing.assert_array_equal(mask, expected_mask(other, state))
@@ -0,0 +1,12 @@
+from spectral_line_finder.instrumentation import Instrumentation
+
+
+def test_disabled_stages_have_separate_records():
+    instrumentation = Instrumentation()
+
+    with instrumentation.stage("first") as first:
+        first["rows"] = 10
+    with instrumentation.stage("second") as second:
+        assert second == {}
+
+    assert not instrumentation.records
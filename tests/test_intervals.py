@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from spectral_line_finder.intervals import (
+    FULL_RANGE,
+    covers,
+    merge_intervals,
+    missing_intervals,
+)
+
+
+@pytest.mark.parametrize(
+    ("intervals", "expected"),
+    [
+        ([], []),
+        ([(1, 2)], [(1, 2)]),
+        ([(3, 4), (1, 2)], [(1, 2), (3, 4)]),
+        ([(1, 3), (2, 4)], [(1, 4)]),
+        ([(1, 2), (2, 3)], [(1, 3)]),
+        ([(1, 5), (2, 3)], [(1, 5)]),
+        ([(5, 6), (1, 2), (1.5, 5.5)], [(1, 6)]),
+    ],
+)
+def test_merge_intervals(intervals, expected):
+    assert merge_intervals(intervals) == expected
+
+
+@pytest.mark.parametrize(
+    ("cached", "wanted", "expected"),
+    [
+        ([], (1, 2), [(1, 2)]),
+        ([(0, 10)], (1, 2), []),
+        ([(0, 10)], (0, 10), []),
+        ([(3, 4)], (1, 2), [(1, 2)]),
+        ([(1, 2)], (3, 4), [(3, 4)]),
+        ([(2, 3)], (1, 4), [(1, 2), (3, 4)]),
+        ([(0, 2)], (1, 4), [(2, 4)]),
+        ([(3, 5)], (1, 4), [(1, 3)]),
+        ([(2, 3), (5, 6)], (1, 7), [(1, 2), (3, 5), (6, 7)]),
+        # Touching intervals leave no gap
+        ([(1, 2), (2, 3)], (1, 3), []),
+        ([FULL_RANGE], (1, 2), []),
+        ([(1, 2)], FULL_RANGE, [(-math.inf, 1), (2, math.inf)]),
+    ],
+)
+def test_missing_intervals(cached, wanted, expected):
+    assert missing_intervals(cached, wanted) == expected
+    assert covers(cached, wanted) == (not expected)
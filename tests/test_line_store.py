@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral_line_finder.exceptions import UnknownColumnsError
+from spectral_line_finder.intervals import FULL_RANGE
+from spectral_line_finder.line_store import LineStore
+
+
+@pytest.fixture
+def store(tmp_path) -> LineStore:
+    return LineStore(tmp_path)
+
+
+@pytest.fixture
+def lines() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "element": ["Fe", "Fe", "Fe", "Fe"],
+            "sp_num": np.array([1, 2, 2, 3], dtype=np.int64),
+            "wavelength": [100.5, 200.25, np.nan, 400.0],
+            "conf_i": ["3d7.4s", np.nan, "3p6.4s", "3d7.4s"],
+            "term_i": ["5D", "2P*", "ΔΣ", np.nan],
+        }
+    )
+
+
+def test_round_trip(store, lines):
+    store.save("Fe", lines)
+
+    loaded = store.load("Fe")
+
+    pd.testing.assert_frame_equal(loaded, lines, check_dtype=False)
+    assert loaded["sp_num"].dtype == np.int64
+    assert loaded["wavelength"].dtype == np.float64
+    assert "Fe" in store
+    assert store.cached_intervals("Fe") == [FULL_RANGE]
+
+
+def test_load_columns(store, lines):
+    store.save("Fe", lines)
+
+    loaded = store.load("Fe", ["wavelength", "conf_i"], categorical_columns=["conf_i"])
+
+    assert list(loaded.columns) == ["wavelength", "conf_i"]
+    assert isinstance(loaded["conf_i"].dtype, pd.CategoricalDtype)
+    assert loaded["conf_i"].astype(object).tolist() == [
+        "3d7.4s",
+        np.nan,
+        "3p6.4s",
+        "3d7.4s",
+    ]
+
+
+def test_empty_frame(store, lines):
+    store.save("Fe", lines.iloc[:0])
+
+    loaded = store.load("Fe")
+
+    assert loaded.empty
+    assert list(loaded.columns) == list(lines.columns)
+
+
+def test_intervals(store, lines):
+    store.save("Fe", lines, intervals=[(100.0, 200.0), (300.0, 400.0)])
+
+    assert store.cached_intervals("Fe") == [(100.0, 200.0), (300.0, 400.0)]
+    assert "Fe" not in store
+
+
+def test_missing_element(store):
+    assert "Fe" not in store
+    assert store.cached_intervals("Fe") == []
+    with pytest.raises(KeyError):
+        store.load("Fe")
+
+
+def test_eviction(store, lines):
+    store.save("Fe", lines)
+    store.save("Ni", lines)
+    os.utime(store.get_path("Fe"), (1000, 1000))
+    os.utime(store.get_path("Ni"), (2000, 2000))
+    store.max_bytes = store.total_bytes()
+
+    store.save("H", lines)
+
+    # The least recently used element is removed
+    assert store.elements() == ["H", "Ni"]
+
+
+def test_unknown_columns(store, lines):
+    store.save("Fe", lines)
+
+    with pytest.raises(UnknownColumnsError, match="bogus.*Available columns: element"):
+        store.load("Fe", ["wavelength", "bogus"])
+
+
+def test_text_columns_are_stored_as_codes(store):
+    values = [f"level {idx}" for idx in range(1000)] * 2
+    lines = pd.DataFrame(
+        {
+            "many": values,
+            "categorical": pd.Categorical(["a", "b", np.nan, "a"] * 500),
+        }
+    )
+    store.save("Fe", lines)
+
+    loaded = store.load("Fe")
+
+    pd.testing.assert_frame_equal(
+        loaded, lines.astype({"categorical": object}), check_dtype=False
+    )
+    # Each distinct value is stored once, while storing all values as
+    # fixed-width UTF-32 would take 72 kB
+    assert store.get_path("Fe").stat().st_size < 30_000
+
+
+def test_truncated_file(store, lines):
+    store.save("Fe", lines)
+    path = store.get_path("Fe")
+    path.write_bytes(path.read_bytes()[:-10])
+
+    assert store.verify("Fe") is not None
+    with pytest.raises(KeyError):
+        store.load("Fe")
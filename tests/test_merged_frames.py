@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral_line_finder.merged_frames import (
+    MergedFrameCache,
+    concat_frames,
+    merge_sorted,
+)
+
+
+def make_lines(element: str, num_lines: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "element": pd.Categorical([element] * num_lines),
+            # Rounding gives some lines the same wavelength
+            "wavelength": rng.uniform(100, 200, num_lines).round(1),
+            "intens": rng.uniform(0, 1000, num_lines),
+        }
+    )
+
+
+def sort_lines(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("wavelength", kind="stable", ignore_index=True)
+
+
+@pytest.mark.parametrize(("num_base", "num_new"), [(500, 300), (0, 10), (10, 0)])
+def test_merge_sorted(num_base, num_new):
+    base = sort_lines(make_lines("Fe", num_base, seed=1))
+    new = make_lines("Ni", num_new, seed=2)
+
+    merged = merge_sorted(base, new)
+
+    expected = sort_lines(concat_frames([base, new]))
+    pd.testing.assert_frame_equal(merged, expected, check_categorical=False)
+    assert isinstance(merged.index, pd.RangeIndex)
+
+
+def test_merge_sorted_puts_new_lines_after_equal_wavelengths():
+    base = pd.DataFrame({"wavelength": [1.0, 2.0, 2.0], "source": ["b", "b", "b"]})
+    new = pd.DataFrame({"wavelength": [2.0, 1.0], "source": ["n1", "n2"]})
+
+    merged = merge_sorted(base, new)
+
+    assert merged["wavelength"].tolist() == [1.0, 1.0, 2.0, 2.0, 2.0]
+    assert merged["source"].tolist() == ["b", "n2", "b", "b", "n1"]
+
+
+def test_concat_frames_combines_categories():
+    merged = concat_frames([make_lines("Fe", 5, seed=1), make_lines("Ni", 5, seed=2)])
+
+    assert isinstance(merged["element"].dtype, pd.CategoricalDtype)
+    assert merged["element"].tolist() == ["Fe"] * 5 + ["Ni"] * 5
+
+
+def test_cache_extends_frames_of_subsets():
+    lines = {
+        element: make_lines(element, 200, seed)
+        for seed, element in enumerate(["Fe", "Ni", "H"])
+    }
+    loaded = []
+
+    def load(element, columns):
+        loaded.append(element)
+        df = lines[element]
+        return df if columns is None else df[columns]
+
+    cache = MergedFrameCache()
+    cache.get(["Fe", "Ni"], None, load)
+    merged = cache.get(["Fe", "Ni", "H"], None, load)
+
+    # Only the added element is loaded for the larger frame
+    assert loaded == ["Fe", "Ni", "H"]
+    expected = sort_lines(concat_frames(list(lines.values())))
+    pd.testing.assert_frame_equal(
+        merged.sort_values(["wavelength", "intens"], ignore_index=True),
+        expected.sort_values(["wavelength", "intens"], ignore_index=True),
+        check_categorical=False,
+    )
+    assert merged["wavelength"].is_monotonic_increasing
+    assert cache.get(["H", "Ni", "Fe"], None, load) is merged
+
+
+def test_cache_loads_missing_columns():
+    lines = make_lines("Fe", 20, seed=1)
+    cache = MergedFrameCache()
+
+    def load(element, columns):
+        return lines if columns is None else lines[columns]
+
+    assert list(cache.get(["Fe"], ["wavelength"], load).columns) == ["wavelength"]
+    df = cache.get(["Fe"], ["wavelength", "intens"], load)
+    assert set(df.columns) == {"wavelength", "intens"}
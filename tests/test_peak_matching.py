@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spectral_line_finder.peak_matching import (
+    DELTA_COLUMN,
+    PEAK_COLUMN,
+    PEAK_INDEX_COLUMN,
+    match_peaks,
+)
+
+
+@pytest.fixture
+def lines() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    wavelengths = np.sort(rng.uniform(400, 500, 2000).round(3))
+    return pd.DataFrame({"wavelength": wavelengths, "line": np.arange(2000)})
+
+
+def brute_force_matches(
+    lines: pd.DataFrame, peaks: np.ndarray, tolerances: np.ndarray
+) -> list[tuple[int, int]]:
+    wavelengths = lines["wavelength"].to_numpy()
+    return [
+        (peak_index, line)
+        for peak_index, (peak, tolerance) in enumerate(zip(peaks, tolerances))
+        for line in np.flatnonzero(np.abs(wavelengths - peak) <= tolerance)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10_000])
+def test_match_peaks(lines, chunk_size):
+    peaks = np.array([450.0, 401.5, 499.99, 300.0, 450.0, 420.123])
+
+    matches = pd.concat(
+        match_peaks(lines, peaks, tolerance=0.05, chunk_size=chunk_size),
+        ignore_index=True,
+    )
+
+    found = list(zip(matches[PEAK_INDEX_COLUMN], matches["line"]))
+    assert found == brute_force_matches(lines, peaks, np.full(len(peaks), 0.05))
+    np.testing.assert_array_equal(
+        matches[PEAK_COLUMN], peaks[matches[PEAK_INDEX_COLUMN]]
+    )
+    np.testing.assert_allclose(
+        matches[DELTA_COLUMN], matches["wavelength"] - matches[PEAK_COLUMN]
+    )
+
+
+def test_match_peaks_ppm(lines):
+    peaks = np.array([410.0, 490.0])
+
+    matches = pd.concat(match_peaks(lines, peaks, tolerance=100, unit="ppm"))
+
+    found = list(zip(matches[PEAK_INDEX_COLUMN], matches["line"]))
+    assert found == brute_force_matches(lines, peaks, peaks * 100e-6)
+
+
+def test_unknown_unit(lines):
+    with pytest.raises(ValueError):
+        next(match_peaks(lines, np.array([450.0]), 1.0, unit="Å"))
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from collections.abc import Iterator
+
+import httpx
+import pytest
+
+from spectral_line_finder.data import NistSpectralLines
+from spectral_line_finder.filters import DataFilters
+from spectral_line_finder.service import (
+    BadRequest,
+    LineService,
+    LineServiceClient,
+    decode_filters,
+    encode_filters,
+)
+
+
+@pytest.fixture
+def service(nist) -> LineService:
+    return LineService()
+
+
+@pytest.fixture
+def service_url(service) -> Iterator[str]:
+    """The URL of a line service running in a background thread."""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(service.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+
+@pytest.fixture
+def client(service_url) -> Iterator[LineServiceClient]:
+    client = LineServiceClient(service_url)
+    yield client
+    # The service waits for open connections when it is closed
+    client.close()
+
+
+def test_are_cached_makes_one_request(client, monkeypatch):
+    NistSpectralLines().load_data_from_nist("Fe")
+    paths = []
+    request = client.request
+
+    def count_requests(path, payload):
+        paths.append(path)
+        return request(path, payload)
+
+    monkeypatch.setattr(client, "request", count_requests)
+
+    assert client.are_cached(["Fe"])
+    assert not client.are_cached(["Fe", "Ni", "H"])
+    assert client.are_cached(["Fe"], (390.0, 400.0))
+    assert paths == ["/cached"] * 3
+
+
+def test_decode_filters():
+    filters = DataFilters()
+    filters.elements.elements = ["Fe", "Ni"]
+    filters.sp_num.max = 2
+    filters.intens.min = 10.5
+    filters.intens.show_nan = False
+    filters.blends.only_blends = True
+
+    assert decode_filters(encode_filters(filters)) == filters
+    assert decode_filters({"intens": {"min": 10}}).intens.min == 10
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"bogus": {}},
+        {"intens": None},
+        {"intens": {"bogus": 1}},
+        {"intens": {"min": "abc"}},
+        {"intens": {"max": [1]}},
+        {"intens": {"show_nan": 1}},
+        {"sp_num": {"min": True}},
+        {"elements": {"elements": "Fe"}},
+        {"elements": {"elements": ["Fe", 1]}},
+        {"blends": {"tolerance": None}},
+    ],
+)
+def test_decode_invalid_filters(data):
+    with pytest.raises(BadRequest):
+        decode_filters(data)
+
+
+def test_invalid_filters_are_rejected(service_url):
+    response = httpx.post(
+        f"{service_url}/lines",
+        json={"filters": {"elements": {"elements": ["Fe"]}, "intens": {"min": "abc"}}},
+    )
+
+    assert response.status_code == 400
+    assert "'min' of filter 'intens'" in response.json()["error"]
+
+
+def test_unexpected_errors(service, service_url, monkeypatch, caplog):
+    async def broken(request):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(service._handlers, "/lines", broken)
+
+    response = httpx.post(f"{service_url}/lines", json={})
+
+    assert response.status_code == 500
+    assert response.json() == {"error": "Internal server error."}
+    assert "boom" in caplog.text